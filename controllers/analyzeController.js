@@ -5,8 +5,11 @@ const axios = require("axios");
 //const ML_SERVICE_URL = process.env.ML_SERVICE_URL || "http://localhost:5001";
 ML_SERVICE_URL= "https://fake-news-ml.onrender.com"
 
+// How long we wait for the ML service; it drops work past this deadline
+const ML_TIMEOUT_MS = Number(process.env.ML_TIMEOUT_MS) || 15000;
+
 exports.analyzeText = async (req, res) => {
-  const { text } = req.body;
+  const { text, title } = req.body;
 
   if (!text) {
     return res.status(400).json({ error: "Text missing" });
@@ -14,8 +17,14 @@ exports.analyzeText = async (req, res) => {
 
   try {
     // Call the Flask ML service
+    // The title is optional; without one the ML service uses the first sentence
     const response = await axios.post(`${ML_SERVICE_URL}/predict`, {
-      text: text
+      text: text,
+      ...(typeof title === "string" && title ? { title } : {})
+    }, {
+      timeout: ML_TIMEOUT_MS,
+      // A relative budget, so clock skew between the hosts doesn't matter
+      headers: { "X-Request-Timeout-Ms": String(ML_TIMEOUT_MS) }
     });
 
     res.json(response.data);
@@ -26,7 +35,15 @@ exports.analyzeText = async (req, res) => {
       return res.status(503).json({ error: "ML service is unavailable. Please try again later." });
     }
     
+    if (error.code === 'ECONNABORTED') {
+      return res.status(504).json({ error: "ML service timed out. Please try again later." });
+    }
+
     if (error.response) {
+      const retryAfter = error.response.headers["retry-after"];
+      if (retryAfter) {
+        res.set("Retry-After", retryAfter);
+      }
       return res.status(error.response.status).json(error.response.data);
     }
     
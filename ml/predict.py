@@ -1,73 +1,54 @@
+"""
+Legacy command-line entry point:
+
+    python ml/predict.py "<article text>"
+
+This used to carry its own 11-feature layout with inverted labels, which
+no model in the repo matches any more. It now reuses the service's
+feature registry and prediction code (ml_service/predict.py), so the
+18 features, their order and the label mapping (0 = Likely Fake,
+1 = Likely Real) are the same everywhere. It scores with model2.pkl from
+this directory.
+"""
+import importlib.util
+import json
+import os
 import pickle
 import sys
-import json
-import pandas as pd
-from feature_extractor import extract_features
-
-# Get input text from command line argument
-if len(sys.argv) < 2:
-    print(json.dumps({"error": "No text provided"}))
-    sys.exit(1)
-
-text = sys.argv[1]
-
-# Load trained ML model
-model = pickle.load(open("model.pkl", "rb"))
-
-# Feature names in the same order used during training
-feature_names = [
-    "certainty_ratio",
-    "hedging_ratio",
-    "emotion_ratio",
-    "subjectivity",
-    "polarity",
-    "avg_sentence_length",
-    "pronoun_ratio",
-    "sensational_ratio",
-    "headline_exclamations",
-    "headline_questions",
-    "capital_word_ratio"
-]
-
-# Extract features
-features_list = extract_features(text)
 
-# Convert list to dict (for insights)
-features = dict(zip(feature_names, features_list))
+ML_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.join(os.path.dirname(ML_DIR), "ml_service")
+MODEL_PATH = os.path.join(ML_DIR, "model2.pkl")
 
-# Prepare DataFrame in exact order for prediction
-X = pd.DataFrame([features_list], columns=feature_names)
+sys.path.insert(0, SERVICE_DIR)
+from feature_extractor import verify_feature_order  # noqa: E402
 
-# Predict label and probability
-pred_label = model.predict(X)[0]
-pred_prob = model.predict_proba(X)[0].max()
+# Loaded by path: this file is also called predict.py
+_spec = importlib.util.spec_from_file_location(
+    "service_predict", os.path.join(SERVICE_DIR, "predict.py")
+)
+service_predict = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(service_predict)
 
-# Map label to human-readable credibility
-label_map = {0: "Likely Real", 1: "Likely Fake"}
-credibility = label_map[pred_label]
 
-# Simple risk assessment
-risk = "Low" if pred_label == 0 else "High"
+def load_model():
+    with open(MODEL_PATH, "rb") as f:
+        model = pickle.load(f)
+    verify_feature_order(model)
+    return model
 
-# Build insights for frontend
-insights = [{"feature": k.replace("_", " ").title(), "value": v} for k, v in features.items()]
 
-# Build explanation based on features
-explanation = ""
-if pred_label == 0:
-    explanation = "The text shows characteristics of reliable content with balanced language and factual assertions."
-else:
-    explanation = "The text contains indicators often found in unreliable or sensationalized content."
+def main(argv):
+    if len(argv) < 2 or argv[1].strip() == "":
+        print(json.dumps({"error": "No text provided"}))
+        return 1
+    try:
+        print(json.dumps(service_predict.predict(load_model(), argv[1])))
+        return 0
+    except Exception as e:
+        print(json.dumps({"error": "Prediction failed", "details": str(e)}))
+        return 1
 
-# Build JSON output
-output = {
-    "credibility": credibility,
-    "confidence": round(pred_prob * 100, 2),
-    "features": features,
-    "insights": insights,
-    "risk": risk,
-    "explanation": explanation
-}
 
-# Print JSON output
-print(json.dumps(output))
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
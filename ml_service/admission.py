@@ -0,0 +1,215 @@
+"""
+Admission control: cost-bounded concurrency, deadlines and load shedding.
+
+Every scoring request is admitted with a cost estimated from its input
+length (one unit per ADMISSION_COST_CHARS characters, at least one per
+text), and at most ADMISSION_MAX_COST units are worked on at once per
+worker process. Requests that don't fit wait in a FIFO queue of at most
+ADMISSION_MAX_QUEUE entries for up to ADMISSION_QUEUE_TIMEOUT_MS. A
+request is shed with 503 and Retry-After:
+
+- right away when the queue is full,
+- right away when the estimated wait (queued work ahead divided by the
+  observed drain rate) would already overrun its deadline,
+- when its wait in the queue times out.
+
+A single request is charged at most half of ADMISSION_MAX_COST, so a huge
+article waits for half the capacity to free up and then runs while
+ordinary requests keep flowing through the other half.
+
+Deadlines come from the caller: X-Request-Deadline is an absolute Unix
+time in milliseconds (preferred, it also covers time spent in gunicorn's
+backlog), X-Request-Timeout-Ms a budget relative to when the request is
+read. Values that aren't finite positive numbers are ignored, and no
+deadline lies more than MAX_REQUEST_TIMEOUT_MS ahead. Work whose
+deadline has passed is abandoned at the next stage boundary (admission,
+micro-batch, extraction, scoring) with 504.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+DEADLINE_HEADER = "X-Request-Deadline"
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+# Longest budget a caller can ask for; larger deadlines are clamped to it
+MAX_REQUEST_TIMEOUT_MS = float(os.environ.get("MAX_REQUEST_TIMEOUT_MS", 60000))
+
+
+class Overloaded(Exception):
+    """Shed before any work was done; answer 503 with Retry-After"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Service overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed; the remaining work was dropped"""
+
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded before {stage}")
+        self.stage = stage
+
+
+def parse_deadline(headers, now=None):
+    """time.monotonic() deadline from the request headers, or None"""
+    now_wall = time.time() if now is None else now
+    header = DEADLINE_HEADER if headers.get(DEADLINE_HEADER) else TIMEOUT_HEADER
+    try:
+        value = float(headers.get(header) or "")
+    except ValueError:
+        return None
+    # inf/nan or huge values would overflow the waits downstream
+    if not math.isfinite(value) or value <= 0:
+        return None
+    remaining = value / 1000 - now_wall if header == DEADLINE_HEADER else value / 1000
+    return time.monotonic() + min(remaining, MAX_REQUEST_TIMEOUT_MS / 1000)
+
+
+def remaining(deadline):
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(deadline, stage):
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(stage)
+
+
+class _Ticket:
+    __slots__ = ("cost",)
+
+    def __init__(self, cost):
+        self.cost = cost
+
+
+class AdmissionController:
+    def __init__(self, max_cost=64, max_queue=256, queue_timeout=5.0, cost_chars=5000,
+                 on_shed=None, on_wait=None):
+        """
+        on_shed(reason) is called for every shed request, on_wait(seconds)
+        for every admitted one.
+        """
+        self.max_cost = max_cost
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.cost_chars = cost_chars
+        self.on_shed = on_shed
+        self.on_wait = on_wait
+
+        self.in_flight = 0.0
+        self._waiting = deque()  # _Ticket per queued request, FIFO
+        self._cond = threading.Condition()
+        # Cost units completed per second, smoothed over completions
+        self.drain_rate = None
+        self._last_release = None
+        self.admitted = 0
+        self.shed = 0
+
+    @classmethod
+    def from_env(cls, on_shed=None, on_wait=None):
+        """Build from ADMISSION_* settings; None when ADMISSION=0"""
+        if os.environ.get("ADMISSION", "1") == "0":
+            return None
+        return cls(
+            max_cost=float(os.environ.get("ADMISSION_MAX_COST", 64)),
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", 256)),
+            queue_timeout=float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_MS", 5000)) / 1000,
+            cost_chars=int(os.environ.get("ADMISSION_COST_CHARS", 5000)),
+            on_shed=on_shed,
+            on_wait=on_wait,
+        )
+
+    def cost(self, texts):
+        """Estimated cost of scoring texts: 1 + length / cost_chars each, capped"""
+        return min(sum(1.0 + len(text) / self.cost_chars for text in texts), self.max_cost / 2)
+
+    def _fits(self, cost):
+        return self.in_flight + cost <= self.max_cost
+
+    def estimated_wait(self, extra=0.0):
+        """Seconds until extra cost units (on top of the queue) could start"""
+        backlog = self.in_flight + sum(t.cost for t in self._waiting) + extra - self.max_cost
+        if backlog <= 0:
+            return 0.0
+        if not self.drain_rate:
+            return self.queue_timeout
+        return backlog / self.drain_rate
+
+    def _shed(self, reason):
+        self.shed += 1
+        if self.on_shed:
+            self.on_shed(reason)
+        raise Overloaded(reason, max(1, math.ceil(self.estimated_wait())))
+
+    @contextmanager
+    def admit(self, cost, deadline=None):
+        """Hold cost units of capacity for the body of the with block"""
+        check_deadline(deadline, "admission")
+        t0 = time.monotonic()
+        with self._cond:
+            if self._waiting or not self._fits(cost):
+                if len(self._waiting) >= self.max_queue:
+                    self._shed("queue_full")
+                left = remaining(deadline)
+                if left is not None and self.estimated_wait(cost) > left:
+                    self._shed("deadline")
+                self._wait(cost, t0, deadline)
+            self.in_flight += cost
+            self.admitted += 1
+        waited = time.monotonic() - t0
+        if self.on_wait:
+            self.on_wait(waited)
+        try:
+            check_deadline(deadline, "admission")
+            yield waited
+        finally:
+            self._release(cost)
+
+    def _wait(self, cost, t0, deadline):
+        """Queue for capacity (called with the condition held)"""
+        give_up = t0 + self.queue_timeout
+        if deadline is not None:
+            give_up = min(give_up, deadline)
+        ticket = _Ticket(cost)
+        self._waiting.append(ticket)
+        try:
+            # FIFO: only the head of the queue may take capacity
+            while not (self._waiting[0] is ticket and self._fits(cost)):
+                left = give_up - time.monotonic()
+                if left <= 0:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceeded("admission")
+                    self._shed("wait_timeout")
+                self._cond.wait(left)
+        finally:
+            self._waiting.remove(ticket)
+            # The next waiter may be at the head now
+            self._cond.notify_all()
+
+    def _release(self, cost):
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= cost
+            # Only gaps during which the worker stayed busy measure throughput
+            if self._last_release is not None:
+                rate = cost / max(now - self._last_release, 1e-6)
+                self.drain_rate = rate if self.drain_rate is None else 0.8 * self.drain_rate + 0.2 * rate
+            self._last_release = now if self.in_flight > 0 or self._waiting else None
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight_cost": round(self.in_flight, 3),
+                "max_cost": self.max_cost,
+                "queued": len(self._waiting),
+                "max_queue": self.max_queue,
+                "drain_rate": round(self.drain_rate, 3) if self.drain_rate else None,
+                "admitted": self.admitted,
+                "shed": self.shed,
+            }
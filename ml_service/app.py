@@ -1,215 +1,192 @@
-from flask import Flask, request, jsonify
-import sys
-import os
-import pickle
-import pandas as pd
-import numpy as np
-import re
-import nltk
-from textblob import TextBlob
-
-# Download required NLTK data
-try:
-    for pkg in ['punkt', 'stopwords', 'wordnet', 'punkt_tab', 'vader_lexicon']:
-        nltk.download(pkg, quiet=True)
-except:
-    pass
-
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.sentiment import SentimentIntensityAnalyzer
-from nltk.tokenize import sent_tokenize, word_tokenize
-
-sia = SentimentIntensityAnalyzer()
-
-app = Flask(__name__)
-
-# ============== WORD LISTS (must match training) ==============
-certainty_words = set([
-    "always", "never", "definitely", "certainly", "undeniable", "proven",
-    "fact", "clearly", "everyone", "nobody", "certain", "sure", "absolutely",
-    "without doubt", "guaranteed", "obvious", "proof", "undoubtedly", "irrefutable",
-    "unquestionable", "conclusively", "must", "will", "impossible", "inevitably"
-])
-
-hedging_words = set([
-    "may", "might", "could", "possibly", "allegedly", "reported", "appears",
-    "suggests", "likely", "unlikely", "apparently", "presumably", "according",
-    "claims", "said to", "believed", "considered", "seems", "thought to",
-    "estimated", "expected", "potential", "possible", "perhaps", "sometimes",
-    "often", "usually", "generally", "typically", "tends", "indicate"
-])
-
-sensational_words = set([
-    "shocking", "breaking", "unbelievable", "exposed", "truth", "secret",
-    "revealed", "miracle", "amazing", "guaranteed", "exclusive", "dramatic",
-    "incredible", "unprecedented", "alert", "urgent", "bizarre", "astonishing",
-    "warning", "revolutionary", "bombshell", "explosive", "scandalous",
-    "outrageous", "stunning", "terrifying", "alarming", "catastrophic",
-    "devastating", "horrifying", "jaw-dropping", "mind-blowing", "earth-shattering",
-    "game-changing", "must-see", "viral", "hidden", "suppressed", "forbidden",
-    "banned", "censored", "conspiracy", "hoax", "rigged", "corrupt"
-])
-
-negative_emotion_words = set([
-    "shocking", "terrible", "disaster", "horrible", "corrupt", "angry",
-    "hate", "fear", "crisis", "danger", "horrific", "devastating", "evil",
-    "disgusting", "outrageous", "despicable", "vile", "wicked", "monstrous",
-    "atrocious", "appalling", "dreadful", "alarming", "threatening", "dangerous"
-])
-
-positive_emotion_words = set([
-    "amazing", "incredible", "fantastic", "great", "excellent", "happy",
-    "joy", "success", "win", "love", "wonderful", "brilliant", "outstanding",
-    "remarkable", "extraordinary", "superb", "magnificent", "glorious",
-    "triumphant", "victory", "heroic", "inspiring", "uplifting"
-])
-
-pronoun_words = set([
-    "we", "they", "you", "he", "she", "them", "us", "our", "him", "her",
-    "i", "me", "my", "their", "your", "his", "hers", "ours", "theirs"
-])
-
-objective_words = set([
-    "reported", "confirmed", "according", "stated", "official", "data",
-    "evidence", "statistics", "record", "announcement", "declaration",
-    "study", "research", "analysis", "report", "survey", "findings",
-    "investigation", "source", "spokesperson", "authority"
-])
-
-# Load model at startup
-model = None
-try:
-    model = pickle.load(open("model.pkl", "rb"))
-    print("Model loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-
-
-def extract_features(text, title=""):
-    """Extract 18 features from text"""
-    if not text or text == "":
-        return [0] * 18
-
-    text = str(text)
-    
-    # Title proxy logic
-    if not title or str(title).strip() == "":
-        try:
-            sentences = sent_tokenize(text)
-            title = sentences[0] if sentences else text[:100]
-        except:
-            title = text[:100]
-    else:
-        title = str(title)
-
-    text_lower = text.lower()
-    title_lower = title.lower()
-
-    words = text_lower.split()
-    title_words = title_lower.split()
-    total_words = max(len(words), 1)
-    total_title_words = max(len(title_words), 1)
-
-    # Features
-    certainty_count = sum(1 for w in words if w in certainty_words)
-    certainty_ratio = certainty_count / total_words
-
-    hedging_count = sum(1 for w in words if w in hedging_words)
-    hedging_ratio = hedging_count / total_words
-
+from startup import StartupReport
+
+startup = StartupReport()
+
+with startup.phase("imports"):
+    from flask import Blueprint, Flask, Response, g, request, jsonify
+    import os
+    import time
+    from concurrent.futures import TimeoutError as FutureTimeout
+    from contextlib import nullcontext
+    import pandas as pd
+    import numpy as np
+
+    import nltk_resources
+    from admission import AdmissionController, DeadlineExceeded, Overloaded, check_deadline, parse_deadline, remaining
+    from attributions import attributor_for
+    from batch_features import extract_features_bounded_batch
+    from compiled_model import CompiledModel
+    from cascade import Cascade
+    from feature_extractor import FEATURE_NAMES, FEATURE_SET_VERSION
+    from metrics import LENGTH_BUCKETS, Registry, server_timing
+    from micro_batcher import MicroBatcher
+    from model_registry import ModelManager
+    from near_duplicates import NearDuplicateIndex
+    from prediction_cache import PredictionCache, cache_key
+    from profiler import Profiler
+    from responses import project, requested_fields, respond
+
+# Only the NLTK data the features read is loaded, and only from disk;
+# anything missing is fetched lazily on first use
+with startup.phase("resources"):
+    nltk_resources.preload()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(BASE_DIR, "model.pkl"))
+
+# Load the active registry version at startup (or MODEL_PATH without a
+# registry; the compiled model.npz when it matches the pickle). Under
+# gunicorn with preload_app this runs once in the master and the forked
+# workers share the pages copy-on-write. Each worker then polls the
+# registry and hot-swaps newly activated versions (see model_registry.py).
+models = ModelManager.from_env(MODEL_PATH)
+with startup.phase("model_load"):
     try:
-        blob = TextBlob(text)
-        emotion_ratio = (blob.sentiment.polarity + 1) / 2
-        subjectivity = blob.sentiment.subjectivity
-        polarity = blob.sentiment.polarity
-    except:
-        emotion_ratio = 0.5
-        subjectivity = 0.5
-        polarity = 0.0
-
+        # Column order and a canary prediction are checked here once
+        models.refresh()
+        print(f"Model {models.active.version} loaded successfully!")
+    except Exception as e:
+        print(f"Error loading model: {e}")
+
+# Repeated texts skip feature extraction and scoring (None when disabled)
+cache = PredictionCache.from_env()
+# NEAR_DUP=1 also reuses results for syndicated near-copies (see near_duplicates.py)
+near_duplicates = NearDuplicateIndex.from_env()
+
+# CASCADE=1 answers confident texts from the cheap features alone (see cascade.py)
+with startup.phase("cascade_load"):
     try:
-        sentences = sent_tokenize(text)
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / max(len(sentences), 1)
-    except:
-        avg_sentence_length = 15.0
-
-    pronoun_count = sum(1 for w in words if w in pronoun_words)
-    pronoun_ratio = pronoun_count / total_words
-
-    sensational_count_title = sum(1 for w in title_words if w in sensational_words)
-    sensational_ratio_title = sensational_count_title / total_title_words
-
-    sensational_count_body = sum(1 for w in words if w in sensational_words)
-    sensational_ratio_body = sensational_count_body / total_words
-
-    headline_exclamations = title.count("!")
-    headline_questions = title.count("?")
-
-    capital_count_title = sum(1 for w in title.split() if w.isupper() and len(w) > 1)
-    capital_word_ratio_title = capital_count_title / total_title_words
-
-    capital_count_body = sum(1 for w in text.split() if w.isupper() and len(w) > 1)
-    capital_word_ratio_body = capital_count_body / total_words
-
-    neg_emotion_count = sum(1 for w in words if w in negative_emotion_words)
-    neg_emotion_ratio = neg_emotion_count / total_words
-
-    pos_emotion_count = sum(1 for w in words if w in positive_emotion_words)
-    pos_emotion_ratio = pos_emotion_count / total_words
-
-    objective_count = sum(1 for w in words if w in objective_words)
-    objective_ratio = objective_count / total_words
-
-    body_exclamations = text.count("!")
-    body_questions = text.count("?")
-
-    return [
-        certainty_ratio, hedging_ratio, emotion_ratio, subjectivity, polarity,
-        avg_sentence_length, pronoun_ratio, sensational_ratio_title, sensational_ratio_body,
-        headline_exclamations, headline_questions, capital_word_ratio_title, capital_word_ratio_body,
-        neg_emotion_ratio, pos_emotion_ratio, objective_ratio, body_exclamations, body_questions
-    ]
-
+        cascade = Cascade.from_env()
+    except Exception as e:
+        cascade = None
+        print(f"Cascade disabled: {e}")
+
+print(startup.summary())
+
+
+# Upper bound on texts accepted by one /predict/batch call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 1000))
+
+# SERVER_TIMING=1 adds a per-stage Server-Timing header to every response
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# ATTRIBUTIONS=0 drops the per-feature log-odds contributions from results
+# (computed from the boosted trees' decision paths, see attributions.py);
+# texts the cascade answers from its cheap tier carry none
+ATTRIBUTIONS = os.environ.get("ATTRIBUTIONS", "1") == "1"
+
+# PROFILE_TOKEN / PROFILE_SAMPLE_RATE profile chosen requests under
+# cProfile and tracemalloc (None when off; see profiler.py)
+profiler = Profiler.from_env()
+
+# ============== METRICS (GET /metrics) ==============
+
+metrics = Registry()
+REQUESTS = metrics.counter("ml_requests_total", "Requests by route and status", ("route", "status"))
+ERRORS = metrics.counter("ml_request_errors_total", "Requests answered with a 4xx/5xx status", ("route",))
+REQUEST_SECONDS = metrics.histogram("ml_request_duration_seconds", "Request latency", ("route",))
+STAGE_SECONDS = metrics.histogram(
+    "ml_stage_duration_seconds", "Time per pipeline stage, summed per request", ("stage",)
+)
+INPUT_CHARS = metrics.histogram(
+    "ml_input_length_chars", "Length of each submitted text", buckets=LENGTH_BUCKETS
+)
+MODEL_LOAD_SECONDS = metrics.gauge("ml_model_load_seconds", "Time spent loading the model at startup")
+STARTUP_SECONDS = metrics.gauge("ml_startup_phase_seconds", "Startup time per phase", ("phase",))
+CACHE_EVENTS = metrics.gauge("ml_cache_events", "Prediction cache counters", ("event",))
+CASCADE_TIERS = metrics.counter("ml_cascade_tier_total", "Texts answered per cascade tier", ("tier",))
+NEAR_DUP_EVENTS = metrics.gauge("ml_near_duplicate_events", "Near-duplicate index counters", ("event",))
+NEAR_DUP_HIT_RATE = metrics.gauge("ml_near_duplicate_hit_rate", "Share of near-duplicate lookups answered")
+ADMISSION_SHED = metrics.counter("ml_admission_shed_total", "Requests rejected with 503", ("reason",))
+DEADLINE_EXCEEDED = metrics.counter(
+    "ml_deadline_exceeded_total", "Requests abandoned after their deadline", ("stage",)
+)
+ADMISSION_WAIT = metrics.histogram("ml_admission_queue_wait_seconds", "Time admitted requests queued")
+ADMISSION_STATE = metrics.gauge("ml_admission", "Admitted cost in flight and queued requests", ("field",))
+MODEL_SWAPS = metrics.gauge("ml_model_swaps", "Model versions loaded by this process")
+MICRO_BATCH_SIZE = metrics.histogram(
+    "ml_micro_batch_size", "Requests per micro-batch", buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+MICRO_BATCH_WAIT = metrics.histogram(
+    "ml_micro_batch_queue_wait_seconds", "Time /predict requests wait for their batch to start"
+)
+MICRO_BATCH_STATE = metrics.gauge(
+    "ml_micro_batch", "Micro-batcher queue depth and current adaptive limits", ("field",)
+)
+PROFILES = metrics.counter("ml_profiled_requests_total", "Requests run under the profiler", ("trigger",))
+
+MODEL_LOAD_SECONDS.set(startup.phases.get("model_load", 0.0))
+for phase, seconds in startup.phases.items():
+    STARTUP_SECONDS.set(seconds, phase=phase)
+
+
+@metrics.collector
+def collect_cache_stats():
+    if cache:
+        stats = cache.stats()
+        for event in ("entries", "hits", "misses", "evictions", "expirations", "disk_hits"):
+            CACHE_EVENTS.set(stats[event], event=event)
+
+
+@metrics.collector
+def collect_near_duplicate_stats():
+    if near_duplicates:
+        stats = near_duplicates.stats()
+        for event in ("entries", "hits", "misses", "evictions", "expirations", "skipped"):
+            NEAR_DUP_EVENTS.set(stats[event], event=event)
+        NEAR_DUP_HIT_RATE.set(stats["hit_rate"])
+
+
+@metrics.collector
+def collect_admission_stats():
+    if admission:
+        stats = admission.stats()
+        for field in ("in_flight_cost", "queued"):
+            ADMISSION_STATE.set(stats[field], field=field)
+
+
+@metrics.collector
+def collect_model_stats():
+    MODEL_SWAPS.set(models.swaps)
+
+
+@metrics.collector
+def collect_batcher_stats():
+    if batcher:
+        stats = batcher.stats()
+        for field in ("queue_depth", "batch_size_limit", "window_ms"):
+            MICRO_BATCH_STATE.set(stats[field], field=field)
+
+
+def add_timing(timings, stage, t0):
+    """Add the time since t0 to a per-request timings dict (if any)"""
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+
+def build_result(features_list, pred_label, pred_prob, names=FEATURE_NAMES, contributions=None, base=None):
+    """
+    Build the /predict response for one scored text; contributions (per
+    feature, in names order, already rounded) and base are log-odds
+    towards "Likely Real"
+    """
+    features = dict(zip(names, features_list))
 
-def predict_text(text):
-    """Make prediction on text"""
-    global model
-    
-    if model is None:
-        # Try loading again
-        try:
-            model = pickle.load(open("model.pkl", "rb"))
-        except Exception as e:
-            return {"error": f"Model not loaded: {str(e)}"}
-    
-    feature_names = [
-        "certainty_ratio", "hedging_ratio", "emotion_ratio", "subjectivity", "polarity",
-        "avg_sentence_length", "pronoun_ratio", "sensational_ratio_title", "sensational_ratio_body",
-        "headline_exclamations", "headline_questions", "capital_word_ratio_title", "capital_word_ratio_body",
-        "neg_emotion_ratio", "pos_emotion_ratio", "objective_ratio", "body_exclamations", "body_questions"
-    ]
-    
-    features_list = extract_features(text, "")
-    features = dict(zip(feature_names, features_list))
-    
-    X = pd.DataFrame([features_list], columns=feature_names)
-    
-    pred_label = model.predict(X)[0]
-    pred_prob = model.predict_proba(X)[0].max()
-    
     label_map = {0: "Likely Fake", 1: "Likely Real"}
     credibility = label_map[pred_label]
     risk = "Low" if pred_label == 1 else "High"
     
     insights = [{"feature": k.replace("_", " ").title(), "value": round(v, 4)} for k, v in features.items()]
+    if contributions is not None:
+        for insight, contribution in zip(insights, contributions):
+            insight["contribution"] = contribution
     
     if pred_label == 1:
         explanation = "The text shows characteristics of reliable news content with balanced language and factual assertions."
     else:
         explanation = "The text contains indicators often found in unreliable or sensationalized content. Consider verifying with additional sources."
     
-    return {
+    result = {
         "credibility": credibility,
         "confidence": round(pred_prob * 100, 2),
         "features": features,
@@ -217,25 +194,467 @@ def predict_text(text):
         "risk": risk,
         "explanation": explanation
     }
+    if contributions is not None:
+        result["contributions"] = dict(zip(names, contributions))
+        result["base_log_odds"] = round(base, 4)
+    return result
+
+
+def score_features(model, features_lists, timings=None):
+    """
+    Score feature rows with a single model call.
+
+    The rows are stacked into one matrix and the pipeline runs
+    predict_proba once; labels come from the same probability matrix
+    (argmax over classes_, which is what model.predict does internally).
+    With ATTRIBUTIONS on, the compiled model's tree traversal also gives
+    the per-feature contributions.
+    """
+    t0 = time.perf_counter()
+    X = rows = np.array(features_lists, dtype=np.float64)
+    if not isinstance(model, CompiledModel):
+        # The sklearn pipeline checks the column names it was fitted with
+        X = pd.DataFrame(X, columns=FEATURE_NAMES)
+    add_timing(timings, "dataframe", t0)
+
+    attributor = attributor_for(model) if ATTRIBUTIONS else None
+    t0 = time.perf_counter()
+    if attributor is not None and attributor.model is model:
+        # One traversal serves both the probabilities and the attributions
+        leaves = model.leaves(rows)
+        proba = model.predict_proba(rows, leaves)
+    else:
+        leaves = None
+        proba = model.predict_proba(X)
+    add_timing(timings, "predict_proba", t0)
+    best = proba.argmax(axis=1)
+    labels = model.classes_[best]
+
+    if attributor is None:
+        return [
+            build_result(features_list, int(labels[i]), float(proba[i, best[i]]))
+            for i, features_list in enumerate(features_lists)
+        ]
+
+    t0 = time.perf_counter()
+    contributions = np.round(attributor.contributions(rows, leaves), 4).tolist()
+    add_timing(timings, "attributions", t0)
+    return [
+        build_result(features_list, int(labels[i]), float(proba[i, best[i]]), contributions=contributions[i],
+                     base=attributor.bias)
+        for i, features_list in enumerate(features_lists)
+    ]
+
 
+def predict_batch(texts, timings=None, deadline=None, titles=None):
+    """
+    Make predictions on a list of texts, with an optional parallel list of
+    titles ("" or None: the first sentence stands in for the title).
 
-@app.route("/predict", methods=["POST"])
+    Cached texts are answered directly; the rest (each distinct text once)
+    go through feature extraction and one score_features call. Stage
+    timings are added to the timings dict when one is passed. Past the
+    deadline (time.monotonic()) the batch is dropped with DeadlineExceeded.
+
+    The whole batch uses the model that was active when it started, so a
+    hot-swap mid-batch never mixes versions; every result names it.
+    """
+    active = models.active
+    if active is None:
+        # Startup load failed; try again
+        try:
+            models.refresh()
+            active = models.active
+        except Exception as e:
+            return [{"error": f"Model not loaded: {str(e)}"} for _ in texts]
+
+    results = [None] * len(texts)
+    titles = [title or "" for title in titles] if titles else [""] * len(texts)
+    version = f"{active.version}:{active.checksum}:{FEATURE_SET_VERSION}"
+    if cascade:
+        version += f":{cascade.version}"
+    if ATTRIBUTIONS:
+        # Entries cached without contributions (also in the shared SQLite tier) aren't reused
+        version += ":attributions"
+
+    # key -> positions of every text that hashes to it
+    t0 = time.perf_counter()
+    pending = {}
+    for i, (text, title) in enumerate(zip(texts, titles)):
+        key = cache_key(text, version, title) if cache else i
+        entry = cache.get(key) if cache else None
+        if entry is not None:
+            results[i] = dict(entry["result"])
+        else:
+            pending.setdefault(key, []).append(i)
+
+    add_timing(timings, "cache", t0)
+
+    # Near-copies of recently scored texts reuse their result; the index
+    # only knows bodies, so titled texts are always scored
+    signatures = {}
+    if near_duplicates and pending:
+        t0 = time.perf_counter()
+        for key in list(pending):
+            if titles[pending[key][0]]:
+                continue
+            signature = near_duplicates.signature(texts[pending[key][0]])
+            found = near_duplicates.lookup(signature, version)
+            if found is None:
+                signatures[key] = signature
+                continue
+            entry, similarity = found
+            result = dict(entry["result"], near_duplicate={"similarity": round(similarity, 4)})
+            if cache:
+                cache.set(key, {"features": entry["features"], "result": result})
+            for i in pending.pop(key):
+                results[i] = dict(result)
+        add_timing(timings, "near_duplicate", t0)
+
+    if pending:
+        check_deadline(deadline, "extract")
+        pending_texts = [texts[idx[0]] for idx in pending.values()]
+        pending_titles = [titles[idx[0]] for idx in pending.values()]
+        if cascade:
+            # (tier, features, info, score); "cheap" rows are already scored
+            extracted = cascade.extract_batch(pending_texts, pending_titles, timings)
+        else:
+            # Large batches take the columnar path (batch_features.py); very long
+            # texts are chunked (and past the cap sampled, see feature_accumulator.py)
+            extracted = [
+                ("full", features_list, info, None)
+                for features_list, info in extract_features_bounded_batch(pending_texts, pending_titles, timings)
+            ]
+
+        check_deadline(deadline, "predict")
+        full = [features_list for tier, features_list, _, _ in extracted if tier == "full"]
+        full_results = iter(score_features(active.model, full, timings) if full else ())
+        scored = [
+            build_result(features_list, *score, names=cascade.cheap.names) if tier == "cheap"
+            else next(full_results)
+            for tier, features_list, _, score in extracted
+        ]
+
+        for (key, idx), (tier, features_list, info, _), result in zip(pending.items(), extracted, scored):
+            if info:
+                result.update(info)
+            if cascade:
+                result["tier"] = tier
+                CASCADE_TIERS.inc(tier=tier)
+            # Cheap answers were scored by the cascade's auxiliary model
+            result["model_version"] = cascade.aux.version if tier == "cheap" else active.version
+            if cache:
+                cache.set(key, {"features": features_list, "result": result})
+            if near_duplicates:
+                near_duplicates.add(signatures.get(key), version, {"features": features_list, "result": result})
+            for i in idx:
+                results[i] = dict(result)
+
+    return results
+
+
+def predict_text(text, timings=None, title=""):
+    """Make prediction on text"""
+    return predict_batch([text], timings, titles=[title])[0]
+
+
+def predict_with_timings(items):
+    """
+    Micro-batch function over (text, title, deadline) items: each result
+    is paired with its share of the batch's stage timings (every stage
+    divided by the items scored), so per-request stage metrics add up to
+    the work actually done. Items already past their deadline get a
+    DeadlineExceeded instead of a result; the rest run until the latest
+    of their deadlines.
+    """
+    timings = {}
+    now = time.monotonic()
+    results = [DeadlineExceeded("micro_batch")] * len(items)
+    live = [i for i, (_, _, deadline) in enumerate(items) if deadline is None or deadline > now]
+    if live:
+        deadlines = [items[i][2] for i in live]
+        deadline = None if None in deadlines else max(deadlines)
+        try:
+            scored = predict_batch(
+                [items[i][0] for i in live], timings, deadline, titles=[items[i][1] for i in live]
+            )
+        except DeadlineExceeded as e:
+            scored = [e] * len(live)
+        for i, result in zip(live, scored):
+            results[i] = result
+    share = {stage: seconds / len(live) for stage, seconds in timings.items()} if live else {}
+    return [(result, share) for result in results]
+
+
+def record_micro_batch(size, queue_waits):
+    MICRO_BATCH_SIZE.observe(size)
+    for wait in queue_waits:
+        MICRO_BATCH_WAIT.observe(wait)
+
+
+# Concurrent single-item /predict calls are coalesced into one
+# predict_batch pass (MICRO_BATCH=0 turns it off; see micro_batcher.py).
+# Batches only form across a worker's threads, so pair it with
+# GUNICORN_THREADS > 1.
+batcher = MicroBatcher.from_env(predict_with_timings, on_batch=record_micro_batch)
+
+# Cost-bounded concurrency with load shedding and caller deadlines
+# (ADMISSION=0 turns it off; see admission.py)
+admission = AdmissionController.from_env(
+    on_shed=lambda reason: ADMISSION_SHED.inc(reason=reason),
+    on_wait=ADMISSION_WAIT.observe,
+)
+
+
+def admitted(texts, deadline):
+    """Context manager holding admission capacity for scoring texts"""
+    if admission is None:
+        return nullcontext()
+    return admission.admit(admission.cost(texts), deadline)
+
+
+def profiled_batch(texts, titles, deadline, trigger):
+    """predict_batch in the request thread under the profiler"""
+    with profiler.profile(request.url_rule.rule, texts, trigger) as record:
+        results = predict_batch(texts, g.timings, deadline, titles=titles)
+    if record is not None:
+        record.model_version = next((r["model_version"] for r in results if "model_version" in r), None)
+        g.profile_id = record.id
+        PROFILES.inc(trigger=trigger)
+    return results
+
+
+bp = Blueprint("ml", __name__)
+
+
+@bp.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    g.timings = {}
+    g.model_version = None
+    g.profile_id = None
+    models.ensure_watcher()
+
+
+@bp.after_request
+def record_request(response):
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUESTS.inc(route=route, status=response.status_code)
+    if response.status_code >= 400:
+        ERRORS.inc(route=route)
+    REQUEST_SECONDS.observe(elapsed, route=route)
+    for stage, seconds in g.timings.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    if g.model_version:
+        response.headers["X-Model-Version"] = g.model_version
+    if g.profile_id:
+        response.headers["X-Profile-Id"] = str(g.profile_id)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing({**g.timings, "total": elapsed})
+    return response
+
+
+@bp.errorhandler(Overloaded)
+def overloaded(e):
+    response = jsonify({"error": "Service overloaded, retry later", "reason": e.reason})
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response, 503
+
+
+@bp.errorhandler(DeadlineExceeded)
+def deadline_exceeded(e):
+    DEADLINE_EXCEEDED.inc(stage=e.stage)
+    return jsonify({"error": "Deadline exceeded", "stage": e.stage}), 504
+
+
+@bp.route("/predict", methods=["POST"])
 def predict():
     data = request.get_json()
     text = data.get("text", "")
+    title = data.get("title") or ""
 
     if not text:
         return jsonify({"error": "Text missing"}), 400
 
-    result = predict_text(text)
-    return jsonify(result)
+    if not isinstance(text, str):
+        return jsonify({"error": "text must be a string"}), 400
 
+    if not isinstance(title, str):
+        return jsonify({"error": "title must be a string"}), 400
 
-@app.route("/health", methods=["GET"])
+    try:
+        fields = requested_fields(request.args, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    INPUT_CHARS.observe(len(text))
+    deadline = parse_deadline(request.headers)
+    trigger = profiler.trigger(request.headers) if profiler else None
+    with admitted([text], deadline):
+        if trigger:
+            result = profiled_batch([text], [title], deadline, trigger)[0]
+        elif batcher:
+            try:
+                result, batch_timings = batcher.submit((text, title, deadline), remaining(deadline))
+            except FutureTimeout:
+                raise DeadlineExceeded("micro_batch")
+            if isinstance(result, DeadlineExceeded):
+                raise result
+            g.timings.update(batch_timings)
+        else:
+            result = predict_batch([text], g.timings, deadline, titles=[title])[0]
+    g.model_version = result.get("model_version")
+    return respond(project(result, fields), request)
+
+
+@bp.route("/predict/batch", methods=["POST"])
+def predict_batch_route():
+    data = request.get_json(silent=True) or {}
+    texts = data.get("texts")
+
+    if not isinstance(texts, list) or not texts:
+        return jsonify({"error": "texts must be a non-empty list"}), 400
+
+    # Items are strings or {"text", "title"} objects; a parallel "titles"
+    # list works too
+    titles = data.get("titles")
+    if titles is not None and (not isinstance(titles, list) or len(titles) != len(texts)):
+        return jsonify({"error": "titles must be a list as long as texts"}), 400
+    titles = [title if isinstance(title, str) else "" for title in titles or [""] * len(texts)]
+    for i, item in enumerate(texts):
+        if isinstance(item, dict):
+            texts[i] = item.get("text")
+            titles[i] = item.get("title") if isinstance(item.get("title"), str) else ""
+
+    if len(texts) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"Too many texts (max {MAX_BATCH_SIZE})"}), 413
+
+    try:
+        fields = requested_fields(request.args, data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Score the valid items together; empty or non-string ones keep their slot with an error
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text]
+    results = [{"error": "text must be a string" if text and not isinstance(text, str) else "Text missing"}
+               for text in texts]
+    for i in valid:
+        INPUT_CHARS.observe(len(texts[i]))
+    deadline = parse_deadline(request.headers)
+    trigger = profiler.trigger(request.headers) if profiler else None
+    with admitted([texts[i] for i in valid], deadline):
+        if trigger:
+            scored = profiled_batch([texts[i] for i in valid], [titles[i] for i in valid], deadline, trigger)
+        else:
+            scored = predict_batch(
+                [texts[i] for i in valid], g.timings, deadline, titles=[titles[i] for i in valid]
+            )
+    for i, result in zip(valid, scored):
+        results[i] = result
+    # The served model's version; cheap cascade answers name the aux model per result
+    active = models.active
+    g.model_version = active.version if active else None
+
+    # ?profile= / ?fields= and the Accept header shape the payload (see responses.py)
+    results = [project(result, fields) for result in results]
+    return respond({"results": results, "model_version": g.model_version}, request)
+
+
+@bp.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "ok", "model_loaded": model is not None})
+    active = models.active
+    g.model_version = active.version if active else None
+    return jsonify({
+        "status": "ok",
+        "model_loaded": active is not None,
+        "model_version": g.model_version,
+        "model_backend": "compiled" if active and isinstance(active.model, CompiledModel) else "sklearn",
+        "model": models.status(),
+        "feature_set": FEATURE_SET_VERSION,
+        "cache": cache.stats() if cache else None,
+        "near_duplicates": near_duplicates.stats() if near_duplicates else None,
+        "cascade": {"threshold": cascade.threshold, "cheap_features": cascade.cheap.names} if cascade else None,
+        "micro_batch": batcher.stats() if batcher else None,
+        "admission": admission.stats() if admission else None,
+        "profiler": profiler.stats() if profiler else None,
+        "attributions": ATTRIBUTIONS,
+        "startup": startup.as_dict(),
+        "nltk_resources": nltk_resources.status(),
+    })
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+# ============== PROFILES (see profiler.py) ==============
+
+def profiles_denied():
+    """Error response unless the caller may read profiles, else None"""
+    if profiler is None:
+        return jsonify({"error": "Profiling is off (set PROFILE_TOKEN or PROFILE_SAMPLE_RATE)"}), 404
+    # remote_addr proves nothing behind a same-host reverse proxy, so the
+    # token is the only way in
+    if not profiler.token:
+        return jsonify({"error": "Set PROFILE_TOKEN to read profiles"}), 403
+    if not profiler.authorized(request.headers):
+        return jsonify({"error": "Forbidden"}), 403
+    return None
+
+
+@bp.route("/admin/profiles", methods=["GET", "DELETE"])
+def list_profiles():
+    denied = profiles_denied()
+    if denied:
+        return denied
+    if request.method == "DELETE":
+        profiler.clear()
+    return jsonify({
+        "profiler": profiler.stats(),
+        "profiles": [record.summary() for record in profiler.profiles()],
+    })
+
+
+@bp.route("/admin/profiles/<int:profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    denied = profiles_denied()
+    if denied:
+        return denied
+    record = profiler.get(profile_id)
+    if record is None:
+        return jsonify({"error": "No such profile (only the slowest are kept)"}), 404
+
+    fmt = request.args.get("format", "text")
+    if fmt == "pstats":
+        response = Response(record.pstats_bytes(), mimetype="application/octet-stream")
+        response.headers["Content-Disposition"] = f"attachment; filename=profile-{profile_id}.pstats"
+        return response
+    if fmt == "collapsed":
+        return Response(record.collapsed(), mimetype="text/plain")
+    if fmt == "text":
+        limit = request.args.get("limit", "40")
+        if not limit.isdecimal():
+            return jsonify({"error": "limit must be a non-negative integer"}), 400
+        return Response(record.report(int(limit)), mimetype="text/plain")
+    return jsonify({"error": "format must be text, pstats or collapsed"}), 400
+
+
+def create_app():
+    """
+    App factory. Model manager, cache and lexicons are module state loaded
+    at import, so every app built here (and every forked worker) shares them.
+    """
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(bp)
+    return flask_app
+
+
+app = create_app()
 
 
 if __name__ == "__main__":
+    # Development server only; production runs gunicorn (see gunicorn.conf.py)
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
@@ -0,0 +1,127 @@
+"""
+Per-prediction feature attributions from the boosted trees.
+
+    from attributions import attributor_for
+
+    attributor = attributor_for(model)          # None if it can't be explained
+    contributions = attributor.contributions(X) # (n_rows, n_features) log-odds
+    # attributor.bias + contributions.sum(axis=1) == decision_function(X)
+
+Each tree's output is split along the path the row takes: every split
+on the way from the root to the leaf moves the expected tree output from
+the parent's value to the child's, and that change is credited to the
+split's feature (Saabas' path attribution). Summed over the trees, the
+contributions plus the bias (the prior log-odds plus every tree's
+expected output) add up to the model's raw log-odds, so a positive
+contribution pushes towards classes_[1] ("Likely Real").
+
+scikit-learn only refits the leaves of each boosting tree (a Newton
+step on the deviance), so internal nodes are re-valued here as the
+training-weighted mean of the leaves below them. The trees split on
+StandardScaler output, which maps feature to feature, so contributions
+belong to the raw features unchanged.
+
+Everything per node is precomputed once per model: for each leaf, the
+(feature, value change) pairs of its root-to-leaf path, padded to the
+maximum depth. Explaining a batch is then one gather of those paths for
+the leaves the rows reached (the same leaves the compiled model scores
+from) and one np.bincount, i.e. trees x depth work per row.
+benchmarks/bench_attributions.py checks additivity and measures the
+added latency.
+"""
+import sys
+import threading
+import weakref
+
+import numpy as np
+
+from compiled_model import CompiledModel, export_arrays
+
+
+def expected_values(value, weight, left, right, frontiers):
+    """Node values with internal nodes re-valued as their leaves' weighted mean"""
+    expected = np.array(value, dtype=np.float64)
+    # Deepest level first, so both children are final before their parent
+    for parents in reversed(frontiers):
+        lw, rw = weight[left[parents]], weight[right[parents]]
+        expected[parents] = (lw * expected[left[parents]] + rw * expected[right[parents]]) / (lw + rw)
+    return expected
+
+
+class TreeAttributor:
+    """Root-to-leaf path tables for one compiled model"""
+
+    def __init__(self, model):
+        if model.node_weight is None:
+            raise ValueError("Compiled model has no node weights; re-run 'python compiled_model.py export'")
+        self.model = model
+        self.n_features = model.n_features_in_
+        left, right = model.children[0::2], model.children[1::2]
+        is_leaf = left == np.arange(len(left))
+
+        # Internal nodes level by level from the roots
+        frontiers = []
+        level = model.roots[~is_leaf[model.roots]]
+        while len(level):
+            frontiers.append(level)
+            children = np.concatenate([left[level], right[level]])
+            level = children[~is_leaf[children]]
+
+        expected = expected_values(model.value, model.node_weight, left, right, frontiers)
+        # Leaf values are exact, so each tree's path changes telescope to
+        # leaf value - root expectation
+        self.bias = model.init_raw + float(expected[model.roots].sum())
+
+        depth = max(len(frontiers), 1)
+        self.path_feature = np.zeros((len(left), depth), dtype=np.intp)
+        self.path_delta = np.zeros((len(left), depth), dtype=np.float64)
+        for d, parents in enumerate(frontiers):
+            for children in (left[parents], right[parents]):
+                self.path_feature[children] = self.path_feature[parents]
+                self.path_delta[children] = self.path_delta[parents]
+                self.path_feature[children, d] = model.feature[parents]
+                self.path_delta[children, d] = expected[children] - expected[parents]
+
+    def leaves(self, X):
+        return self.model.leaves(X)
+
+    def contributions(self, X, leaves=None):
+        """
+        Log-odds contribution of every feature for every row of X, shape
+        (n_rows, n_features); leaves: self.leaves(X), when already known.
+        """
+        if leaves is None:
+            leaves = self.leaves(X)
+        n_rows = leaves.shape[0]
+        # (n_rows, n_trees, depth) path entries; np.take beats fancy indexing here
+        index = np.take(self.path_feature, leaves, axis=0)
+        index += (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None, None]
+        deltas = np.take(self.path_delta, leaves, axis=0)
+        # Padding entries (paths shorter than the max depth) add 0.0 to feature 0
+        totals = np.bincount(index.ravel(), weights=deltas.ravel(), minlength=n_rows * self.n_features)
+        return totals.reshape(n_rows, self.n_features)
+
+
+_attributors = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def attributor_for(model):
+    """
+    TreeAttributor for a compiled model or a scaler + GradientBoosting
+    pipeline (compiled in memory), built once per model object. None when
+    the model can't be explained (e.g. a model.npz exported before node
+    weights were stored).
+    """
+    with _lock:
+        if model in _attributors:
+            return _attributors[model]
+    try:
+        compiled = model if isinstance(model, CompiledModel) else CompiledModel(export_arrays(model))
+        attributor = TreeAttributor(compiled)
+    except Exception as e:
+        print(f"Attributions disabled for this model: {e}", file=sys.stderr)
+        attributor = None
+    with _lock:
+        _attributors[model] = attributor
+    return attributor
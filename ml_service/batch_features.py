@@ -0,0 +1,227 @@
+"""
+Columnar feature extraction for batches of documents.
+
+    from batch_features import extract_features_batch, extract_features_rows
+
+    X = extract_features_batch(texts, titles)       # float32 (n_docs, 18)
+    rows = extract_features_rows(texts, titles)     # == [extract_features(t, h) ...]
+
+The token-level intermediates (n_words, the lexicon/all-caps scans of
+body and title, body ! and ? counts) are computed for the whole batch at
+once: every whitespace token of every document is mapped to an integer
+id over the batch's distinct tokens, each distinct token is looked up
+once in a vocabulary built from the seven lexicons, and per-document
+counts come from a single np.bincount over (document, category pattern)
+pairs times a category-membership matrix. The registry's own feature functions
+are then evaluated once over those columns (a ratio is the same
+expression over arrays), so lexicon ratios, capital-word ratios and
+punctuation counts come out as whole columns.
+
+Sentences, the title proxy and sentiment still run per document through
+the feature registry, so the output is identical to extract_features,
+value for value. Feature sets whose lexicon features use the phrase
+matcher (v2) only get the punctuation columns vectorized.
+tests/test_batch_features.py checks parity and
+benchmarks/bench_batch_features.py measures throughput from 1 to 10k
+documents.
+"""
+import os
+import time
+from itertools import chain, repeat
+
+import numpy as np
+import pandas as pd
+
+import feature_extractor as fe
+from feature_accumulator import LONG_TEXT_CHARS, extract_features_bounded
+
+# Below this many documents the NumPy setup costs more than the batch
+# saves, so extract_features_bounded_batch goes per document
+BATCH_KERNEL_MIN_DOCS = int(os.environ.get("BATCH_KERNEL_MIN_DOCS", 64))
+
+# Intermediates the kernel provides as per-batch columns
+COLUMNAR = frozenset(("n_words", "body_scan", "n_title_words", "title_scan", "body_marks"))
+
+# Passes the title through so the kernel can scan it
+TITLE = fe.Feature("title", ("title",), lambda title: title)
+
+
+class LexiconKernel:
+    """Vocabulary over the lexicons plus its category-membership matrix"""
+
+    def __init__(self, lexicons=fe.LEXICONS):
+        index = fe.build_lexicon_index(lexicons)
+        self.slots = len(lexicons)
+        # Id 0 is every token outside the lexicons
+        self.vocabulary = {word: i for i, word in enumerate(sorted(index), 1)}
+        self.membership = np.zeros((len(self.vocabulary) + 1, self.slots + 1), dtype=bool)
+        for word, slots in index.items():
+            self.membership[self.vocabulary[word], list(slots)] = True
+
+    def scan(self, token_lists):
+        """
+        (counts, capitals, lengths) for a list of token lists: lexicon hits
+        per category as an int64 (n_docs, slots) matrix, all-caps words and
+        tokens per document, as scan_tokens counts them.
+        """
+        n_docs = len(token_lists)
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=n_docs)
+        tokens = list(chain.from_iterable(token_lists))
+        distinct = list(dict.fromkeys(tokens))
+        n_distinct = len(distinct)
+
+        # Per distinct token: its vocabulary id and whether it is all-caps
+        vocab_ids = np.fromiter(
+            map(self.vocabulary.get, map(str.lower, distinct), repeat(0)), dtype=np.int64, count=n_distinct
+        )
+        capital = (
+            np.fromiter(map(str.isupper, distinct), dtype=bool, count=n_distinct)
+            & (np.fromiter(map(len, distinct), dtype=np.int64, count=n_distinct) > 1)
+        )
+        # Distinct tokens with the same categories share a pattern id; the
+        # token stream becomes pattern ids, and one bincount over
+        # (document, pattern) pairs gives the per-document segment sums
+        patterns, pattern_ids = np.unique(vocab_ids * 2 + capital, return_inverse=True)
+        pattern_of = dict(zip(distinct, pattern_ids.tolist()))
+        token_patterns = np.fromiter(map(pattern_of.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        docs = np.repeat(np.arange(n_docs, dtype=np.int64), lengths)
+        width = len(patterns)
+        per_pattern = np.bincount(docs * width + token_patterns, minlength=n_docs * width).reshape(n_docs, width)
+
+        # Category-membership matrix of the patterns: lexicon slots plus all-caps
+        membership = self.membership[patterns // 2].astype(np.int64)
+        membership[:, self.slots] = patterns % 2
+        totals = per_pattern @ membership
+        return totals[:, :self.slots], totals[:, self.slots], lengths
+
+
+KERNEL = LexiconKernel()
+
+_residual_sets = {}
+
+
+def split_feature_set(feature_set):
+    """
+    (vectorized features, FeatureSet of the per-document rest): features
+    that only read COLUMNAR intermediates are evaluated over the batch.
+    """
+    key = (feature_set.version, tuple(feature_set.names))
+    if key not in _residual_sets:
+        vectorized = [f for f in feature_set.features if set(f.requires) <= COLUMNAR]
+        rest = [f for f in feature_set.features if f not in vectorized]
+        if any("title_scan" in f.requires or "n_title_words" in f.requires for f in vectorized):
+            rest.append(TITLE)
+        residual = fe.FeatureSet(feature_set.version, rest)
+        _residual_sets[key] = (vectorized, residual, residual.plan_for(fe.INPUTS + ("tokens",)))
+    return _residual_sets[key]
+
+
+def add_timing(timings, stage, t0):
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - t0
+
+
+def extract_columns(texts, titles=None, timings=None, feature_set=None):
+    """
+    One column per feature, in feature-set order: numpy arrays for the
+    vectorized features, lists for the per-document ones. Empty texts get
+    zeros, as extract_features gives them.
+    """
+    feature_set = feature_set or fe.FEATURE_SET
+    vectorized, residual, plan = split_feature_set(feature_set)
+    titles = titles or repeat("")
+    valid = [
+        (i, str(text), title or "") for i, (text, title) in enumerate(zip(texts, titles))
+        if not (pd.isna(text) or text == "")
+    ]
+
+    t0 = time.perf_counter()
+    token_lists = [text.split() for _, text, _ in valid]
+    add_timing(timings, "tokenize", t0)
+
+    # Sentences, title proxy, sentiment, ... per document
+    residual_rows, resolved_titles = [], []
+    for (_, text, title), tokens in zip(valid, token_lists):
+        values = {"text": text, "raw_title": title, "tokens": tokens}
+        residual_rows.append(residual.compute(values, plan, timings))
+        resolved_titles.append(values.get("title", ""))
+
+    t0 = time.perf_counter()
+    counts, capitals, lengths = KERNEL.scan(token_lists)
+    columns = {"n_words": np.maximum(lengths, 1), "body_scan": (counts.T, capitals)}
+    if any("title_scan" in f.requires or "n_title_words" in f.requires for f in vectorized):
+        title_tokens = [title.split() for title in resolved_titles]
+        counts, capitals, lengths = KERNEL.scan(title_tokens)
+        columns["n_title_words"] = np.maximum(lengths, 1)
+        columns["title_scan"] = (counts.T, capitals)
+    add_timing(timings, "lexicon", t0)
+
+    t0 = time.perf_counter()
+    n_valid = len(valid)
+    columns["body_marks"] = (
+        np.fromiter((text.count("!") for _, text, _ in valid), dtype=np.int64, count=n_valid),
+        np.fromiter((text.count("?") for _, text, _ in valid), dtype=np.int64, count=n_valid),
+    )
+    # The registry's feature functions work unchanged on the columns
+    computed = {
+        f.name: np.broadcast_to(f.compute(*[columns[dep] for dep in f.requires]), (n_valid,))
+        for f in vectorized
+    }
+    add_timing(timings, "features", t0)
+
+    per_doc = {f.name: j for j, f in enumerate(residual.features)}
+    positions = [i for i, _, _ in valid]
+    n_docs = len(texts)
+    out = []
+    for f in feature_set.features:
+        if f.name in computed:
+            column = computed[f.name]
+        else:
+            column = [row[per_doc[f.name]] for row in residual_rows]
+        if n_valid != n_docs:
+            full = [0] * n_docs
+            values = column.tolist() if isinstance(column, np.ndarray) else column
+            for i, value in zip(positions, values):
+                full[i] = value
+            column = full
+        out.append(column)
+    return out
+
+
+def extract_features_batch(texts, titles=None, timings=None, feature_set=None, dtype=np.float32):
+    """Feature matrix (n_docs, n_features) for texts, in FEATURE_NAMES order"""
+    columns = extract_columns(texts, titles, timings, feature_set)
+    matrix = np.empty((len(texts), len(columns)), dtype=dtype)
+    for j, column in enumerate(columns):
+        matrix[:, j] = column
+    return matrix
+
+
+def extract_features_rows(texts, titles=None, timings=None, feature_set=None):
+    """Per-document feature lists, equal (values and types) to extract_features"""
+    columns = extract_columns(texts, titles, timings, feature_set)
+    return [list(row) for row in zip(*(c.tolist() if isinstance(c, np.ndarray) else c for c in columns))]
+
+
+def extract_features_bounded_batch(texts, titles=None, timings=None):
+    """
+    [(features, info)] like extract_features_bounded per text: texts over
+    LONG_TEXT_CHARS take the chunked path, the rest one columnar batch
+    (when there are at least BATCH_KERNEL_MIN_DOCS of them).
+    """
+    titles = [title or "" for title in titles] if titles else [""] * len(texts)
+    out = [None] * len(texts)
+    short = []
+    for i, text in enumerate(texts):
+        if isinstance(text, str) and len(text) > LONG_TEXT_CHARS:
+            out[i] = extract_features_bounded(text, titles[i], timings)
+        else:
+            short.append(i)
+    if len(short) < BATCH_KERNEL_MIN_DOCS:
+        for i in short:
+            out[i] = extract_features_bounded(texts[i], titles[i], timings)
+    elif short:
+        rows = extract_features_rows([texts[i] for i in short], [titles[i] for i in short], timings)
+        for i, row in zip(short, rows):
+            out[i] = (row, None)
+    return out
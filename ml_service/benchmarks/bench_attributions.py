@@ -0,0 +1,130 @@
+"""
+Parity check and added latency of per-prediction feature attributions.
+
+    python benchmarks/bench_attributions.py [--rows 200] [--repeat 5]
+
+Asserts, over fixture-like feature rows (plus jittered copies to reach
+splits the corpus doesn't), that bias + the summed contributions equals
+the pipeline's decision_function, that the attributor built from the
+compiled model matches the one built from model.pkl, and that the first
+rows match a plain-Python walk over every sklearn tree. Then reports
+what attributions add to score_features for 1 to 512 rows and to a
+/predict request (cache, micro-batching and admission off), with
+ATTRIBUTIONS on and off.
+"""
+import argparse
+import os
+import pickle
+import sys
+import timeit
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from corpus import make_corpus, make_tier
+from suite import SERVICE_ENV
+
+from attributions import TreeAttributor, attributor_for
+from compiled_model import CompiledModel, export_arrays
+from feature_extractor import FEATURE_NAMES, extract_features
+
+
+def feature_rows(n_docs, seed=0):
+    rows = np.array([extract_features(t, "") for t in make_corpus(n_docs, 200, seed=seed)])
+    rng = np.random.default_rng(seed)
+    jitter = rows[rng.integers(0, len(rows), 5 * n_docs)]
+    jitter = jitter * rng.uniform(0.0, 2.0, jitter.shape)
+    return np.vstack([rows, jitter])
+
+
+def reference_contributions(pipeline, row):
+    """Path attribution for one row, tree by tree, straight from the sklearn objects"""
+    scaler, gb = pipeline.steps[0][1], pipeline.steps[-1][1]
+    x = scaler.transform(pd.DataFrame([row], columns=FEATURE_NAMES))[0].astype(np.float32)
+    contributions = np.zeros(len(row))
+    for estimator in gb.estimators_[:, 0]:
+        tree = estimator.tree_
+
+        def expected(node):
+            if tree.children_left[node] == -1:
+                return gb.learning_rate * tree.value[node, 0, 0]
+            left, right = tree.children_left[node], tree.children_right[node]
+            weights = tree.weighted_n_node_samples
+            return (weights[left] * expected(left) + weights[right] * expected(right)) / (weights[left] + weights[right])
+
+        node = 0
+        while tree.children_left[node] != -1:
+            feature = tree.feature[node]
+            child = tree.children_left[node] if x[feature] <= tree.threshold[node] else tree.children_right[node]
+            contributions[feature] += expected(child) - expected(node)
+            node = child
+    return contributions
+
+
+def check_parity(pipeline, X, n_reference=20):
+    from_pickle = attributor_for(pipeline)
+    compiled = CompiledModel(export_arrays(pipeline))
+    from_npz = TreeAttributor(compiled)
+
+    raw = pipeline.decision_function(pd.DataFrame(X, columns=FEATURE_NAMES))
+    contributions = from_pickle.contributions(X)
+    error = np.abs(from_pickle.bias + contributions.sum(axis=1) - raw).max()
+    assert error < 1e-9, f"contributions don't add up to the log-odds (max error {error:.3g})"
+    assert np.array_equal(contributions, from_npz.contributions(X, compiled.leaves(X))), "compiled attributor differs"
+    for i in range(n_reference):
+        expected = reference_contributions(pipeline, X[i])
+        assert np.allclose(contributions[i], expected, rtol=0, atol=1e-9), f"row {i} differs from the reference walk"
+    print(f"parity: {len(X)} rows add up to decision_function (max error {error:.3g}); "
+          f"{n_reference} match the per-tree reference walk")
+
+
+def off_and_on(service, fn, repeat, number):
+    """Best seconds per call of fn with ATTRIBUTIONS off and on, runs interleaved against drift"""
+    best = {False: float("inf"), True: float("inf")}
+    for _ in range(repeat):
+        for enabled in best:
+            service.ATTRIBUTIONS = enabled
+            best[enabled] = min(best[enabled], timeit.timeit(fn, number=number) / number)
+    return best[False], best[True]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.update(SERVICE_ENV)
+    with redirect_stdout(sys.stderr):
+        import app as service
+
+    with open(service.MODEL_PATH, "rb") as f:
+        pipeline = pickle.load(f)
+    X = feature_rows(args.rows)
+    check_parity(pipeline, X)
+
+    model = service.models.active.model
+    backend = "compiled" if isinstance(model, CompiledModel) else "sklearn"
+    rows = X.tolist()
+    print(f"\nscore_features with the served model ({backend}), ms per call")
+    print(f"{'rows':>6}{'off':>10}{'on':>10}{'added':>10}{'added/row':>11}")
+    for n in (1, 8, 64, 512):
+        off, on = off_and_on(service, lambda: service.score_features(model, rows[:n]), args.repeat, max(1, 1000 // n))
+        print(f"{n:>6}{off * 1e3:>10.3f}{on * 1e3:>10.3f}{(on - off) * 1e3:>10.3f}{(on - off) / n * 1e3:>11.4f}")
+
+    client = service.create_app().test_client()
+    docs = make_tier("news", 20, seed=1)
+
+    def post_all():
+        for title, text in docs:
+            response = client.post("/predict", json={"text": text, "title": title})
+            assert response.status_code == 200, response.get_data(as_text=True)
+
+    off, on = (seconds / len(docs) for seconds in off_and_on(service, post_all, args.repeat, 1))
+    print(f"\n/predict (news, {len(docs)} documents): {off * 1e3:.3f} ms off, {on * 1e3:.3f} ms on, "
+          f"{(on - off) * 1e3:+.3f} ms ({(on - off) / off * 100:+.1f}%) per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput: columnar batch extraction vs. per document.
+
+    python benchmarks/bench_batch_features.py [--sizes 1,10,100,1000,10000] [--words 200]
+
+For each batch size, reports documents per second for the lexicon/all-caps scan alone (scan_tokens
+per document vs. one LexiconKernel pass, over tokens split beforehand
+since both paths share the split) and for the full feature extraction.
+Parity with extract_features is checked by tests/test_batch_features.py.
+"""
+import argparse
+import time
+
+from corpus import make_corpus
+
+from batch_features import KERNEL, extract_features_rows
+from feature_extractor import extract_features, scan_tokens
+
+
+def per_doc_scan(token_lists):
+    return [scan_tokens(tokens) for tokens in token_lists]
+
+
+def rate(fn, batch, budget):
+    """Documents per second, repeating fn until budget seconds have passed"""
+    calls, started = 0, time.perf_counter()
+    while True:
+        fn(batch)
+        calls += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= budget:
+            return calls * len(batch) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per measurement")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",")]
+    pool = make_corpus(max(sizes), args.words, seed=11)
+    print(f"documents/sec at {args.words} words per document")
+    print(f"{'batch':>7}{'scan per-doc':>14}{'scan kernel':>13}{'speedup':>9}"
+          f"{'full per-doc':>14}{'full batch':>12}{'speedup':>9}")
+    for size in sizes:
+        texts = pool[:size]
+        token_lists = [text.split() for text in texts]
+        slow_scan = rate(per_doc_scan, token_lists, args.budget)
+        fast_scan = rate(KERNEL.scan, token_lists, args.budget)
+        slow_full = rate(lambda batch: [extract_features(text) for text in batch], texts, args.budget)
+        fast_full = rate(extract_features_rows, texts, args.budget)
+        print(f"{size:>7}{slow_scan:>14.0f}{fast_scan:>13.0f}{fast_scan / slow_scan:>8.2f}x"
+              f"{slow_full:>14.0f}{fast_full:>12.0f}{fast_full / slow_full:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
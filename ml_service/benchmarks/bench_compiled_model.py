@@ -0,0 +1,97 @@
+"""
+Parity check and benchmark: compiled NumPy evaluator vs. the sklearn pipeline.
+
+    python benchmarks/bench_compiled_model.py [--model model.pkl] [--repeat N]
+
+Exports model.pkl to a temporary .npz, asserts predict_proba is
+bit-for-bit identical over the fixture corpus (plus randomized rows
+around it to reach thresholds the corpus doesn't), then compares
+single-row and batch latency and the RSS of a fresh process that loads
+each backend.
+"""
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from corpus import make_corpus
+
+from compiled_model import CompiledModel, export
+from feature_extractor import extract_features
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RSS_SNIPPETS = {
+    "sklearn": "import pickle; m = pickle.load(open({pkl!r}, 'rb'))",
+    "compiled": "from compiled_model import CompiledModel; m = CompiledModel.load({npz!r})",
+}
+
+
+def fixture_matrix(n_docs, seed=0):
+    rows = np.array([extract_features(t, "") for t in make_corpus(n_docs, 200, seed=seed)])
+    rng = np.random.default_rng(seed)
+    jitter = rows[rng.integers(0, len(rows), 20 * n_docs)]
+    jitter = jitter * rng.uniform(0.0, 2.0, jitter.shape)
+    return np.vstack([rows, jitter])
+
+
+def rss_mb(snippet):
+    """Resident set size of a fresh interpreter after running snippet (Linux)"""
+    code = (
+        "import sys; sys.path.insert(0, %r); %s; "
+        "print([l for l in open('/proc/self/status') if l.startswith('VmRSS')][0])"
+        % (SERVICE_DIR, snippet)
+    )
+    out = subprocess.run([sys.executable, "-W", "ignore", "-c", code],
+                         capture_output=True, text=True, check=True)
+    return int(out.stdout.split()[-2]) / 1024
+
+
+def best_of(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", default=os.path.join(SERVICE_DIR, "model.pkl"))
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        pipeline = pickle.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        npz = os.path.join(tmp, "model.npz")
+        export(args.model, npz)
+        compiled = CompiledModel.load(npz)
+
+        X = fixture_matrix(args.docs)
+        frame = pd.DataFrame(X, columns=compiled.feature_names)
+        want = pipeline.predict_proba(frame)
+        got = compiled.predict_proba(X)
+        mismatches = int((want != got).any(axis=1).sum())
+        print(f"parity: {len(X)} rows, {mismatches} rows differ (max abs diff {np.abs(want - got).max():.3g})")
+        assert mismatches == 0, "compiled model is not bit-for-bit identical"
+
+        print(f"{'rows':>6}{'sklearn ms':>12}{'compiled ms':>13}{'speedup':>9}")
+        for n in (1, 10, 100, 1000):
+            frame_n, X_n = frame.iloc[:n], X[:n]
+            number = max(1, 2000 // n)
+            slow = best_of(lambda: pipeline.predict_proba(frame_n), args.repeat, number)
+            fast = best_of(lambda: compiled.predict_proba(X_n), args.repeat, number)
+            print(f"{n:>6}{slow * 1e3:>12.3f}{fast * 1e3:>13.3f}{slow / fast:>8.1f}x")
+
+        for name, snippet in RSS_SNIPPETS.items():
+            rss = rss_mb(snippet.format(pkl=args.model, npz=npz))
+            print(f"RSS after loading ({name}): {rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Micro-benchmark: single-pass lexicon scan vs. the old one-pass-per-list loops.
+
+    python benchmarks/bench_feature_engine.py [--repeat N]
+
+Checks that extract_features gives numerically identical lexicon and
+capitalization features to the previous implementation, then times the
+counting stage alone and the full extract_features call for short,
+medium and 50k-word texts.
+"""
+import argparse
+import timeit
+
+from corpus import SIZES, make_text
+
+import feature_extractor as fe
+from feature_extractor import extract_features, scan_tokens
+
+# Indices of the features produced by the lexicon/capitalization stage
+COUNT_FEATURES = (0, 1, 6, 7, 8, 11, 12, 13, 14, 15)
+
+
+def legacy_counts(text, title):
+    """The per-list multi-pass counting that extract_features used to do"""
+    words = text.lower().split()
+    title_words = title.lower().split()
+    total_words = max(len(words), 1)
+    total_title_words = max(len(title_words), 1)
+    return [
+        sum(1 for w in words if w in fe.certainty_words) / total_words,
+        sum(1 for w in words if w in fe.hedging_words) / total_words,
+        sum(1 for w in words if w in fe.pronoun_words) / total_words,
+        sum(1 for w in title_words if w in fe.sensational_words) / total_title_words,
+        sum(1 for w in words if w in fe.sensational_words) / total_words,
+        sum(1 for w in title.split() if w.isupper() and len(w) > 1) / total_title_words,
+        sum(1 for w in text.split() if w.isupper() and len(w) > 1) / total_words,
+        sum(1 for w in words if w in fe.negative_emotion_words) / total_words,
+        sum(1 for w in words if w in fe.positive_emotion_words) / total_words,
+        sum(1 for w in words if w in fe.objective_words) / total_words,
+    ]
+
+
+def single_pass_counts(text, title):
+    tokens = text.split()
+    title_tokens = title.split()
+    body, caps_body = scan_tokens(tokens)
+    head, caps_title = scan_tokens(title_tokens)
+    return body, caps_body, head, caps_title
+
+
+def best_of(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':<8}{'words':>7}{'legacy ms':>12}{'single ms':>12}{'speedup':>9}{'extract ms':>12}")
+    for name, n_words in SIZES.items():
+        text = make_text(n_words, seed=n_words)
+        title = text[:80]
+
+        got = extract_features(text, title)
+        want = legacy_counts(text, title)
+        assert [got[i] for i in COUNT_FEATURES] == want, f"parity failure on {name}"
+
+        number = max(1, 20000 // n_words)
+        legacy = best_of(lambda: legacy_counts(text, title), args.repeat, number)
+        single = best_of(lambda: single_pass_counts(text, title), args.repeat, number)
+        full = best_of(lambda: extract_features(text, title), args.repeat, max(1, number // 10))
+        print(f"{name:<8}{n_words:>7}{legacy * 1e3:>12.3f}{single * 1e3:>12.3f}"
+              f"{legacy / single:>8.1f}x{full * 1e3:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
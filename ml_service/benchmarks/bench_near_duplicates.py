@@ -0,0 +1,86 @@
+"""
+Accuracy and cost of the near-duplicate index.
+
+    python benchmarks/bench_near_duplicates.py [--docs 500] [--words 600] [--threshold 0.9]
+
+Indexes the fixture corpus, then looks up a syndicated copy of every
+document (new byline, reworded first sentence, appended boilerplate) and
+a batch of unrelated documents. Reports the recall on copies, the false
+matches on unrelated texts, how well the MinHash estimate tracks the
+exact shingle Jaccard similarity, and the signature / lookup latency.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from corpus import make_corpus
+
+from near_duplicates import NearDuplicateIndex
+
+BOILERPLATE = (
+    "Copyright 2024 Wire Services. All rights reserved. This material may not be "
+    "published, broadcast, rewritten or redistributed."
+)
+
+
+def syndicate(text, rng):
+    """A lightly edited copy: byline, changed lead, trailing boilerplate"""
+    words = text.split()
+    for _ in range(3):
+        words[rng.randrange(0, min(20, len(words)))] = rng.choice(("reportedly", "Tuesday", "officials"))
+    byline = f"By {rng.choice(('Jane Doe', 'A. Smith', 'Staff Reporter'))} | {rng.choice(('AP', 'Reuters'))} -"
+    return f"{byline} {' '.join(words)}\n\n{BOILERPLATE}"
+
+
+def exact_jaccard(index, a, b):
+    sa, sb = set(index.hasher.shingles(a).tolist()), set(index.hasher.shingles(b).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--words", type=int, default=600)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    originals = make_corpus(args.docs, args.words, seed=11)
+    copies = [syndicate(text, rng) for text in originals]
+    unrelated = make_corpus(args.docs, args.words, seed=12)
+
+    index = NearDuplicateIndex(threshold=args.threshold, max_entries=args.docs * 2)
+    print(f"threshold {args.threshold}: {index.bands} bands x {index.rows} rows")
+
+    t0 = time.perf_counter()
+    for i, text in enumerate(originals):
+        index.add(index.signature(text), "v", {"doc": i})
+    add_ms = (time.perf_counter() - t0) / len(originals) * 1000
+
+    t0 = time.perf_counter()
+    found = [index.lookup(index.signature(text), "v") for text in copies]
+    lookup_ms = (time.perf_counter() - t0) / len(copies) * 1000
+    recall = sum(1 for i, hit in enumerate(found) if hit and hit[0]["doc"] == i) / len(copies)
+    false_hits = sum(1 for text in unrelated if index.lookup(index.signature(text), "v"))
+    stale = sum(1 for text in copies[:50] if index.lookup(index.signature(text), "other-version"))
+
+    errors = []
+    for i in range(min(50, len(copies))):
+        if found[i]:
+            errors.append(abs(found[i][1] - exact_jaccard(index, originals[i], copies[i])))
+
+    print(f"{args.docs} docs of ~{args.words} words")
+    print(f"  signature + add: {add_ms:.3f} ms/doc, signature + lookup: {lookup_ms:.3f} ms/doc")
+    print(f"  syndicated copies matched: {recall * 100:.1f}%")
+    print(f"  unrelated texts matched:   {false_hits} of {len(unrelated)}")
+    print(f"  matches across versions:   {stale}")
+    if errors:
+        print(f"  |MinHash - exact Jaccard|: mean {np.mean(errors):.4f}, max {np.max(errors):.4f}")
+    print(f"  stats: {index.stats()}")
+    assert false_hits == 0 and stale == 0, "near-duplicate index matched unrelated text"
+
+
+if __name__ == "__main__":
+    main()
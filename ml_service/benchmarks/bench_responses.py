@@ -0,0 +1,77 @@
+"""
+Response size and encode time per profile and encoding.
+
+    python benchmarks/bench_responses.py [--batch 100] [--repeat 200]
+
+Scores fixture texts once, then encodes single /predict results and a
+/predict/batch payload for every profile (full, scores, label_only) with
+each encoder: Flask's jsonify (the previous behaviour), compact JSON via
+the standard library, orjson and MessagePack (the latter two when
+installed). Reports bytes per response and microseconds per encode, and
+checks that every encoding decodes to the same payload.
+"""
+import argparse
+import json
+import timeit
+
+from corpus import make_corpus
+
+from flask import Flask, jsonify
+
+import responses
+from responses import PROFILES, ANNOTATIONS, project
+
+ENCODERS = {
+    "jsonify": None,
+    "json": lambda payload: json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+}
+if responses.orjson is not None:
+    ENCODERS["orjson"] = lambda payload: responses.orjson.dumps(
+        payload, option=responses.orjson.OPT_SERIALIZE_NUMPY
+    )
+if responses.msgpack is not None:
+    ENCODERS["msgpack"] = lambda payload: responses.msgpack.packb(payload, use_bin_type=True)
+
+DECODERS = {
+    "jsonify": json.loads,
+    "json": json.loads,
+    "orjson": json.loads,
+    "msgpack": lambda data: responses.msgpack.unpackb(data, raw=False),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    import app as service
+
+    results = service.predict_batch(make_corpus(args.batch, 300, seed=5))
+    flask_app = Flask(__name__)
+
+    def jsonify_bytes(payload):
+        with flask_app.app_context():
+            return jsonify(payload).get_data()
+
+    ENCODERS["jsonify"] = jsonify_bytes
+
+    print(f"{'profile':<11} {'encoder':<8} {'bytes/resp':>10} {'us/resp':>8} "
+          f"{'batch bytes':>11} {'us/batch':>9}")
+    for profile, fields in PROFILES.items():
+        fields = None if fields is None else fields + ANNOTATIONS
+        single = project(results[0], fields)
+        batch = {"results": [project(r, fields) for r in results], "model_version": "v"}
+        for name, encode in ENCODERS.items():
+            encoded = encode(batch)
+            assert DECODERS[name](encoded) == json.loads(json.dumps(batch)), f"{name} round trip"
+            single_us = timeit.timeit(lambda: encode(single), number=args.repeat) / args.repeat * 1e6
+            batch_us = timeit.timeit(lambda: encode(batch), number=max(args.repeat // 10, 1)) \
+                / max(args.repeat // 10, 1) * 1e6
+            print(f"{profile:<11} {name:<8} {len(encode(single)):>10} {single_us:>8.1f} "
+                  f"{len(encoded):>11} {batch_us:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Parity report and benchmark: regex sentence segmenter vs. Punkt.
+
+    python benchmarks/bench_segmenter.py [--repeat N]
+
+Splits the fixture articles plus synthetic texts with both segmenters and
+reports how often the sentence count and the first sentence (the title
+proxy) agree and how far avg_sentence_length drifts, then times both on
+each article and on short/medium/long synthetic texts.
+"""
+import argparse
+import json
+import os
+import timeit
+
+import numpy as np
+
+from corpus import SIZES, make_corpus, make_text
+
+from segmenter import PunktSegmenter, RegexSegmenter
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "articles.jsonl")
+
+# Punctuation Punkt has to learn or look around for
+EDGE_CASES = [
+    "Mr. Smith met Dr. Jones at 10 a.m. on Jan. 5. They talked about the U.S. economy.",
+    "\"Is it true?\" she asked. \"Yes!\" he said. The vote was 7-2.",
+    "J. R. R. Tolkien wrote it. Prices rose 3.5 percent in 2023. Markets fell.",
+    "The plan (approved last week.) takes effect soon. Critics disagree...and say so. Next.",
+    "No terminal punctuation here",
+]
+
+
+def load_articles():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def avg_sentence_length(sentences):
+    return sum(len(s.split()) for s in sentences) / max(len(sentences), 1)
+
+
+def best_of(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    punkt, regex = PunktSegmenter(), RegexSegmenter()
+    articles = load_articles()
+    texts = [a["text"] for a in articles] + EDGE_CASES + make_corpus(200, 300)
+
+    same_count = same_first = 0
+    drift = []
+    for text in texts:
+        reference, fast = punkt.split(text), regex.split(text)
+        same_count += len(reference) == len(fast)
+        same_first += reference[:1] == fast[:1]
+        drift.append(abs(avg_sentence_length(fast) - avg_sentence_length(reference)))
+    drift = np.array(drift)
+    print(f"parity: {len(texts)} texts")
+    print(f"  same sentence count:  {same_count / len(texts) * 100:.1f}%")
+    print(f"  same title proxy:     {same_first / len(texts) * 100:.1f}%")
+    print(f"  avg_sentence_length |drift|: mean {drift.mean():.3f}, p95 {np.percentile(drift, 95):.3f}, "
+          f"max {drift.max():.3f} words")
+    for text in EDGE_CASES:
+        reference, fast = punkt.split(text), regex.split(text)
+        if reference != fast:
+            print(f"  differs: {text[:60]!r}\n    punkt {reference}\n    regex {fast}")
+
+    print(f"\n{'text':<10}{'words':>7}{'punkt ms':>10}{'regex ms':>10}{'speedup':>9}")
+    cases = [(f"article{i}", a["text"]) for i, a in enumerate(articles)]
+    cases += [(name, make_text(n, seed=n)) for name, n in SIZES.items()]
+    for name, text in cases:
+        number = max(1, 20000 // len(text.split()))
+        slow = best_of(lambda: punkt.split(text), args.repeat, number)
+        quick = best_of(lambda: regex.split(text), args.repeat, number)
+        print(f"{name:<10}{len(text.split()):>7}{slow * 1e3:>10.3f}{quick * 1e3:>10.3f}{slow / quick:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
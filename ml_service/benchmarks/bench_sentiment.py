@@ -0,0 +1,51 @@
+"""
+Benchmark: pattern sentiment backend vs. TextBlob.
+
+    python benchmarks/bench_sentiment.py [--repeat N]
+
+Times both backends on each fixture article
+(benchmarks/fixtures/articles.jsonl) and on short/medium/long synthetic
+texts. Parity within sentiment.PARITY_TOLERANCE is checked by
+tests/test_sentiment.py.
+"""
+import argparse
+import json
+import os
+import timeit
+
+from corpus import SIZES, make_text
+
+from sentiment import PatternLexiconBackend, TextBlobBackend
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "articles.jsonl")
+
+
+def load_articles():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def best_of(fn, repeat, number):
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fast, reference = PatternLexiconBackend(), TextBlobBackend()
+    articles = load_articles()
+
+    print(f"{'text':<10}{'words':>7}{'textblob ms':>13}{'pattern ms':>12}{'speedup':>9}")
+    cases = [(f"article{i}", a["text"]) for i, a in enumerate(articles)]
+    cases += [(name, make_text(n, seed=n)) for name, n in SIZES.items()]
+    for name, text in cases:
+        number = max(1, 20000 // len(text.split()))
+        slow = best_of(lambda: reference.analyze(text), args.repeat, number)
+        quick = best_of(lambda: fast.analyze(text), args.repeat, number)
+        print(f"{name:<10}{len(text.split()):>7}{slow * 1e3:>13.3f}{quick * 1e3:>12.3f}{slow / quick:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
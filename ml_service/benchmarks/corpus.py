@@ -0,0 +1,77 @@
+"""
+Synthetic fixture corpus for the benchmark scripts.
+
+Texts are generated deterministically from a seed so numbers are
+comparable between runs and machines. The vocabulary mixes filler words
+with entries from every lexicon, all-caps words and attached punctuation
+so each feature path gets exercised.
+"""
+import os
+import random
+import sys
+
+# Benchmarks run from ml_service/benchmarks but import the service modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feature_extractor import LEXICONS
+
+FILLER_WORDS = (
+    "the", "a", "of", "to", "in", "and", "that", "is", "was", "for", "on",
+    "with", "as", "by", "at", "from", "officials", "city", "people",
+    "government", "president", "week", "year", "market", "company",
+    "police", "new", "local", "state", "health", "school", "water",
+    "plan", "report", "vote", "told", "reporters", "statement", "after",
+    "before", "about", "more", "than", "percent", "million", "said",
+)
+SHOUTED_WORDS = ("BREAKING", "NOW", "FBI", "USA", "CEO", "NASA", "URGENT")
+PUNCTUATION = (".", ".", ".", ",", ",", "!", "?", ":")
+
+SIZES = {
+    "short": 30,
+    "medium": 600,
+    "long": 50000,
+}
+
+# Length tiers of the regression suite, tweet to long-form (words)
+TIERS = {
+    "tweet": 25,
+    "news": 300,
+    "article": 900,
+    "longform": 4000,
+}
+
+
+def make_text(n_words, seed=0):
+    """Build one pseudo-article of roughly n_words whitespace tokens"""
+    rng = random.Random(seed)
+    lexicon_words = sorted(w for _, words in LEXICONS for w in words)
+    out = []
+    sentence_len = 0
+    for _ in range(n_words):
+        roll = rng.random()
+        if roll < 0.12:
+            word = rng.choice(lexicon_words)
+        elif roll < 0.14:
+            word = rng.choice(SHOUTED_WORDS)
+        else:
+            word = rng.choice(FILLER_WORDS)
+        if sentence_len == 0:
+            word = word[:1].upper() + word[1:]
+        sentence_len += 1
+        if sentence_len > 6 and rng.random() < 0.12:
+            word += rng.choice(PUNCTUATION)
+            sentence_len = 0 if word[-1] in ".!?" else sentence_len
+        out.append(word)
+    return " ".join(out) + "."
+
+
+def make_corpus(n_docs, n_words, seed=0):
+    """n_docs texts of n_words each, seeded per document"""
+    return [make_text(n_words, seed=seed * 100003 + i) for i in range(n_docs)]
+
+
+def make_tier(tier, n_docs, seed=0):
+    """n_docs (title, text) pairs for a TIERS entry; every other one has a title"""
+    texts = make_corpus(n_docs, TIERS[tier], seed=seed)
+    titles = make_corpus(n_docs, 10, seed=seed + 1)
+    return [(titles[i].rstrip(".") if i % 2 else "", text) for i, text in enumerate(texts)]
@@ -0,0 +1,115 @@
+"""
+Load test for a running ML service.
+
+    gunicorn -c gunicorn.conf.py wsgi:app &
+    python benchmarks/load_test.py [--url http://127.0.0.1:5000] \
+        [--concurrency 1,4,16,64] [--requests 400]
+
+POSTs the fixture articles (benchmarks/fixtures/articles.jsonl) to
+/predict from a thread pool at each concurrency level and reports
+p50/p95/p99 latency and requests per second, so the effect of worker and
+thread counts can be compared. Each article gets a unique suffix so the
+prediction cache doesn't turn the run into a cache benchmark; pass
+--allow-cache to send the articles verbatim.
+"""
+import argparse
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "articles.jsonl")
+
+
+def load_articles():
+    with open(FIXTURES, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def post(url, payload, timeout):
+    body = json.dumps(payload).encode("utf-8")
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            ok = resp.status == 200
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - t0, ok
+
+
+def run_level(url, texts, concurrency, n_requests, timeout):
+    payloads = [{"text": texts[i % len(texts)]} for i in range(n_requests)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda p: post(url, p, timeout), payloads))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(sec for sec, ok in results if ok)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "concurrency": concurrency,
+        "requests": n_requests,
+        "errors": errors,
+        "rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", default="1,4,16,64",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=400, help="requests per level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--allow-cache", action="store_true",
+                        help="send identical texts so cache hits are measured too")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + "/predict"
+    articles = load_articles()
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    # Warm up: first request per worker pays for lazy imports
+    post(url, {"text": articles[0]["text"]}, args.timeout)
+
+    rows = []
+    for run, concurrency in enumerate(levels):
+        if args.allow_cache:
+            texts = [a["text"] for a in articles]
+        else:
+            texts = [
+                f"{a['text']} [load-test {run}-{i}]"
+                for i in range(max(1, args.requests // len(articles) + 1))
+                for a in articles
+            ]
+        rows.append(run_level(url, texts, concurrency, args.requests, args.timeout))
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'conc':>5} {'reqs':>6} {'err':>4} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for row in rows:
+        print(
+            f"{row['concurrency']:>5} {row['requests']:>6} {row['errors']:>4} {row['rps']:>8} "
+            f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
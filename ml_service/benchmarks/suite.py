@@ -0,0 +1,335 @@
+"""
+Performance-regression suite for the prediction path.
+
+    python benchmarks/suite.py run [--quick] [--out results.json] [--only extract/ score/]
+    python benchmarks/suite.py run --save-baseline main
+    python benchmarks/suite.py run --compare main [--threshold 0.15]
+    python benchmarks/suite.py compare main results.json [--threshold 0.15] [--min-delta 0.05]
+
+"run" measures, on synthetic texts from tweet to long-form length
+(corpus.TIERS, every other one with a title):
+
+    extract/<tier>/total, extract/<tier>/stage/<stage>
+                        extract_features per document and per stage
+    score/<backend>/single, score/<backend>/batch64
+                        score_features for one and 64 rows, with the
+                        model the service loads (compiled when model.npz
+                        matches) and with the sklearn pickle
+    score/attributions/single, score/attributions/batch64
+                        per-feature contributions alone (tree traversal
+                        included) for the served model
+    predict/<tier>, predict_batch/news32
+                        /predict and /predict/batch through the Flask test
+                        client (cache, micro-batching and admission off)
+    cold_start/predict_py
+                        a fresh `python predict.py "<text>"` process
+    memory/...          tracemalloc peaks for one long-form extraction and
+                        a 64-text batch, and the peak RSS of predict.py
+
+Times are the best of --repeat runs in milliseconds per document or
+call; memory is in MB. Lower is better for every metric. Results are
+JSON with a "meta" block describing the machine and revision.
+--save-baseline NAME stores them as benchmarks/baselines/NAME.json.
+
+"compare" (or run --compare) flags every metric that got more than
+--threshold (relative) and --min-delta (absolute, in the metric's unit)
+worse than the baseline and exits 1 if any did. Baselines only compare
+meaningfully on the machine they were recorded on; a warning is printed
+when the meta blocks disagree. On shared or throttled hosts whole runs
+drift by 20-30%; raise --threshold there or re-run before trusting a flag.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+
+from corpus import TIERS, make_tier
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+# Documents per tier and timing repeats: full run / --quick
+DOCS = {"tweet": 200, "news": 64, "article": 24, "longform": 6}
+QUICK_DOCS = {"tweet": 40, "news": 16, "article": 6, "longform": 2}
+REPEAT, QUICK_REPEAT = 5, 2
+COLD_STARTS, QUICK_COLD_STARTS = 3, 1
+
+# Service settings for the end-to-end measurements: every request does
+# the full work, in the request thread
+SERVICE_ENV = {
+    "PREDICTION_CACHE_SIZE": "0",
+    "MICRO_BATCH": "0",
+    "ADMISSION": "0",
+    "NEAR_DUP": "0",
+    "CASCADE": "0",
+    "PROFILE_TOKEN": "",
+    "PROFILE_SAMPLE_RATE": "0",
+    "SERVER_TIMING": "0",
+}
+
+
+# Each timed run loops a measured function for at least this long
+MIN_RUN_SECONDS = 0.05
+
+
+def best_of(fn, repeat):
+    """Best seconds per call over repeat runs of at least MIN_RUN_SECONDS"""
+    t0 = time.perf_counter()
+    fn()
+    number = max(1, int(MIN_RUN_SECONDS / max(time.perf_counter() - t0, 1e-9)))
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============== MEASUREMENTS ==============
+
+class Run:
+    def __init__(self, quick, repeat, only):
+        self.docs = QUICK_DOCS if quick else DOCS
+        self.repeat = repeat or (QUICK_REPEAT if quick else REPEAT)
+        self.cold_starts = QUICK_COLD_STARTS if quick else COLD_STARTS
+        self.only = only
+        self.results = {}
+        self.corpus = {tier: make_tier(tier, self.docs[tier], seed=i) for i, tier in enumerate(TIERS)}
+
+    def wanted(self, group):
+        return not self.only or any(group.startswith(p) or p.startswith(group) for p in self.only)
+
+    def record(self, name, value, unit="ms"):
+        if self.only and not any(name.startswith(p) for p in self.only):
+            return
+        self.results[name] = {"value": round(value, 6), "unit": unit}
+        print(f"  {name:<44} {value:>12.4f} {unit}", file=sys.stderr)
+
+    def extraction(self):
+        from feature_extractor import extract_features
+
+        for tier, docs in self.corpus.items():
+            seconds = best_of(lambda: [extract_features(text, title) for title, text in docs], self.repeat)
+            self.record(f"extract/{tier}/total", seconds / len(docs) * 1e3)
+            # Per stage, the best of repeat passes over the documents
+            stages = {}
+            for _ in range(self.repeat):
+                timings = {}
+                for title, text in docs:
+                    extract_features(text, title, timings)
+                for stage, stage_seconds in timings.items():
+                    stages[stage] = min(stages.get(stage, stage_seconds), stage_seconds)
+            for stage, stage_seconds in sorted(stages.items()):
+                self.record(f"extract/{tier}/stage/{stage}", stage_seconds / len(docs) * 1e3)
+
+    def scoring(self, service):
+        import pickle
+
+        import numpy as np
+
+        from attributions import attributor_for
+        from feature_extractor import extract_features
+
+        rows = [extract_features(text, title) for title, text in self.corpus["news"]]
+        rows = (rows * (64 // len(rows) + 1))[:64]
+        backends = {"served": service.models.active.model}
+        with open(service.MODEL_PATH, "rb") as f:
+            backends["sklearn"] = pickle.load(f)
+        for name, model in backends.items():
+            single = best_of(lambda: service.score_features(model, rows[:1]), self.repeat)
+            batch = best_of(lambda: service.score_features(model, rows), self.repeat)
+            self.record(f"score/{name}/single", single * 1e3)
+            self.record(f"score/{name}/batch64", batch * 1e3)
+
+        attributor = attributor_for(backends["served"])
+        if attributor is not None:
+            X = np.array(rows, dtype=np.float64)
+            self.record("score/attributions/single", best_of(lambda: attributor.contributions(X[:1]), self.repeat) * 1e3)
+            self.record("score/attributions/batch64", best_of(lambda: attributor.contributions(X), self.repeat) * 1e3)
+
+    def end_to_end(self, service):
+        client = service.create_app().test_client()
+        for tier in ("tweet", "news", "article"):
+            docs = self.corpus[tier]
+
+            def post_all():
+                for title, text in docs:
+                    response = client.post("/predict", json={"text": text, "title": title})
+                    assert response.status_code == 200, response.get_data(as_text=True)
+
+            self.record(f"predict/{tier}", best_of(post_all, self.repeat) / len(docs) * 1e3)
+
+        texts = [text for _, text in self.corpus["news"]][:32]
+        self.record(
+            "predict_batch/news32",
+            best_of(lambda: client.post("/predict/batch", json={"texts": texts}), self.repeat) * 1e3,
+        )
+
+    def memory(self, service):
+        from feature_extractor import extract_features
+
+        title, text = self.corpus["longform"][0]
+        self.record("memory/extract_longform_peak", peak_mb(lambda: extract_features(text, title)), "MB")
+        texts = [text for _, text in self.corpus["news"]]
+        texts = (texts * (64 // len(texts) + 1))[:64]
+        self.record("memory/predict_batch64_peak", peak_mb(lambda: service.predict_batch(texts)), "MB")
+
+    def cold_start(self):
+        _, text = self.corpus["news"][0]
+        env = dict(os.environ, **SERVICE_ENV)
+        walls = []
+        for _ in range(self.cold_starts):
+            t0 = time.perf_counter()
+            done = subprocess.run(
+                [sys.executable, "-W", "ignore", "predict.py", text],
+                cwd=SERVICE_DIR, env=env, capture_output=True, text=True,
+            )
+            walls.append(time.perf_counter() - t0)
+            if done.returncode != 0:
+                raise RuntimeError(f"predict.py failed: {done.stdout}{done.stderr}")
+        self.record("cold_start/predict_py", min(walls) * 1e3)
+        # ru_maxrss is in KB on Linux; predict.py is the only child process
+        self.record("memory/predict_py_rss", resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, "MB")
+
+    def run(self):
+        os.environ.update(SERVICE_ENV)
+        # The service reports its startup on stdout, which may carry the results
+        with redirect_stdout(sys.stderr):
+            import app as service
+
+        if self.wanted("extract/"):
+            self.extraction()
+        if self.wanted("score/"):
+            self.scoring(service)
+        if self.wanted("predict"):
+            self.end_to_end(service)
+        if self.wanted("memory/"):
+            self.memory(service)
+        if self.wanted("cold_start/") or self.wanted("memory/predict_py"):
+            self.cold_start()
+
+        active = service.models.active
+        return {
+            "meta": {
+                "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "feature_set": service.FEATURE_SET_VERSION,
+                "model_version": active.version if active else None,
+                "docs": self.docs,
+                "repeat": self.repeat,
+            },
+            "results": self.results,
+        }
+
+
+# ============== COMPARISON ==============
+
+def resolve(name_or_path):
+    if os.path.exists(name_or_path):
+        return name_or_path
+    return os.path.join(BASELINE_DIR, f"{name_or_path}.json")
+
+
+def load(name_or_path):
+    with open(resolve(name_or_path), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(baseline, current, threshold, min_delta):
+    """Print the comparison table; returns the names of regressed metrics"""
+    for key in ("machine", "cpus", "python"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"warning: {key} differs (baseline {baseline['meta'].get(key)}, "
+                  f"current {current['meta'].get(key)}); timings may not be comparable")
+
+    old, new = baseline["results"], current["results"]
+    regressions = []
+    print(f"{'metric':<44} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name in sorted(set(old) | set(new)):
+        if name not in new:
+            print(f"{name:<44} {old[name]['value']:>11.4f} {'-':>11} {'missing':>8}")
+            continue
+        if name not in old:
+            print(f"{name:<44} {'-':>11} {new[name]['value']:>11.4f} {'new':>8}")
+            continue
+        before, after = old[name]["value"], new[name]["value"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold and after - before > min_delta:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold and before - after > min_delta:
+            flag = "  improved"
+        print(f"{name:<44} {before:>11.4f} {after:>11.4f} {change * 100:>+7.1f}%{flag}")
+    print(f"\n{len(regressions)} regression(s) beyond {threshold * 100:.0f}% / {min_delta}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="measure and write JSON results")
+    run.add_argument("--quick", action="store_true", help="fewer documents and repeats")
+    run.add_argument("--repeat", type=int)
+    run.add_argument("--only", nargs="+", metavar="PREFIX", help="metrics starting with these prefixes")
+    run.add_argument("--out", help="results file (default: stdout)")
+    run.add_argument("--save-baseline", metavar="NAME", help="also write baselines/NAME.json")
+    run.add_argument("--compare", metavar="BASELINE", help="compare against a baseline name or file")
+
+    cmp = commands.add_parser("compare", help="compare results against a baseline")
+    cmp.add_argument("baseline", help="baseline name (baselines/NAME.json) or file")
+    cmp.add_argument("current", help="results file")
+
+    for sub in (run, cmp):
+        sub.add_argument("--threshold", type=float, default=0.15, help="relative slowdown to flag")
+        sub.add_argument("--min-delta", type=float, default=0.05, help="absolute change to flag")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return 1 if compare(load(args.baseline), load(args.current), args.threshold, args.min_delta) else 0
+
+    results = Run(args.quick, args.repeat, args.only).run()
+    encoded = json.dumps(results, indent=2, sort_keys=True) + "\n"
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(encoded)
+    elif not args.save_baseline and not args.compare:
+        sys.stdout.write(encoded)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(resolve(args.save_baseline), "w", encoding="utf-8") as f:
+            f.write(encoded)
+        print(f"Saved baseline {resolve(args.save_baseline)}", file=sys.stderr)
+    if args.compare:
+        return 1 if compare(load(args.compare), results, args.threshold, args.min_delta) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
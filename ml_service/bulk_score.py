@@ -0,0 +1,239 @@
+"""
+Bulk scoring for whole archives.
+
+    python bulk_score.py articles.jsonl scores.jsonl [--workers 8] [--chunk-size 500]
+    python bulk_score.py articles.csv scores.jsonl --resume
+
+Streams JSONL or CSV input (format from the extension, or --format).
+Each record needs a "text" field and may carry "title" and "id". Records
+are grouped into chunks; feature extraction runs on a process pool, each
+chunk is scored with one model call in the parent, and results are
+written as JSONL in input order:
+
+    {"index": 0, "id": "a1", "credibility": "Likely Fake", "confidence": 93.1, "risk": "High"}
+
+(--features adds the 18 feature values.) Only a bounded number of chunks
+is in flight at a time, so memory stays flat whatever the input size.
+
+After every chunk a checkpoint (<output>.ckpt) records how many input
+records are done and how many output bytes belong to them. --resume
+truncates the output back to that point and skips the finished records,
+so an interrupted run continues without duplicates or gaps.
+
+Progress and throughput (articles/sec) go to stderr.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from batch_features import extract_features_bounded_batch
+from predict import build_output, load_model, score_rows
+
+PROGRESS_EVERY = 5.0  # seconds
+
+
+# ============== INPUT ==============
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith((".csv", ".tsv")) else "jsonl"
+
+
+def read_records(path, fmt):
+    """Yield input records as dicts; unparseable JSONL lines yield {"_error": ...}"""
+    if fmt == "csv":
+        csv.field_size_limit(sys.maxsize)
+        delimiter = "\t" if path.lower().endswith(".tsv") else ","
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f, delimiter=delimiter)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {"_error": f"Invalid JSON: {e}"}
+            if not isinstance(record, dict):
+                record = {"_error": "Record must be a JSON object"}
+            yield record
+
+
+def chunked(records, size):
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# ============== WORK ==============
+
+def extract_chunk(rows):
+    """(features, info) for (title, text) rows; None for rows that can't be scored"""
+    valid = [i for i, (_, text) in enumerate(rows) if isinstance(text, str) and text.strip() != ""]
+    out = [None] * len(rows)
+    # One columnar pass over the chunk (see batch_features.py)
+    extracted = extract_features_bounded_batch([rows[i][1] for i in valid], [rows[i][0] for i in valid])
+    for i, result in zip(valid, extracted):
+        out[i] = result
+    return out
+
+
+def chunk_rows(chunk):
+    return [(record.get("title"), record.get("text")) for record in chunk]
+
+
+def score_chunk(model, chunk, features, start_index, with_features):
+    """Score one chunk with a single model call; returns output records in order"""
+    scorable = [f[0] for f in features if f is not None]
+    scores = iter(score_rows(model, scorable)) if scorable else iter(())
+
+    results = []
+    for offset, (record, extracted) in enumerate(zip(chunk, features)):
+        result = {"index": start_index + offset}
+        if "id" in record:
+            result["id"] = record["id"]
+
+        if "_error" in record:
+            result["error"] = record["_error"]
+        elif extracted is None:
+            result["error"] = "Empty text provided"
+        else:
+            features_list, info = extracted
+            output = build_output(features_list, *next(scores))
+            result.update(
+                credibility=output["credibility"],
+                confidence=output["confidence"],
+                risk=output["risk"],
+            )
+            if info:
+                result.update(info)
+            if with_features:
+                result["features"] = output["features"]
+        results.append(result)
+    return results
+
+
+# ============== CHECKPOINT ==============
+
+def read_checkpoint(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# ============== DRIVER ==============
+
+def run(args):
+    fmt = detect_format(args.input, args.format)
+    checkpoint_path = args.checkpoint or args.output + ".ckpt"
+
+    done, output_bytes = 0, 0
+    if args.resume:
+        state = read_checkpoint(checkpoint_path)
+        if state is not None:
+            if state.get("input") != os.path.abspath(args.input):
+                raise SystemExit(f"{checkpoint_path} belongs to {state.get('input')}, not {args.input}")
+            done, output_bytes = state["records_done"], state["output_bytes"]
+
+    model = load_model()
+    records = read_records(args.input, fmt)
+    # Finished records are skipped, not re-scored
+    for _ in islice(records, done):
+        pass
+
+    mode = "r+b" if done and os.path.exists(args.output) else "wb"
+    out = open(args.output, mode)
+    # Drop anything written after the last checkpoint
+    out.truncate(output_bytes if mode == "r+b" else 0)
+    out.seek(0, os.SEEK_END)
+
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 1 else None
+    # Enough chunks in flight to keep every worker busy, no more
+    max_in_flight = max(2, args.workers * 2)
+    pending = deque()
+
+    started = time.perf_counter()
+    last_report = started
+    scored = 0
+
+    def drain_one():
+        nonlocal done, scored, last_report
+        chunk, future = pending.popleft()
+        features = future.result() if pool else future
+        for result in score_chunk(model, chunk, features, done, args.features):
+            out.write(json.dumps(result).encode("utf-8") + b"\n")
+        out.flush()
+        done += len(chunk)
+        scored += len(chunk)
+        write_checkpoint(checkpoint_path, {
+            "input": os.path.abspath(args.input),
+            "records_done": done,
+            "output_bytes": out.tell(),
+        })
+
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY:
+            rate = scored / (now - started)
+            print(f"{done} articles scored ({rate:.1f} articles/sec)", file=sys.stderr)
+            last_report = now
+
+    try:
+        for chunk in chunked(records, args.chunk_size):
+            rows = chunk_rows(chunk)
+            work = pool.submit(extract_chunk, rows) if pool else extract_chunk(rows)
+            pending.append((chunk, work))
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        out.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    rate = scored / elapsed if elapsed else 0.0
+    print(
+        f"Done: {scored} articles in {elapsed:.1f}s ({rate:.1f} articles/sec), "
+        f"{done} total -> {args.output}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL or CSV file with text (and optional title, id)")
+    parser.add_argument("output", help="JSONL file to write scores to")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="input format (default: from extension)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="feature extraction processes; 1 runs in-process")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--features", action="store_true", help="include the feature values")
+    parser.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    parser.add_argument("--checkpoint", help="checkpoint path (default: <output>.ckpt)")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Two-tier (cascade) scoring: answer from the cheap features when they
+already decide, and pay for the expensive ones only when they don't.
+
+Sentence tokenization and sentiment dominate extraction time, while the
+lexicon ratios, capitalization and punctuation counts are a single pass
+over the tokens. Tier 1 computes only the features that don't depend on
+sentences or sentiment and scores them with a small logistic model
+(cascade_model.npz, evaluated with NumPy). When its confidence is at
+least CASCADE_THRESHOLD the result is returned as is; otherwise tier 2
+computes the remaining intermediates (reusing the tier 1 tokens and
+lexicon scans) and the full model scores all 18 features. Each result
+says which tier answered ("tier": "cheap" or "full") and the
+"model_version" of the model that scored it: cheap answers name the
+auxiliary model ("cascade-" plus a hash of its weights) and list only
+the features that were computed.
+
+Enable with CASCADE=1 once an auxiliary model has been trained:
+
+    python cascade.py train labeled.csv [--target label|model] [--out cascade_model.npz]
+    python cascade.py evaluate labeled.csv [--thresholds 0.8,0.9,0.95,0.99]
+
+Input is JSONL or CSV with "text" (and optional "title" and "label":
+0/1 or fake/real). --target model trains the auxiliary model to mimic
+the full model's decisions instead, which needs no labels. evaluate
+reports, per threshold, the share answered by tier 1, accuracy against
+the labels, agreement with the full model and mean latency per article.
+
+Texts longer than LONG_TEXT_CHARS always take the full (chunked) path.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+
+import feature_extractor as fe
+from feature_accumulator import LONG_TEXT_CHARS, extract_features_bounded
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CASCADE_MODEL_PATH = os.environ.get("CASCADE_MODEL", os.path.join(BASE_DIR, "cascade_model.npz"))
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", 0.9))
+
+# Intermediates too expensive for tier 1
+EXPENSIVE = frozenset(("sentences", "sentiment"))
+
+LABELS = {"0": 0, "fake": 0, "likely fake": 0, "1": 1, "real": 1, "likely real": 1}
+
+
+def depends_on(names):
+    """Every intermediate reachable from names"""
+    seen, stack = set(), list(names)
+    while stack:
+        name = stack.pop()
+        if name in seen or name in fe.INPUTS:
+            continue
+        seen.add(name)
+        stack.extend(fe.INTERMEDIATES[name].requires)
+    return seen
+
+
+def cheap_feature_set(feature_set=None):
+    """The features of feature_set that need nothing in EXPENSIVE"""
+    feature_set = feature_set or fe.FEATURE_SET
+    cheap = [f for f in feature_set.features if not depends_on(f.requires) & EXPENSIVE]
+    return fe.FeatureSet(feature_set.version + "-cheap", cheap)
+
+
+def parse_label(value):
+    if value is None:
+        return None
+    return LABELS.get(str(value).strip().lower())
+
+
+# ============== AUXILIARY MODEL ==============
+
+class AuxModel:
+    """Standardized logistic regression over the cheap features, NumPy only"""
+
+    def __init__(self, arrays):
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.mean = np.asarray(arrays["mean"], dtype=np.float64)
+        self.scale = np.asarray(arrays["scale"], dtype=np.float64)
+        self.coef = np.asarray(arrays["coef"], dtype=np.float64)
+        self.intercept = float(arrays["intercept"])
+        self.classes_ = np.asarray(arrays["classes"])
+        digest = hashlib.sha256()
+        for name in ("feature_names", "mean", "scale", "coef", "intercept", "classes"):
+            digest.update(np.ascontiguousarray(arrays[name]).tobytes())
+        self.version = f"cascade-{digest.hexdigest()[:12]}"
+
+    @classmethod
+    def load(cls, path):
+        return cls(dict(np.load(path)))
+
+    @classmethod
+    def fit(cls, X, y, feature_names):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler().fit(X)
+        clf = LogisticRegression(max_iter=1000).fit(scaler.transform(X), y)
+        if len(clf.classes_) != 2:
+            raise ValueError("Training data needs both classes")
+        return cls({
+            "feature_names": np.array(feature_names),
+            "mean": scaler.mean_,
+            "scale": scaler.scale_,
+            "coef": clf.coef_[0],
+            "intercept": clf.intercept_[0],
+            "classes": clf.classes_,
+        })
+
+    def save(self, path):
+        np.savez(
+            path, feature_names=np.array(self.feature_names), mean=self.mean, scale=self.scale,
+            coef=self.coef, intercept=self.intercept, classes=self.classes_,
+        )
+
+    def predict_proba(self, X):
+        z = ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale) @ self.coef + self.intercept
+        p1 = 1.0 / (1.0 + np.exp(-z))
+        return np.column_stack([1.0 - p1, p1])
+
+
+# ============== CASCADE ==============
+
+class Cascade:
+    def __init__(self, aux, threshold=CASCADE_THRESHOLD, feature_set=None):
+        self.feature_set = feature_set or fe.FEATURE_SET
+        self.cheap = cheap_feature_set(self.feature_set)
+        if aux.feature_names != self.cheap.names:
+            raise ValueError(
+                f"Cascade model was trained on {aux.feature_names}, "
+                f"tier 1 computes {self.cheap.names}; retrain it with 'python cascade.py train'"
+            )
+        self.aux = aux
+        self.threshold = threshold
+        # Part of the cache key: a retrained aux model or new threshold never serves stale entries
+        self.version = f"{aux.version}-{threshold}"
+
+    @classmethod
+    def from_env(cls):
+        """Build from CASCADE_* settings; None unless CASCADE=1"""
+        if os.environ.get("CASCADE", "0") != "1":
+            return None
+        return cls(AuxModel.load(CASCADE_MODEL_PATH), CASCADE_THRESHOLD)
+
+    def first_tier(self, text, title="", timings=None):
+        """(intermediates so far, cheap feature row)"""
+        values = {"text": str(text), "raw_title": title}
+        return values, self.cheap.compute(values, self.cheap.plan, timings)
+
+    def second_tier(self, values, timings=None):
+        """Full feature row, computing only what tier 1 didn't"""
+        return self.feature_set.compute(values, self.feature_set.plan_for(values), timings)
+
+    def extract_batch(self, texts, titles=None, timings=None, threshold=None):
+        """
+        Run tier 1 over texts (with their titles, if given) and escalate
+        the unsure ones.
+
+        Returns (tier, features, info, score) per text; score is
+        (label, probability) for "cheap" answers and None for "full" rows,
+        which the caller scores with the full model.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        out = [None] * len(texts)
+        first = []
+        titles = titles or [""] * len(texts)
+        for i, (text, title) in enumerate(zip(texts, titles)):
+            if isinstance(text, str) and text and len(text) <= LONG_TEXT_CHARS:
+                first.append((i, *self.first_tier(text, title, timings)))
+            else:
+                out[i] = ("full", *extract_features_bounded(text, title, timings), None)
+
+        if first:
+            t0 = time.perf_counter()
+            proba = self.aux.predict_proba([row for _, _, row in first])
+            if timings is not None:
+                timings["cascade"] = timings.get("cascade", 0.0) + time.perf_counter() - t0
+            best = proba.argmax(axis=1)
+            for (i, values, row), b, p in zip(first, best, proba):
+                if p[b] >= threshold:
+                    out[i] = ("cheap", row, None, (int(self.aux.classes_[b]), float(p[b])))
+                else:
+                    out[i] = ("full", self.second_tier(values, timings), None, None)
+        return out
+
+
+# ============== OFFLINE TOOLING ==============
+
+def read_labeled(path):
+    from bulk_score import detect_format, read_records
+
+    for record in read_records(path, detect_format(path)):
+        text = record.get("text")
+        if isinstance(text, str) and text.strip():
+            yield text, record.get("title") or "", parse_label(record.get("label"))
+
+
+def full_scores(model, rows):
+    from predict import score_rows
+    return score_rows(model, rows)
+
+
+def train(args):
+    from predict import load_model
+
+    cheap = cheap_feature_set()
+    X, y, full_rows = [], [], []
+    for text, title, label in read_labeled(args.input):
+        values = {"text": text, "raw_title": title}
+        X.append(cheap.compute(values, cheap.plan))
+        if args.target == "model":
+            full_rows.append(fe.FEATURE_SET.compute(values, fe.FEATURE_SET.plan_for(values)))
+        else:
+            if label is None:
+                raise SystemExit("Every record needs a label (0/1, fake/real); or use --target model")
+            y.append(label)
+    if args.target == "model":
+        y = [label for label, _ in full_scores(load_model(), full_rows)]
+
+    aux = AuxModel.fit(np.array(X, dtype=np.float64), np.array(y), cheap.names)
+    aux.save(args.out)
+    print(f"Trained on {len(X)} articles ({args.target} targets), features {cheap.names} -> {args.out}")
+    return 0
+
+
+def evaluate(args):
+    from predict import load_model
+
+    model = load_model()
+    cascade = Cascade(AuxModel.load(args.model), feature_set=fe.FEATURE_SET)
+    thresholds = [float(t) for t in args.thresholds.split(",")]
+    records = list(read_labeled(args.input))
+    if not records:
+        raise SystemExit("No texts to evaluate")
+    labels = [label for _, _, label in records]
+    has_labels = all(label is not None for label in labels)
+
+    # Full path, one article at a time as the service sees them
+    full_labels, full_time = [], 0.0
+    for text, title, _ in records:
+        t0 = time.perf_counter()
+        features, _ = extract_features_bounded(text, title)
+        full_labels.append(full_scores(model, [features])[0][0])
+        full_time += time.perf_counter() - t0
+
+    print(f"{len(records)} articles; full model: {full_time / len(records) * 1000:.3f} ms/article", end="")
+    if has_labels:
+        print(f", accuracy {np.mean(np.array(full_labels) == labels):.4f}")
+    else:
+        print(" (no labels: accuracy not reported)")
+
+    print(f"{'threshold':>9}  {'tier 1 %':>8}  {'accuracy':>8}  {'agree %':>7}  {'ms/article':>10}  {'speedup':>7}")
+    for threshold in thresholds:
+        predicted, cheap, elapsed = [], 0, 0.0
+        for text, title, _ in records:
+            t0 = time.perf_counter()
+            tier, features, _, score = cascade.extract_batch([text], [title], threshold=threshold)[0]
+            if score is None:
+                score = full_scores(model, [features])[0]
+            elapsed += time.perf_counter() - t0
+            predicted.append(score[0])
+            cheap += tier == "cheap"
+        predicted = np.array(predicted)
+        accuracy = f"{np.mean(predicted == labels):.4f}" if has_labels else "-"
+        print(
+            f"{threshold:>9}  {cheap / len(records) * 100:>8.1f}  {accuracy:>8}  "
+            f"{np.mean(predicted == full_labels) * 100:>7.1f}  "
+            f"{elapsed / len(records) * 1000:>10.3f}  {full_time / elapsed:>6.2f}x"
+        )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and evaluate the cascade's tier 1 model")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("train", help="fit the auxiliary model on the cheap features")
+    p.add_argument("input", help="JSONL or CSV with text (and title, label)")
+    p.add_argument("--target", choices=["label", "model"], default="label",
+                   help="learn the labels, or the full model's decisions")
+    p.add_argument("--out", default=CASCADE_MODEL_PATH)
+
+    p = sub.add_parser("evaluate", help="accuracy/latency trade-off per threshold")
+    p.add_argument("input", help="JSONL or CSV with text (and title, label)")
+    p.add_argument("--model", default=CASCADE_MODEL_PATH)
+    p.add_argument("--thresholds", default="0.7,0.8,0.9,0.95,0.99")
+
+    args = parser.parse_args(argv)
+    return train(args) if args.command == "train" else evaluate(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,262 @@
+"""
+NumPy-only evaluator for the StandardScaler -> GradientBoostingClassifier
+pipeline in model.pkl.
+
+The export step flattens the scaler and every boosting tree into a few
+flat arrays (feature index, threshold, left/right child, leaf value) and
+writes them to an uncompressed .npz whose members can be memory-mapped.
+Scoring then needs neither scikit-learn nor its per-call validation:
+
+    python compiled_model.py export [model.pkl] [model.npz]
+
+Predictions are bit-for-bit identical to the pipeline: the scaler runs in
+float64 exactly as StandardScaler.transform does, rows are cast to
+float32 before the threshold tests (as sklearn's tree code does), the
+learning-rate-scaled leaf values are summed stage by stage in the same
+order, and the sigmoid uses libm exp like scipy's expit.
+"""
+import hashlib
+import math
+import os
+import pickle
+import sys
+import zipfile
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+
+def file_checksum(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+# ============== EXPORT (needs scikit-learn) ==============
+
+def _leaf_self_loops(left, right):
+    """Point leaf children at the leaf itself so traversal can run a fixed depth"""
+    nodes = np.arange(len(left), dtype=np.int32)
+    is_leaf = left == -1
+    left = np.where(is_leaf, nodes, left).astype(np.int32)
+    right = np.where(is_leaf, nodes, right).astype(np.int32)
+    return left, right
+
+
+def export_arrays(pipeline):
+    """Flatten a fitted scaler + binary GradientBoostingClassifier pipeline"""
+    steps = [step for _, step in pipeline.steps] if hasattr(pipeline, "steps") else [pipeline]
+    scaler, gb = (steps[0], steps[-1]) if len(steps) == 2 else (None, steps[-1])
+
+    loss = getattr(gb, "loss_", None) or getattr(gb, "_loss", None)
+    if gb.estimators_.shape[1] != 1 or len(gb.classes_) != 2:
+        raise ValueError("Only binary GradientBoostingClassifier models can be compiled")
+    if type(loss).__name__ not in ("BinomialDeviance", "HalfBinomialLoss"):
+        raise ValueError(f"Unsupported loss for compilation: {type(loss).__name__}")
+
+    n_features = gb.n_features_in_
+    if scaler is not None:
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    else:
+        mean, scale = np.zeros(n_features), np.ones(n_features)
+
+    # Let sklearn compute the prior log-odds so the constant is identical
+    init_raw = gb._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0]
+
+    features, thresholds, lefts, rights, values, weights, roots, depths = [], [], [], [], [], [], [], []
+    offset = 0
+    for estimator in gb.estimators_[:, 0]:
+        tree = estimator.tree_
+        left, right = _leaf_self_loops(tree.children_left, tree.children_right)
+        roots.append(offset)
+        features.append(np.where(tree.children_left == -1, 0, tree.feature).astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+        lefts.append(left + offset)
+        rights.append(right + offset)
+        # Same double product sklearn adds per stage: learning_rate * leaf value
+        values.append(gb.learning_rate * tree.value[:, 0, 0])
+        # Training weight reaching each node; only attributions.py reads it
+        weights.append(tree.weighted_n_node_samples.astype(np.float64))
+        depths.append(tree.max_depth)
+        offset += tree.node_count
+
+    feature_names = getattr(scaler, "feature_names_in_", None)
+    if feature_names is None:
+        feature_names = getattr(gb, "feature_names_in_", np.array([], dtype=str))
+
+    return {
+        "format_version": np.array(FORMAT_VERSION),
+        "scaler_mean": np.asarray(mean, dtype=np.float64),
+        "scaler_scale": np.asarray(scale, dtype=np.float64),
+        "init_raw": np.array(init_raw, dtype=np.float64),
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.concatenate(values),
+        "node_weight": np.concatenate(weights),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.array(max(depths)),
+        "classes": np.asarray(gb.classes_),
+        "feature_names": np.asarray(feature_names, dtype=str),
+    }
+
+
+def export(pkl_path="model.pkl", npz_path="model.npz"):
+    """Compile model.pkl into model.npz (stored uncompressed so it can be mmapped)"""
+    with open(pkl_path, "rb") as f:
+        pipeline = pickle.load(f)
+    arrays = export_arrays(pipeline)
+    arrays["source_checksum"] = np.array(file_checksum(pkl_path))
+    np.savez(npz_path, **arrays)
+    return arrays
+
+
+# ============== LOAD (NumPy only) ==============
+
+def load_npz_mmap(path):
+    """
+    Memory-map every member of an uncompressed .npz.
+
+    np.load ignores mmap_mode for archives, so each member's .npy payload
+    is located inside the zip and mapped directly.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+            # Local file header: 30 fixed bytes + name + extra field
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = np.frombuffer(f.read(4), dtype="<u2")
+            f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject or not shape:
+                f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+                arrays[name] = np.lib.format.read_array(f)
+                continue
+            arrays[name] = np.memmap(
+                path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                order="F" if fortran else "C",
+            )
+    return arrays
+
+
+class CompiledModel:
+    """
+    Drop-in scorer for the compiled pipeline.
+
+    Exposes classes_, predict_proba and predict like the sklearn Pipeline
+    so callers don't need to know which one they hold.
+    """
+
+    def __init__(self, arrays):
+        if int(arrays["format_version"]) != FORMAT_VERSION:
+            raise ValueError("Unsupported compiled model format")
+        # np.asarray drops the memmap subclass (and its per-index overhead)
+        # but keeps the mapping
+        self.mean = np.asarray(arrays["scaler_mean"])
+        self.scale = np.asarray(arrays["scaler_scale"])
+        self.init_raw = float(arrays["init_raw"])
+        # Index arrays are small; widen them to intp once so gathers don't
+        self.feature = np.asarray(arrays["feature"], dtype=np.intp)
+        self.threshold = np.asarray(arrays["threshold"])
+        self.value = np.asarray(arrays["value"])
+        # Absent from files exported before attributions existed
+        self.node_weight = np.asarray(arrays["node_weight"]) if "node_weight" in arrays else None
+        self.roots = np.asarray(arrays["roots"], dtype=np.intp)
+        # Interleaved (left, right) children so one gather picks the next node
+        self.children = np.stack([arrays["left"], arrays["right"]], axis=1).ravel().astype(np.intp)
+        self.max_depth = int(arrays["max_depth"])
+        self.classes_ = np.asarray(arrays["classes"])
+        self.feature_names = [str(name) for name in arrays["feature_names"]]
+        self.source_checksum = str(arrays.get("source_checksum", ""))
+        self.n_features_in_ = len(self.mean)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        arrays = load_npz_mmap(path) if mmap else dict(np.load(path))
+        return cls(arrays)
+
+    def leaves(self, X):
+        """Leaf node index reached in every tree, shape (n_rows, n_trees)"""
+        # StandardScaler.transform in float64, then the tree code's float32 cast
+        Xs = ((np.asarray(X, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+        n_rows, n_features = Xs.shape
+        n_trees = len(self.roots)
+
+        # One flat lane per (row, tree); 1-D np.take is the cheapest gather
+        flat = Xs.ravel()
+        row_base = np.repeat(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        node = np.tile(self.roots, n_rows)
+        for _ in range(self.max_depth):
+            x = np.take(flat, np.take(self.feature, node) + row_base)
+            # children holds (left, right) pairs; NaN goes right like sklearn
+            go_right = ~(x <= np.take(self.threshold, node))
+            node = np.take(self.children, 2 * node + go_right)
+        return node.reshape(n_rows, n_trees)
+
+    def decision_function(self, X, leaves=None):
+        """
+        Raw log-odds: init + stage-by-stage sum of scaled leaf values
+        (leaves: the output of leaves(X), when the caller already has it)
+        """
+        leaf_values = self.value[self.leaves(X) if leaves is None else leaves]
+        stages = np.empty((leaf_values.shape[0], leaf_values.shape[1] + 1))
+        stages[:, 0] = self.init_raw
+        stages[:, 1:] = leaf_values
+        # accumulate adds left to right, matching sklearn's += per stage
+        return np.add.accumulate(stages, axis=1)[:, -1]
+
+    def predict_proba(self, X, leaves=None):
+        raw = self.decision_function(X, leaves)
+        proba = np.ones((raw.shape[0], 2), dtype=np.float64)
+        proba[:, 1] = [1.0 / (1.0 + math.exp(-r)) for r in raw.tolist()]
+        proba[:, 0] -= proba[:, 1]
+        return proba
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def load_model(pkl_path, npz_path=None):
+    """
+    Load the service model, preferring an up-to-date compiled copy.
+
+    The .npz is only used when it was exported from the exact model.pkl
+    on disk (matching checksum) and USE_COMPILED_MODEL isn't "0";
+    otherwise the pickle is loaded with scikit-learn. Returns
+    (model, checksum of model.pkl).
+    """
+    with open(pkl_path, "rb") as f:
+        blob = f.read()
+    checksum = hashlib.sha256(blob).hexdigest()[:12]
+
+    npz_path = npz_path or os.path.splitext(pkl_path)[0] + ".npz"
+    if os.environ.get("USE_COMPILED_MODEL", "1") != "0" and os.path.exists(npz_path):
+        try:
+            compiled = CompiledModel.load(npz_path)
+            if compiled.source_checksum == checksum:
+                return compiled, checksum
+            print(f"Ignoring stale {npz_path}; re-run 'python compiled_model.py export'", file=sys.stderr)
+        except Exception as e:
+            print(f"Could not load {npz_path}: {e}", file=sys.stderr)
+
+    return pickle.loads(blob), checksum
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] != "export":
+        print("usage: python compiled_model.py export [model.pkl] [model.npz]")
+        sys.exit(1)
+    pkl_path = sys.argv[2] if len(sys.argv) > 2 else "model.pkl"
+    npz_path = sys.argv[3] if len(sys.argv) > 3 else os.path.splitext(pkl_path)[0] + ".npz"
+    arrays = export(pkl_path, npz_path)
+    print(f"Wrote {npz_path}: {len(arrays['roots'])} trees, {len(arrays['feature'])} nodes")
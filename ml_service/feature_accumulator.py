@@ -0,0 +1,249 @@
+"""
+Bounded-cost feature extraction for very long texts.
+
+Texts up to LONG_TEXT_CHARS (default 50k characters) go through
+extract_features unchanged. Longer ones are cut into chunks of about
+CHUNK_CHARS at paragraph (line) boundaries and each chunk is reduced to
+a ChunkStats: word and lexicon counts, all-caps words, ! and ?, sentence
+count and length, and sentiment sums. ChunkStats merge associatively,
+so a document can be streamed chunk by chunk in constant memory (see
+extract_features_stream and predict.py --file), optionally with the
+chunks spread over LONG_TEXT_WORKERS processes. The merged totals are
+fed to the feature registry in place of the whole-text intermediates.
+
+Beyond MAX_TEXT_CHARS (default 1M characters) only an evenly spaced
+sample of chunks (always including the first, which supplies the title
+proxy) is analysed and the totals are scaled up. Those results are
+flagged with "estimated": true and the fraction of the text read.
+
+Chunked results match whole-text extraction for token, lexicon,
+capitalization and punctuation counts. Sentence segmentation and
+sentiment modifiers can differ slightly where a chunk boundary falls
+mid-sentence or mid-phrase.
+"""
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import feature_extractor as fe
+
+LONG_TEXT_CHARS = int(os.environ.get("LONG_TEXT_CHARS", 50000))
+MAX_TEXT_CHARS = int(os.environ.get("MAX_TEXT_CHARS", 1000000))
+CHUNK_CHARS = int(os.environ.get("CHUNK_CHARS", 20000))
+LONG_TEXT_WORKERS = int(os.environ.get("LONG_TEXT_WORKERS", 0))
+
+
+class ChunkStats:
+    """Additive totals for one or more consecutive chunks of a text"""
+
+    # Fields that add up across chunks (and scale with a sample)
+    TOTALS = (
+        "n_words", "capitals", "exclamations", "questions", "n_sentences",
+        "sentence_words", "polarity_sum", "subjectivity_sum", "n_assessments",
+    )
+
+    def __init__(self):
+        self.n_chunks = 0
+        self.n_chars = 0
+        self.n_words = 0
+        self.counts = [0] * len(fe.LEXICONS)
+        self.capitals = 0
+        self.exclamations = 0
+        self.questions = 0
+        self.n_sentences = 0
+        self.sentence_words = 0
+        self.segmented = True
+        self.polarity_sum = 0.0
+        self.subjectivity_sum = 0.0
+        self.n_assessments = 0
+        self.sentiment_ok = True
+        # Title proxy from the first chunk, as the whole-text path derives it
+        self.title_proxy = None
+
+    @classmethod
+    def from_chunk(cls, chunk, phrases=False):
+        stats = cls()
+        stats.n_chunks = 1
+        stats.n_chars = len(chunk)
+
+        tokens = chunk.split()
+        stats.n_words = len(tokens)
+        if phrases:
+            stats.counts, stats.capitals = fe.PHRASE_MATCHER.count(chunk), fe.count_capitals(tokens)
+        else:
+            stats.counts, stats.capitals = fe.scan_tokens(tokens)
+        stats.exclamations = chunk.count("!")
+        stats.questions = chunk.count("?")
+
+        try:
+            sentences = fe.split_sentences(chunk)
+            stats.n_sentences = len(sentences)
+            stats.sentence_words = sum(len(s.split()) for s in sentences)
+        except Exception:
+            sentences = None
+            stats.segmented = False
+        stats.title_proxy = sentences[0] if sentences else chunk[:100]
+
+        try:
+            stats.polarity_sum, stats.subjectivity_sum, stats.n_assessments = (
+                fe.sentiment_backend.analyze_sums(chunk, tokens)
+            )
+        except Exception:
+            stats.sentiment_ok = False
+        return stats
+
+    def merge(self, other):
+        """Fold the stats of the following chunk(s) into self; returns self"""
+        if self.n_chunks == 0:
+            self.title_proxy = other.title_proxy
+        self.n_chunks += other.n_chunks
+        self.n_chars += other.n_chars
+        for name in self.TOTALS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.segmented = self.segmented and other.segmented
+        self.sentiment_ok = self.sentiment_ok and other.sentiment_ok
+        return self
+
+    def scale(self, factor):
+        """Extrapolate sampled totals to the whole text; returns self"""
+        for name in self.TOTALS:
+            setattr(self, name, getattr(self, name) * factor)
+        self.counts = [count * factor for count in self.counts]
+        # Feature values that are plain counts stay whole numbers
+        self.exclamations = round(self.exclamations)
+        self.questions = round(self.questions)
+        return self
+
+    def intermediates(self, scan_name, title=""):
+        """Registry values equivalent to running the whole text at once"""
+        if self.sentiment_ok:
+            n = float(self.n_assessments or 1)
+            sentiment = (self.polarity_sum / n, self.subjectivity_sum / n)
+        else:
+            sentiment = (0.0, 0.5)
+        if title and str(title).strip() != "":
+            title = str(title)
+        else:
+            title = self.title_proxy or ""
+        return {
+            scan_name: (self.counts, self.capitals),
+            "n_words": max(self.n_words, 1),
+            "sentiment": sentiment,
+            "sentence_stats": (self.n_sentences, self.sentence_words) if self.segmented else None,
+            "body_marks": (self.exclamations, self.questions),
+            "title": title,
+        }
+
+
+def iter_chunks(lines, chunk_chars=CHUNK_CHARS):
+    """
+    Group lines into chunks of about chunk_chars. A line longer than that
+    is cut at the last space before the limit.
+    """
+    buf, size = [], 0
+    for line in lines:
+        while len(line) > chunk_chars:
+            cut = line.rfind(" ", 0, chunk_chars)
+            if cut <= 0:
+                cut = chunk_chars
+            if buf:
+                yield "\n".join(buf)
+                buf, size = [], 0
+            yield line[:cut]
+            line = line[cut:]
+        buf.append(line)
+        size += len(line) + 1
+        if size >= chunk_chars:
+            yield "\n".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "\n".join(buf)
+
+
+_pool = None
+_pool_pid = None
+
+
+def _get_pool(workers):
+    # One pool per process, created on first use (safe across gunicorn forks)
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        _pool = ProcessPoolExecutor(workers)
+        _pool_pid = os.getpid()
+    return _pool
+
+
+def _uses_phrases():
+    return any(step.name == "body_phrase_scan" for step in fe.FEATURE_SET.plan)
+
+
+def accumulate(chunks, phrases=False, workers=LONG_TEXT_WORKERS):
+    """Merge ChunkStats over chunks in order, with a bounded number in flight"""
+    total = ChunkStats()
+    if workers <= 1:
+        for chunk in chunks:
+            total.merge(ChunkStats.from_chunk(chunk, phrases))
+        return total
+
+    pool = _get_pool(workers)
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(ChunkStats.from_chunk, chunk, phrases))
+        if len(pending) >= workers * 2:
+            total.merge(pending.popleft().result())
+    while pending:
+        total.merge(pending.popleft().result())
+    return total
+
+
+def extract_features_stream(lines, title="", total_chars=None, timings=None, workers=None):
+    """
+    Features for a text given as an iterable of lines, in constant memory.
+
+    total_chars (when known) decides whether to sample. Returns
+    (features, info); info is None unless the result is an estimate, in
+    which case it is {"estimated": True, "sampled_fraction": ...}.
+    """
+    workers = LONG_TEXT_WORKERS if workers is None else workers
+    chunks = iter_chunks(lines)
+
+    stride = 1
+    if total_chars and total_chars > MAX_TEXT_CHARS:
+        stride = math.ceil(total_chars / MAX_TEXT_CHARS)
+
+    seen_chars = 0
+
+    def sampled():
+        nonlocal seen_chars
+        for i, chunk in enumerate(chunks):
+            seen_chars += len(chunk)
+            if i % stride == 0:
+                yield chunk
+
+    t0 = time.perf_counter()
+    stats = accumulate(sampled(), _uses_phrases(), workers)
+    if timings is not None:
+        timings["chunks"] = timings.get("chunks", 0.0) + time.perf_counter() - t0
+
+    info = None
+    if stride > 1 and stats.n_chars:
+        fraction = stats.n_chars / max(seen_chars, 1)
+        stats.scale(1 / fraction)
+        info = {"estimated": True, "sampled_fraction": round(fraction, 4)}
+
+    scan_name = "body_phrase_scan" if _uses_phrases() else "body_scan"
+    features = fe.FEATURE_SET.extract_from(stats.intermediates(scan_name, title), timings)
+    return features, info
+
+
+def extract_features_bounded(text, title="", timings=None):
+    """
+    extract_features with bounded cost for long inputs.
+    Returns (features, info) like extract_features_stream.
+    """
+    if not isinstance(text, str) or len(text) <= LONG_TEXT_CHARS:
+        return fe.extract_features(text, title, timings), None
+    return extract_features_stream(text.split("\n"), title, len(text), timings)
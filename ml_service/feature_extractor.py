@@ -1,23 +1,37 @@
+import os
+import pickle
 import re
-import nltk
+import time
 import pandas as pd
-from textblob import TextBlob
+from collections import Counter, namedtuple
 
-# Download required NLTK data
-try:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('wordnet')
-    nltk.download('punkt_tab')
-    nltk.download('vader_lexicon')
-except:
-    pass
+from phrase_matcher import PhraseMatcher
+from segmenter import get_segmenter
+from sentiment import get_backend
 
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.sentiment import SentimentIntensityAnalyzer
+# Polarity/subjectivity source (SENTIMENT_BACKEND, see sentiment.py)
+sentiment_backend = get_backend()
 
-sia = SentimentIntensityAnalyzer()
+# Sentence splitter for the title proxy and avg_sentence_length
+# (SEGMENTER, see segmenter.py)
+segmenter = get_segmenter()
+
+# Feature set variant (FEATURE_SET, see FEATURE_SETS below). model.pkl
+# was trained on v1; other variants need a model trained on them.
+FEATURE_SET_NAME = os.environ.get("FEATURE_SET", "v1")
+
+
+def feature_set_version(name):
+    """Feature set plus the backends that shape its values"""
+    version = f"{name}-{sentiment_backend.name}"
+    if segmenter.name != "punkt":
+        version += f"-{segmenter.name}"
+    return version
+
+
+# Bump whenever a word list or feature definition changes; cached
+# predictions are keyed on it
+FEATURE_SET_VERSION = feature_set_version(FEATURE_SET_NAME)
 
 # ============== EXPANDED WORD LISTS (must match training) ==============
 
@@ -74,146 +88,359 @@ objective_words = set([
 ])
 
 
-def extract_features(text, title=""):
+# ============== MERGED LEXICON INDEX ==============
+# Every word list above is folded into one dict that maps a token to the
+# category slots it belongs to, so a document is scanned once instead of
+# once per list. Multi-word entries ("without doubt") are kept as-is; they
+# never match a single whitespace token, exactly like the set lookups did
+# (the v2 feature set's PHRASE_MATCHER does match them).
+
+CERTAINTY, HEDGING, PRONOUN, SENSATIONAL, NEG_EMOTION, POS_EMOTION, OBJECTIVE = range(7)
+
+LEXICONS = (
+    (CERTAINTY, certainty_words),
+    (HEDGING, hedging_words),
+    (PRONOUN, pronoun_words),
+    (SENSATIONAL, sensational_words),
+    (NEG_EMOTION, negative_emotion_words),
+    (POS_EMOTION, positive_emotion_words),
+    (OBJECTIVE, objective_words),
+)
+
+
+def build_lexicon_index(lexicons):
+    """Map each lexicon entry to the tuple of category slots containing it"""
+    index = {}
+    for slot, words in lexicons:
+        for word in words:
+            index[word] = index.get(word, ()) + (slot,)
+    return index
+
+
+LEXICON_INDEX = build_lexicon_index(LEXICONS)
+
+
+def scan_tokens(tokens):
+    """
+    Count lexicon hits and all-caps words over whitespace tokens in one scan.
+
+    Tokens are histogrammed first (in C), so the Python-level loop only
+    visits each distinct token once; repeated words are weighted by count.
+
+    Returns (category_counts, capital_count) where category_counts is
+    indexed by the slot constants above.
+    """
+    counts = [0] * len(LEXICONS)
+    capital_count = 0
+    lookup = LEXICON_INDEX.get
+    for token, n in Counter(tokens).items():
+        if len(token) > 1 and token.isupper():
+            capital_count += n
+        slots = lookup(token.lower())
+        if slots:
+            for slot in slots:
+                counts[slot] += n
+    return counts, capital_count
+
+
+def count_capitals(tokens):
+    """All-caps words of two or more characters, as scan_tokens counts them"""
+    return sum(1 for token in tokens if len(token) > 1 and token.isupper())
+
+
+# Phrase-aware alternative to scan_tokens: matches multi-word entries and
+# words with attached punctuation in one pass (see phrase_matcher.py)
+PHRASE_MATCHER = PhraseMatcher(LEXICONS)
+
+
+def split_sentences(text):
     """
-    Extract 18 features from text and title.
-    Must match training exactly in fake_news_detection.py
-    
-    Returns list of features in this order:
-    0.  certainty_ratio
-    1.  hedging_ratio
-    2.  emotion_ratio
-    3.  subjectivity
-    4.  polarity
-    5.  avg_sentence_length
-    6.  pronoun_ratio
-    7.  sensational_ratio_title
-    8.  sensational_ratio_body
-    9.  headline_exclamations
-    10. headline_questions
-    11. capital_word_ratio_title
-    12. capital_word_ratio_body
-    13. neg_emotion_ratio
-    14. pos_emotion_ratio
-    15. objective_ratio
-    16. body_exclamations
-    17. body_questions
+    Sentences of text from the configured segmenter (Punkt by default,
+    with its data resolved locally on first use). Raises LookupError when
+    the data is unavailable so callers fall back.
     """
-    if pd.isna(text) or text == "":
-        return [0] * 18
-
-    text = str(text)
-    
-    # ----- Title proxy logic -----
-    # When no title is provided, use first sentence as proxy
-    if not title or str(title).strip() == "":
-        try:
-            sentences = nltk.sent_tokenize(text)
-            title = sentences[0] if sentences else text[:100]
-        except:
-            title = text[:100]
-    else:
-        title = str(title)
-
-    # Lowercase versions for word matching
-    text_lower = text.lower()
-    title_lower = title.lower()
-
-    words = text_lower.split()
-    title_words = title_lower.split()
-    total_words = max(len(words), 1)
-    total_title_words = max(len(title_words), 1)
-
-    # ---- FEATURE 1: Certainty ratio (body) ----
-    certainty_count = sum(1 for w in words if w in certainty_words)
-    certainty_ratio = certainty_count / total_words
-
-    # ---- FEATURE 2: Hedging ratio (body) ----
-    hedging_count = sum(1 for w in words if w in hedging_words)
-    hedging_ratio = hedging_count / total_words
-
-    # ---- FEATURE 3 & 4: TextBlob emotion & subjectivity (body) ----
+    return segmenter.split(text)
+
+
+# ============== FEATURE REGISTRY ==============
+# Each feature declares the shared intermediates it reads (tokens,
+# sentences, title, lexicon scans, sentiment) and a compute function over
+# them. A FeatureSet resolves those dependencies into an evaluation plan
+# once, so extraction computes every intermediate a document needs exactly
+# once and skips the ones no feature in the set uses.
+
+# stage groups steps for the per-stage timers (see FeatureSet.extract)
+Intermediate = namedtuple("Intermediate", ["name", "requires", "compute", "stage"])
+Feature = namedtuple("Feature", ["name", "requires", "compute", "stage"], defaults=("features",))
+
+# Seeded per document by FeatureSet.extract
+INPUTS = ("text", "raw_title")
+
+INTERMEDIATES = {}
+
+
+def intermediate(name, *requires, stage=None):
+    """Register fn as the producer of a named intermediate"""
+    def register(fn):
+        INTERMEDIATES[name] = Intermediate(name, requires, fn, stage or name)
+        return fn
+    return register
+
+
+@intermediate("sentences", "text", stage="sentence_tokenize")
+def _sentences(text):
+    """Punkt sentences, or None when segmentation is unavailable"""
     try:
-        blob = TextBlob(text)
-        emotion_ratio = (blob.sentiment.polarity + 1) / 2
-        subjectivity = blob.sentiment.subjectivity
-        polarity = blob.sentiment.polarity
-    except:
-        emotion_ratio = 0.5
-        subjectivity = 0.5
-        polarity = 0.0
-
-    # ---- FEATURE 5: Average sentence length (body) ----
+        return split_sentences(text)
+    except Exception:
+        return None
+
+
+@intermediate("title", "text", "raw_title", "sentences", stage="title_proxy")
+def _title(text, raw_title, sentences):
+    """The given title, else the first sentence as a proxy"""
+    if raw_title and str(raw_title).strip() != "":
+        return str(raw_title)
+    return sentences[0] if sentences else text[:100]
+
+
+@intermediate("tokens", "text", stage="tokenize")
+def _tokens(text):
+    # Lowercasing happens per distinct token inside scan_tokens
+    return text.split()
+
+
+@intermediate("title_tokens", "title", stage="tokenize")
+def _title_tokens(title):
+    return title.split()
+
+
+@intermediate("n_words", "tokens", stage="tokenize")
+def _n_words(tokens):
+    return max(len(tokens), 1)
+
+
+@intermediate("n_title_words", "title_tokens", stage="tokenize")
+def _n_title_words(title_tokens):
+    return max(len(title_tokens), 1)
+
+
+@intermediate("body_scan", "tokens", stage="lexicon")
+def _body_scan(tokens):
+    return scan_tokens(tokens)
+
+
+@intermediate("title_scan", "title_tokens", stage="lexicon")
+def _title_scan(title_tokens):
+    return scan_tokens(title_tokens)
+
+
+@intermediate("body_phrase_scan", "text", "tokens", stage="lexicon")
+def _body_phrase_scan(text, tokens):
+    """Same shape as body_scan, with phrase-aware lexicon counts"""
+    return PHRASE_MATCHER.count(text), count_capitals(tokens)
+
+
+@intermediate("title_phrase_scan", "title", "title_tokens", stage="lexicon")
+def _title_phrase_scan(title, title_tokens):
+    return PHRASE_MATCHER.count(title), count_capitals(title_tokens)
+
+
+@intermediate("sentence_stats", "sentences", stage="sentence_length")
+def _sentence_stats(sentences):
+    """(sentence count, words in sentences), or None without segmentation"""
+    if sentences is None:
+        return None
+    return len(sentences), sum(len(s.split()) for s in sentences)
+
+
+@intermediate("body_marks", "text", stage="features")
+def _body_marks(text):
+    return text.count("!"), text.count("?")
+
+
+@intermediate("sentiment", "text", "tokens")
+def _sentiment(text, tokens):
+    """(polarity, subjectivity); neutral when the backend fails"""
     try:
-        sentences = nltk.sent_tokenize(text)
-        avg_sentence_length = sum(len(s.split()) for s in sentences) / max(len(sentences), 1)
-    except:
-        avg_sentence_length = 15.0
-
-    # ---- FEATURE 6: Pronoun ratio (body) ----
-    pronoun_count = sum(1 for w in words if w in pronoun_words)
-    pronoun_ratio = pronoun_count / total_words
-
-    # ---- FEATURE 7: Sensational ratio (TITLE) ----
-    sensational_count_title = sum(1 for w in title_words if w in sensational_words)
-    sensational_ratio_title = sensational_count_title / total_title_words
-
-    # ---- FEATURE 8: Sensational ratio (BODY) ----
-    sensational_count_body = sum(1 for w in words if w in sensational_words)
-    sensational_ratio_body = sensational_count_body / total_words
-
-    # ---- FEATURE 9: Headline exclamations ----
-    headline_exclamations = title.count("!")
-
-    # ---- FEATURE 10: Headline questions ----
-    headline_questions = title.count("?")
-
-    # ---- FEATURE 11: Capital word ratio (TITLE) ----
-    capital_count_title = sum(1 for w in title.split() if w.isupper() and len(w) > 1)
-    capital_word_ratio_title = capital_count_title / total_title_words
-
-    # ---- FEATURE 12: Capital word ratio (BODY) ----
-    capital_count_body = sum(1 for w in text.split() if w.isupper() and len(w) > 1)
-    capital_word_ratio_body = capital_count_body / total_words
-
-    # ---- FEATURE 13: Negative emotion word ratio (body) ----
-    neg_emotion_count = sum(1 for w in words if w in negative_emotion_words)
-    neg_emotion_ratio = neg_emotion_count / total_words
-
-    # ---- FEATURE 14: Positive emotion word ratio (body) ----
-    pos_emotion_count = sum(1 for w in words if w in positive_emotion_words)
-    pos_emotion_ratio = pos_emotion_count / total_words
-
-    # ---- FEATURE 15: Objective language ratio (body) ----
-    objective_count = sum(1 for w in words if w in objective_words)
-    objective_ratio = objective_count / total_words
-
-    # ---- FEATURE 16: Exclamation marks in body ----
-    body_exclamations = text.count("!")
-
-    # ---- FEATURE 17: Question marks in body ----
-    body_questions = text.count("?")
-
-    return [
-        certainty_ratio,           # 0
-        hedging_ratio,             # 1
-        emotion_ratio,             # 2
-        subjectivity,              # 3
-        polarity,                  # 4
-        avg_sentence_length,       # 5
-        pronoun_ratio,             # 6
-        sensational_ratio_title,  # 7
-        sensational_ratio_body,   # 8
-        headline_exclamations,    # 9
-        headline_questions,        # 10
-        capital_word_ratio_title, # 11
-        capital_word_ratio_body,  # 12
-        neg_emotion_ratio,         # 13
-        pos_emotion_ratio,         # 14
-        objective_ratio,           # 15
-        body_exclamations,         # 16
-        body_questions,            # 17
-    ]
+        return sentiment_backend.analyze(text, tokens)
+    except Exception:
+        return 0.0, 0.5
+
+
+def _ratio(slot):
+    return lambda scan, n_words: scan[0][slot] / n_words
+
+
+def _avg_sentence_length(sentence_stats):
+    if sentence_stats is None:
+        return 15.0
+    n_sentences, n_words = sentence_stats
+    return n_words / max(n_sentences, 1)
+
+
+# Training column order (see feature_cols.pkl)
+FEATURES = (
+    Feature("certainty_ratio", ("body_scan", "n_words"), _ratio(CERTAINTY)),
+    Feature("hedging_ratio", ("body_scan", "n_words"), _ratio(HEDGING)),
+    Feature("emotion_ratio", ("sentiment",), lambda sentiment: (sentiment[0] + 1) / 2),
+    Feature("subjectivity", ("sentiment",), lambda sentiment: sentiment[1]),
+    Feature("polarity", ("sentiment",), lambda sentiment: sentiment[0]),
+    Feature("avg_sentence_length", ("sentence_stats",), _avg_sentence_length, "sentence_length"),
+    Feature("pronoun_ratio", ("body_scan", "n_words"), _ratio(PRONOUN)),
+    Feature("sensational_ratio_title", ("title_scan", "n_title_words"), _ratio(SENSATIONAL)),
+    Feature("sensational_ratio_body", ("body_scan", "n_words"), _ratio(SENSATIONAL)),
+    Feature("headline_exclamations", ("title",), lambda title: title.count("!")),
+    Feature("headline_questions", ("title",), lambda title: title.count("?")),
+    Feature("capital_word_ratio_title", ("title_scan", "n_title_words"), lambda scan, n: scan[1] / n),
+    Feature("capital_word_ratio_body", ("body_scan", "n_words"), lambda scan, n: scan[1] / n),
+    Feature("neg_emotion_ratio", ("body_scan", "n_words"), _ratio(NEG_EMOTION)),
+    Feature("pos_emotion_ratio", ("body_scan", "n_words"), _ratio(POS_EMOTION)),
+    Feature("objective_ratio", ("body_scan", "n_words"), _ratio(OBJECTIVE)),
+    Feature("body_exclamations", ("body_marks",), lambda marks: marks[0]),
+    Feature("body_questions", ("body_marks",), lambda marks: marks[1]),
+)
+
+
+class FeatureSet:
+    """An ordered, versioned list of features and the plan that computes them"""
+
+    def __init__(self, version, features):
+        self.version = version
+        self.features = tuple(features)
+        self.names = [feature.name for feature in self.features]
+        self._plans = {}
+        self.plan = self.plan_for(INPUTS)
+
+    def plan_for(self, provided):
+        """
+        Topologically ordered intermediates the features need, given the
+        names whose values are supplied up front (by default the raw
+        inputs). Anything reachable only through a provided name is skipped.
+        """
+        provided = frozenset(provided)
+        if provided in self._plans:
+            return self._plans[provided]
+
+        plan, done = [], set(provided)
+
+        def visit(name, path):
+            if name in done:
+                return
+            if name in path:
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + (name,))}")
+            if name not in INTERMEDIATES:
+                raise KeyError(f"Intermediate {name!r} is neither provided nor registered")
+            step = INTERMEDIATES[name]
+            for dep in step.requires:
+                visit(dep, path + (name,))
+            done.add(name)
+            plan.append(step)
+
+        for feature in self.features:
+            for dep in feature.requires:
+                visit(dep, (feature.name,))
+        self._plans[provided] = tuple(plan)
+        return self._plans[provided]
+
+    def extract(self, text, title="", timings=None):
+        """
+        Feature values for one document, in self.names order.
+
+        When a timings dict is passed, seconds spent per stage
+        (sentence_tokenize, lexicon, sentiment, ...) are added to it.
+        """
+        if pd.isna(text) or text == "":
+            return [0] * len(self.features)
+        return self.compute({"text": str(text), "raw_title": title}, self.plan, timings)
+
+    def extract_from(self, values, timings=None):
+        """Feature values from precomputed intermediates (e.g. merged chunk stats)"""
+        return self.compute(dict(values), self.plan_for(values), timings)
+
+    def compute(self, values, plan, timings=None):
+        """Run plan over values (filled in place) and evaluate every feature"""
+        if timings is None:
+            for step in plan:
+                values[step.name] = step.compute(*[values[dep] for dep in step.requires])
+            return [
+                feature.compute(*[values[dep] for dep in feature.requires])
+                for feature in self.features
+            ]
+
+        clock = time.perf_counter
+        for step in plan:
+            t0 = clock()
+            values[step.name] = step.compute(*[values[dep] for dep in step.requires])
+            timings[step.stage] = timings.get(step.stage, 0.0) + clock() - t0
+        result = []
+        for feature in self.features:
+            t0 = clock()
+            result.append(feature.compute(*[values[dep] for dep in feature.requires]))
+            timings[feature.stage] = timings.get(feature.stage, 0.0) + clock() - t0
+        return result
+
+
+# v2: the v1 features with lexicon hits from the phrase matcher
+# ("without doubt", "said to", "shocking!") instead of whole-token lookups
+PHRASE_SCANS = {"body_scan": "body_phrase_scan", "title_scan": "title_phrase_scan"}
+PHRASE_FEATURES = tuple(
+    f._replace(requires=tuple(PHRASE_SCANS.get(dep, dep) for dep in f.requires))
+    for f in FEATURES
+)
+
+FEATURE_SETS = {
+    "v1": FEATURES,
+    "v2": PHRASE_FEATURES,
+}
+
+
+def get_feature_set(name=None):
+    """Build the feature set named by name or FEATURE_SET (default: v1)"""
+    name = name or FEATURE_SET_NAME
+    if name not in FEATURE_SETS:
+        raise ValueError(f"Unknown feature set {name!r}; choose from {sorted(FEATURE_SETS)}")
+    return FeatureSet(feature_set_version(name), FEATURE_SETS[name])
+
+
+FEATURE_SET = get_feature_set()
+FEATURE_NAMES = FEATURE_SET.names
+
+FEATURE_COLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_cols.pkl")
+
+
+def verify_feature_order(model=None, cols_path=FEATURE_COLS_PATH):
+    """
+    Check FEATURE_NAMES against the training column order: feature_cols.pkl
+    (when present) and the names recorded on the model. Meant to run once
+    when the model is loaded; raises ValueError on any mismatch.
+    """
+    expected = {}
+    if cols_path and os.path.exists(cols_path):
+        with open(cols_path, "rb") as f:
+            expected[os.path.basename(cols_path)] = [str(name) for name in pickle.load(f)]
+
+    # sklearn Pipeline / estimator, or CompiledModel
+    names = getattr(model, "feature_names_in_", None)
+    if names is None:
+        names = getattr(model, "feature_names", None)
+    if names is not None and len(names):
+        expected["model"] = [str(name) for name in names]
+
+    for source, columns in expected.items():
+        if columns != FEATURE_NAMES:
+            raise ValueError(
+                f"Feature order mismatch with {source}: expected {columns}, "
+                f"extractor produces {FEATURE_NAMES}"
+            )
+
+
+def extract_features(text, title="", timings=None):
+    """
+    Extract the 18 model features from text and title, in FEATURE_NAMES
+    order. train.py trains on exactly this function.
+    """
+    return FEATURE_SET.extract(text, title, timings)
 
 
 # For backwards compatibility
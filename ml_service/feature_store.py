@@ -0,0 +1,120 @@
+"""
+Columnar on-disk cache of extracted feature vectors, for training.
+
+    feature_store/
+        v1-textblob/                 one directory per feature-set version
+            part-00000/
+                keys.npy             S32 text hashes (sha256 of title + text)
+                certainty_ratio.npy  one float64 column per feature
+                ...
+            part-00001/
+                ...
+
+Each training run that computes new rows appends them as a new part, so
+re-runs and hyperparameter sweeps only extract features for rows whose
+title or text changed. Columns are plain .npy files, memory-mapped on
+load. A change to the extractor that alters values must come with a new
+feature-set version (FEATURE_SET / sentiment backend), which starts a
+fresh directory; `python train.py --refresh-features` rebuilds one.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+from feature_extractor import FEATURE_SET
+
+
+def text_key(text, title=""):
+    """128-bit hex key of one (title, text) pair"""
+    digest = hashlib.sha256()
+    digest.update(str(title or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(str(text).encode("utf-8"))
+    return digest.hexdigest()[:32].encode("ascii")
+
+
+class FeatureStore:
+    def __init__(self, root, feature_set=FEATURE_SET):
+        self.dir = os.path.join(root, feature_set.version)
+        self.names = list(feature_set.names)
+        self._parts = []   # [{name: column}, ...]
+        self._index = {}   # key -> (part, row)
+        self._load()
+
+    def _load(self):
+        if not os.path.isdir(self.dir):
+            return
+        for name in sorted(os.listdir(self.dir)):
+            part_dir = os.path.join(self.dir, name)
+            if not name.startswith("part-") or not os.path.isdir(part_dir):
+                continue
+            with open(os.path.join(part_dir, "columns.json"), encoding="utf-8") as f:
+                if json.load(f) != self.names:
+                    raise ValueError(f"{part_dir} holds different feature columns; use a new feature-set version")
+            keys = np.load(os.path.join(part_dir, "keys.npy"))
+            columns = {col: np.load(os.path.join(part_dir, f"{col}.npy"), mmap_mode="r") for col in self.names}
+            part = len(self._parts)
+            self._parts.append(columns)
+            for row, key in enumerate(keys.tolist()):
+                self._index[key] = (part, row)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def missing(self, keys):
+        """Distinct keys without stored features, in first-seen order"""
+        return [key for key in dict.fromkeys(keys) if key not in self._index]
+
+    def matrix(self, keys):
+        """(len(keys), n_features) float64 matrix; every key must be stored"""
+        X = np.empty((len(keys), len(self.names)), dtype=np.float64)
+        by_part = {}
+        for i, key in enumerate(keys):
+            part, row = self._index[key]
+            by_part.setdefault(part, ([], []))
+            by_part[part][0].append(i)
+            by_part[part][1].append(row)
+        # One gather per part and column
+        for part, (positions, rows) in by_part.items():
+            columns = self._parts[part]
+            for j, col in enumerate(self.names):
+                X[positions, j] = columns[col][rows]
+        return X
+
+    def append(self, keys, rows):
+        """Store feature rows (n_features values each) for keys as a new part"""
+        if not keys:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        part = len(self._parts)
+        while os.path.exists(os.path.join(self.dir, f"part-{part:05d}")):
+            part += 1
+        final = os.path.join(self.dir, f"part-{part:05d}")
+        tmp = final + ".tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        X = np.asarray(rows, dtype=np.float64).reshape(len(keys), len(self.names))
+        np.save(os.path.join(tmp, "keys.npy"), np.array(keys, dtype="S32"))
+        for j, col in enumerate(self.names):
+            np.save(os.path.join(tmp, f"{col}.npy"), np.ascontiguousarray(X[:, j]))
+        with open(os.path.join(tmp, "columns.json"), "w", encoding="utf-8") as f:
+            json.dump(self.names, f)
+        # A part appears complete or not at all
+        os.replace(tmp, final)
+
+        columns = {col: X[:, j].copy() for j, col in enumerate(self.names)}
+        index = len(self._parts)
+        self._parts.append(columns)
+        for row, key in enumerate(keys):
+            self._index[key] = (index, row)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self._parts, self._index = [], {}
@@ -0,0 +1,58 @@
+"""
+Production gunicorn settings for the ML service.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+preload_app imports the app (model.pkl / model.npz, sentiment lexicon,
+Punkt parameters) once in the master before forking, so workers share
+those pages copy-on-write instead of each loading its own copy. The GC
+is frozen right before forking so collections in the workers don't
+touch (and copy) the preloaded objects.
+
+Everything is tunable from the environment:
+
+    WEB_CONCURRENCY      worker processes (default: CPU count)
+    GUNICORN_THREADS     threads per worker (default: 8; concurrent requests
+                         in one worker share micro-batches)
+    GUNICORN_TIMEOUT     seconds before a silent worker is killed and
+                         restarted (default: 60)
+    GUNICORN_GRACEFUL_TIMEOUT
+                         seconds workers get to finish in-flight
+                         requests on reload/shutdown (default: 30)
+    GUNICORN_MAX_REQUESTS
+                         recycle a worker after this many requests,
+                         0 disables (default: 0)
+    PORT                 listen port (default: 5000)
+
+Graceful reloads: `kill -HUP <master>` starts fresh workers from the
+preloaded app and retires the old ones once their requests finish. To
+pick up new code, `kill -USR2 <master>` starts a new master alongside the
+old one; then `kill -TERM <old master>`.
+"""
+import gc
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+bind = f"0.0.0.0:{_env_int('PORT', 5000)}"
+workers = _env_int("WEB_CONCURRENCY", multiprocessing.cpu_count())
+threads = _env_int("GUNICORN_THREADS", 8)
+worker_class = "gthread"
+timeout = _env_int("GUNICORN_TIMEOUT", 60)
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 30)
+keepalive = 5
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 0)
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+accesslog = "-"
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far into the permanent generation so the
+    # workers' collections leave those pages shared
+    gc.freeze()
@@ -0,0 +1,149 @@
+"""
+Adaptive micro-batching for single-item requests.
+
+Request threads call submit(item) and block; one background thread
+drains the queue into batches, runs the batch function once per batch
+and hands each caller its own result. A batch closes when it reaches the
+current batch size or when the collection window since its first item
+runs out, whichever comes first.
+
+Both limits adapt to load:
+
+- window: shrinks (halves, then drops to min_window) when a batch closes
+  with a single item, since nobody else was coming and the wait was pure
+  latency; grows (x1.5 from at least max_window/10, up to max_window)
+  when several requests arrived, so concurrent traffic coalesces better.
+  With the default min_window of 0 an idle service adds only the thread
+  handoff (tens of microseconds) to each request.
+- batch size: doubles (up to max_batch_size) when a batch fills before
+  its window ends; halves when running a batch took longer than
+  batch_budget seconds, to cap the latency one batch adds for the
+  callers queued behind it.
+
+The worker thread starts on first use in each process, so the batcher is
+safe to build before gunicorn forks its workers.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    def __init__(self, fn, max_batch_size=64, min_window=0.0, max_window=0.01,
+                 batch_budget=0.05, on_batch=None):
+        """
+        fn(items) -> results must return one result per item, in order.
+        on_batch(size, queue_waits), if given, is called after every batch.
+        """
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.min_window = min_window
+        self.max_window = max_window
+        self.batch_budget = batch_budget
+        self.on_batch = on_batch
+
+        self.window = min_window
+        self.batch_size = min(8, max_batch_size)
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._pid = None
+        self.batches = 0
+        self.items = 0
+
+    @classmethod
+    def from_env(cls, fn, on_batch=None):
+        """Build from MICRO_BATCH_* settings; None when MICRO_BATCH=0"""
+        if os.environ.get("MICRO_BATCH", "1") == "0":
+            return None
+        return cls(
+            fn,
+            max_batch_size=int(os.environ.get("MICRO_BATCH_MAX_SIZE", 64)),
+            min_window=float(os.environ.get("MICRO_BATCH_MIN_WINDOW_MS", 0)) / 1000,
+            max_window=float(os.environ.get("MICRO_BATCH_MAX_WINDOW_MS", 10)) / 1000,
+            batch_budget=float(os.environ.get("MICRO_BATCH_BUDGET_MS", 50)) / 1000,
+            on_batch=on_batch,
+        )
+
+    def _ensure_started(self):
+        # Threads don't survive fork; start one per process on first use
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._queue.clear()
+                    thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    thread.start()
+                    self._pid = os.getpid()
+
+    def submit(self, item, timeout=None):
+        """Queue item and wait for its result (exceptions from fn are re-raised)"""
+        self._ensure_started()
+        future = Future()
+        with self._cond:
+            self._queue.append((item, future, time.perf_counter()))
+            self._cond.notify()
+        return future.result(timeout)
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    def _collect(self):
+        """Block until a batch is ready; returns [(item, future, enqueued_at), ...]"""
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = time.perf_counter() + self.window
+            while len(self._queue) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _adapt(self, size, elapsed):
+        if size >= self.batch_size:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+        elif size == 1:
+            self.window /= 2
+            if self.window < self.max_window / 10:
+                self.window = self.min_window
+        else:
+            self.window = min(self.max_window, max(self.window * 1.5, self.max_window / 10))
+        if elapsed > self.batch_budget and self.batch_size > 1:
+            self.batch_size = max(1, self.batch_size // 2)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            waits = [started - enqueued_at for _, _, enqueued_at in batch]
+            try:
+                results = self.fn([item for item, _, _ in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError("Batch function returned the wrong number of results")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
+            self._adapt(len(batch), time.perf_counter() - started)
+            if self.on_batch:
+                self.on_batch(len(batch), waits)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "batch_size_limit": self.batch_size,
+            "window_ms": round(self.window * 1000, 3),
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
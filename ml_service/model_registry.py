@@ -0,0 +1,304 @@
+"""
+Versioned model registry with background hot-reload.
+
+Layout (MODEL_REGISTRY, default ml_service/models/):
+
+    models/
+        ACTIVE                  name of the version to serve
+        2024-06-01-gb200/
+            model.pkl
+            model.npz           compiled copy (optional, see compiled_model.py)
+            metadata.json       version, checksum, feature_names, trained_at, ...
+
+Publish and activate from the command line:
+
+    python model_registry.py publish model.pkl [--version NAME] [--trained-at DATE] [--activate]
+    python model_registry.py activate NAME
+    python model_registry.py list
+
+ModelManager serves one ActiveModel at a time. A watcher thread polls
+ACTIVE every MODEL_POLL_SECONDS; when it names a new version, the model is
+loaded in the background, checked against its metadata (checksum, feature
+order), warmed with a canary prediction and only then swapped in with a
+single reference assignment. Requests take one reference to the active
+model and use it throughout, so in-flight requests finish on the version
+they started with and nothing is dropped. A version that fails to load or
+warm is reported on /health and the current one keeps serving; it is not
+retried, so publish the fix under a new version name.
+
+Without a registry directory the service falls back to the single
+MODEL_PATH pickle, as before.
+"""
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from compiled_model import CompiledModel, export, file_checksum, load_model
+from feature_extractor import FEATURE_NAMES, extract_features, verify_feature_order
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ACTIVE_FILE = "ACTIVE"
+METADATA_FILE = "metadata.json"
+
+CANARY_TEXT = (
+    "Officials confirmed on Tuesday that the new water treatment plant will open "
+    "next month, according to a statement from the city council."
+)
+
+ActiveModel = namedtuple("ActiveModel", ["model", "version", "checksum", "metadata", "loaded_at"])
+
+
+def canary(model):
+    """Score CANARY_TEXT once; raises if the model's output looks wrong"""
+    row = [extract_features(CANARY_TEXT, "")]
+    if isinstance(model, CompiledModel):
+        X = row
+    else:
+        import pandas as pd
+        X = pd.DataFrame(row, columns=FEATURE_NAMES)
+    proba = model.predict_proba(X)
+    if proba.shape != (1, len(model.classes_)):
+        raise ValueError(f"Canary returned shape {proba.shape}")
+    if not all(math.isfinite(p) for p in proba[0]) or abs(sum(proba[0]) - 1.0) > 1e-6:
+        raise ValueError(f"Canary returned invalid probabilities {proba[0].tolist()}")
+    return proba[0]
+
+
+class ModelRegistry:
+    """The versioned artifact directory"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def exists(self):
+        return os.path.isdir(self.root) and bool(self.versions())
+
+    def versions(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, METADATA_FILE))
+        )
+
+    def metadata(self, version):
+        with open(os.path.join(self.root, version, METADATA_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def active_version(self):
+        """Version named by ACTIVE, else the newest published one"""
+        try:
+            with open(os.path.join(self.root, ACTIVE_FILE), encoding="utf-8") as f:
+                name = f.read().strip()
+            if name:
+                return name
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def activate(self, version):
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version {version!r}")
+        tmp = os.path.join(self.root, ACTIVE_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version + "\n")
+        os.replace(tmp, os.path.join(self.root, ACTIVE_FILE))
+
+    def publish(self, pkl_path, version=None, trained_at=None, compile_npz=True, extra=None):
+        """Copy a trained pickle into a new version directory with metadata"""
+        checksum = file_checksum(pkl_path)
+        if trained_at is None:
+            mtime = os.path.getmtime(pkl_path)
+            trained_at = datetime.fromtimestamp(mtime, timezone.utc).isoformat(timespec="seconds")
+        version = version or f"{trained_at[:10]}-{checksum[:8]}"
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f"Model version {version!r} already exists")
+
+        os.makedirs(target)
+        shutil.copyfile(pkl_path, os.path.join(target, "model.pkl"))
+        # No model.npz yet, so this loads (and checks) the pickle itself
+        model, _ = load_model(os.path.join(target, "model.pkl"))
+        verify_feature_order(model)
+        if compile_npz:
+            try:
+                export(os.path.join(target, "model.pkl"), os.path.join(target, "model.npz"))
+            except Exception as e:
+                print(f"Not compiling {version}: {e}", file=sys.stderr)
+
+        metadata = {
+            "version": version,
+            "checksum": checksum,
+            "feature_names": list(FEATURE_NAMES),
+            "trained_at": trained_at,
+            "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            **(extra or {}),
+        }
+        with open(os.path.join(target, METADATA_FILE), "w", encoding="utf-8") as f:
+            json.dump(metadata, f, indent=2)
+        return metadata
+
+    def load(self, version):
+        """Load and validate one version; returns an ActiveModel"""
+        metadata = self.metadata(version)
+        pkl_path = os.path.join(self.root, version, "model.pkl")
+        if file_checksum(pkl_path) != metadata["checksum"]:
+            raise ValueError(f"Checksum mismatch for model version {version!r}")
+        if metadata.get("feature_names") != FEATURE_NAMES:
+            raise ValueError(f"Model version {version!r} was trained on a different feature list")
+        model, checksum = load_model(pkl_path)
+        verify_feature_order(model, cols_path=None)
+        return ActiveModel(model, version, checksum, metadata, time.time())
+
+
+class ModelManager:
+    """Holds the active model and swaps in new registry versions"""
+
+    def __init__(self, registry, legacy_path, poll_seconds=10.0):
+        self.registry = registry
+        self.legacy_path = legacy_path
+        self.poll_seconds = poll_seconds
+        self.active = None
+        self.last_error = None
+        self.failed_version = None
+        self.last_check = None
+        self.swaps = 0
+        self._lock = threading.Lock()
+        self._watcher_pid = None
+
+    @classmethod
+    def from_env(cls, legacy_path):
+        root = os.environ.get("MODEL_REGISTRY", os.path.join(BASE_DIR, "models"))
+        return cls(
+            ModelRegistry(root),
+            legacy_path,
+            poll_seconds=float(os.environ.get("MODEL_POLL_SECONDS", 10)),
+        )
+
+    def _load_target(self):
+        if self.registry.exists():
+            return self.registry.load(self.registry.active_version())
+        model, checksum = load_model(self.legacy_path)
+        verify_feature_order(model)
+        return ActiveModel(model, checksum, checksum, {"source": self.legacy_path}, time.time())
+
+    def wanted_version(self):
+        if self.registry.exists():
+            return self.registry.active_version()
+        return None
+
+    def refresh(self):
+        """
+        Load, warm and swap in the wanted version if it isn't active yet.
+        Returns True when a new model was swapped in.
+        """
+        with self._lock:
+            self.last_check = time.time()
+            active = self.active
+            wanted = self.wanted_version()
+            if active is not None and (wanted is None or wanted == active.version):
+                return False
+            # A broken version is tried once, not on every poll; publish a fix under a new name
+            if active is not None and wanted == self.failed_version:
+                return False
+            try:
+                candidate = self._load_target()
+                canary(candidate.model)
+            except Exception as e:
+                self.last_error = f"{wanted or self.legacy_path}: {e}"
+                self.failed_version = wanted
+                if active is None:
+                    raise
+                print(f"Keeping model {active.version}; could not load {self.last_error}", file=sys.stderr)
+                return False
+            # Single reference assignment: readers see the old or the new model, never a mix
+            self.active = candidate
+            self.last_error = None
+            self.swaps += 1
+            return True
+
+    def maybe_refresh(self):
+        """refresh() at most once per poll interval; for loops without a watcher thread"""
+        if self.last_check is None or time.time() - self.last_check >= self.poll_seconds:
+            return self.refresh()
+        return False
+
+    def ensure_watcher(self):
+        """Start the polling thread once per process (threads don't survive fork)"""
+        if self.poll_seconds <= 0 or self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name="model-watcher", daemon=True).start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                if self.refresh():
+                    print(f"Now serving model {self.active.version}", file=sys.stderr)
+            except Exception as e:
+                print(f"Model reload failed: {e}", file=sys.stderr)
+
+    def status(self):
+        active = self.active
+        return {
+            "active_version": active.version if active else None,
+            "checksum": active.checksum if active else None,
+            "metadata": active.metadata if active else None,
+            "loaded_at": active.loaded_at if active else None,
+            "registry": self.registry.root if self.registry.exists() else None,
+            "available_versions": self.registry.versions(),
+            "swaps": self.swaps,
+            "last_check": self.last_check,
+            "last_error": self.last_error,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY", os.path.join(BASE_DIR, "models")))
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    publish = sub.add_parser("publish", help="add a trained model.pkl as a new version")
+    publish.add_argument("pkl")
+    publish.add_argument("--version")
+    publish.add_argument("--trained-at", help="ISO date (default: the file's mtime)")
+    publish.add_argument("--no-compile", action="store_true", help="skip exporting model.npz")
+    publish.add_argument("--activate", action="store_true")
+
+    activate = sub.add_parser("activate", help="serve a published version")
+    activate.add_argument("version")
+
+    sub.add_parser("list", help="show published versions")
+
+    args = parser.parse_args(argv)
+    registry = ModelRegistry(args.registry)
+
+    if args.command == "publish":
+        metadata = registry.publish(args.pkl, args.version, args.trained_at, not args.no_compile)
+        print(json.dumps(metadata, indent=2))
+        if args.activate:
+            registry.activate(metadata["version"])
+            print(f"Activated {metadata['version']}")
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Activated {args.version}")
+    else:
+        active = registry.active_version()
+        for version in registry.versions():
+            metadata = registry.metadata(version)
+            marker = "*" if version == active else " "
+            print(f"{marker} {version}  trained {metadata.get('trained_at')}  sha256 {metadata['checksum'][:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
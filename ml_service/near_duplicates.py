@@ -0,0 +1,222 @@
+"""
+Near-duplicate index: reuse the prediction of a recent, almost identical
+article.
+
+Syndicated and lightly edited copies of a story (another byline, a
+reworded headline, trailing boilerplate) miss the exact-text cache. Each
+text is reduced to a MinHash signature over its word shingles (runs of
+NEAR_DUP_SHINGLE words, lowercased, punctuation stripped); locality-
+sensitive hashing over bands of the signature finds candidate matches in
+constant time, and a candidate is reused only when the signatures agree
+on at least NEAR_DUP_THRESHOLD of their slots (the estimated Jaccard
+similarity of the shingle sets). Hits report that similarity in the
+response as "near_duplicate".
+
+The index is in-process, bounded to NEAR_DUP_SIZE entries (least
+recently used are evicted first) with a TTL, and entries only match
+requests for the same model and feature-set version. Texts shorter than
+NEAR_DUP_MIN_WORDS are never matched: a couple of changed words would
+flip their similarity anyway. Signatures cover the first
+NEAR_DUP_MAX_CHARS characters, so very long texts cost no more to hash
+than that. Off unless NEAR_DUP=1.
+"""
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from phrase_matcher import words
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+SHINGLE_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+# Shingles hashed per block, to bound the (num_perm x shingles) matrix
+BLOCK = 2048
+
+
+def band_layout(num_perm, threshold):
+    """
+    (bands, rows) with bands * rows == num_perm whose LSH threshold
+    (1 / bands) ** (1 / rows) sits just below threshold, so pairs above it
+    become candidates with high probability and the verification step
+    filters the rest.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        lsh = (1 / bands) ** (1 / rows)
+        if lsh <= threshold - 0.1 and (best is None or lsh > best[2]):
+            best = (bands, rows, lsh)
+    return (best[0], best[1]) if best else (num_perm, 1)
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, shingle=5, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle = shingle
+        self.a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+
+    def shingles(self, text):
+        """Distinct 32-bit hashes of the text's word shingles"""
+        tokens = words(text)
+        ids = {token: zlib.crc32(token.encode("utf-8")) for token in set(tokens)}
+        h = np.fromiter((ids[token] for token in tokens), dtype=np.uint64, count=len(tokens))
+        k = min(self.shingle, len(h))
+        if k == 0:
+            return h
+        n = len(h) - k + 1
+        acc = np.zeros(n, dtype=np.uint64)
+        # Polynomial rolling combination; uint64 arithmetic wraps
+        for j in range(k):
+            acc = acc * SHINGLE_MULTIPLIER + h[j:j + n]
+        return np.unique((acc >> np.uint64(32)) ^ (acc & np.uint64(0xFFFFFFFF)))
+
+    def signature(self, text):
+        """MinHash signature (num_perm uint64 values), or None without words"""
+        x = self.shingles(text)
+        if not len(x):
+            return None
+        signature = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        a, b = self.a[:, None], self.b[:, None]
+        for start in range(0, len(x), BLOCK):
+            # a, b, x < 2**32, so a * x + b can't overflow 64 bits
+            block = (a * x[None, start:start + BLOCK] + b) % MERSENNE_PRIME
+            np.minimum(signature, block.min(axis=1), out=signature)
+        return signature
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of {signature -> stored entry}, bounded LRU with TTL.
+
+    Counters (hits, misses, evictions, expirations, skipped) are reported
+    by stats() for /health and /metrics.
+    """
+
+    def __init__(self, threshold=0.9, max_entries=10000, ttl=3600, num_perm=128,
+                 shingle=5, min_words=50, max_chars=50000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.min_words = min_words
+        self.max_chars = max_chars
+        self.hasher = MinHasher(num_perm, shingle)
+        self.bands, self.rows = band_layout(num_perm, threshold)
+
+        self._entries = OrderedDict()  # id -> (stored_at, version, signature, value)
+        self._buckets = {}             # (band, bytes) -> {id, ...}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build from NEAR_DUP_* settings; None unless NEAR_DUP=1"""
+        if os.environ.get("NEAR_DUP", "0") != "1":
+            return None
+        return cls(
+            threshold=float(os.environ.get("NEAR_DUP_THRESHOLD", 0.9)),
+            max_entries=int(os.environ.get("NEAR_DUP_SIZE", 10000)),
+            ttl=float(os.environ.get("NEAR_DUP_TTL", 3600)),
+            num_perm=int(os.environ.get("NEAR_DUP_PERMUTATIONS", 128)),
+            shingle=int(os.environ.get("NEAR_DUP_SHINGLE", 5)),
+            min_words=int(os.environ.get("NEAR_DUP_MIN_WORDS", 50)),
+            max_chars=int(os.environ.get("NEAR_DUP_MAX_CHARS", 50000)),
+        )
+
+    def signature(self, text):
+        """Signature for text, or None when it is too short to match"""
+        text = text[:self.max_chars]
+        if len(text.split()) < self.min_words:
+            self.skipped += 1
+            return None
+        return self.hasher.signature(text)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def lookup(self, signature, version):
+        """(value, similarity) of the most similar live entry, or None"""
+        if signature is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            candidates = set()
+            for key in self._band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+
+            best, best_similarity = None, self.threshold
+            for entry_id in candidates:
+                stored_at, entry_version, entry_signature, value = self._entries[entry_id]
+                if self.ttl and now - stored_at > self.ttl:
+                    self._remove(entry_id)
+                    self.expirations += 1
+                    continue
+                if entry_version != version:
+                    continue
+                similarity = float(np.count_nonzero(entry_signature == signature)) / len(signature)
+                if similarity >= best_similarity:
+                    best, best_similarity = entry_id, similarity
+
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.hits += 1
+            return self._entries[best][3], best_similarity
+
+    def add(self, signature, version, value):
+        if signature is None:
+            return
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (time.monotonic(), version, signature, value)
+            for key in self._band_keys(signature):
+                self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id):
+        _, _, signature, _ = self._entries.pop(entry_id)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "threshold": self.threshold,
+                "bands": self.bands,
+                "rows": self.rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "skipped": self.skipped,
+            }
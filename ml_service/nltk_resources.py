@@ -0,0 +1,130 @@
+"""
+Offline-first NLTK resource manager.
+
+The service used to call nltk.download() for five packages on every
+import, which costs a network round trip per package on each cold start
+even when the data is already on disk, and it loaded lexicons (VADER,
+stopwords, WordNet) that none of the 18 features read.
+
+Here a resource is only looked up on the local NLTK data path; nothing
+touches the network unless a resource is actually missing when it is
+first needed, and even then only if downloads are allowed
+(set NLTK_OFFLINE=1 to forbid them). Provision data at build time with:
+
+    python nltk_resources.py download
+    python nltk_resources.py status
+"""
+import os
+import sys
+import threading
+
+import nltk
+
+# name -> path searched by nltk.data.find
+RESOURCES = {
+    "punkt_tab": "tokenizers/punkt_tab/english/",
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+    "vader_lexicon": "sentiment/vader_lexicon.zip",
+}
+
+# Resources the active feature set reads (sent_tokenize for the title
+# proxy and avg_sentence_length). TextBlob's pattern sentiment ships its
+# own lexicon and needs no NLTK data.
+FEATURE_RESOURCES = ("punkt_tab",)
+
+_status = {}
+_lock = threading.Lock()
+# Result of one search of the data path for every resource (see status());
+# its own lock, so a probe never waits on a download in require()
+_found = {}
+_found_lock = threading.Lock()
+
+
+def downloads_allowed():
+    return os.environ.get("NLTK_OFFLINE", "") not in ("1", "true", "yes")
+
+
+def is_available(name):
+    """True when the resource is on the local NLTK data path (no network)"""
+    try:
+        nltk.data.find(RESOURCES[name])
+        return True
+    except LookupError:
+        return False
+
+
+def require(name):
+    """
+    Make sure a resource is usable, fetching it on first use if missing.
+
+    The answer is cached per process, so the data path is searched at
+    most once per resource. Returns False when the resource is missing
+    and cannot be downloaded; callers fall back as they did before.
+    """
+    ready = _status.get(name)
+    if ready is not None:
+        return ready
+
+    with _lock:
+        if name in _status:
+            return _status[name]
+        ready = is_available(name)
+        if not ready and downloads_allowed():
+            try:
+                nltk.download(name, quiet=True)
+            except Exception:
+                pass
+            ready = is_available(name)
+        _status[name] = ready
+        return ready
+
+
+def preload(names=FEATURE_RESOURCES):
+    """
+    Load locally available resources up front (no downloads).
+
+    Missing ones are left for require() to handle on first use, so a
+    replica without network access still starts immediately.
+    """
+    loaded = {}
+    for name in names:
+        if not is_available(name):
+            loaded[name] = False
+            continue
+        _status[name] = True
+        if name == "punkt_tab":
+            # Builds and caches the Punkt parameters for later calls
+            nltk.sent_tokenize("Warm up.")
+        loaded[name] = True
+    status(refresh=True)
+    return loaded
+
+
+def status(refresh=False):
+    """
+    Availability of every resource for /health. The data path is searched
+    once per process (at preload) rather than on every probe; what
+    require() has learned since, e.g. a download, takes precedence.
+    """
+    with _found_lock:
+        if refresh or not _found:
+            _found.update({name: is_available(name) for name in RESOURCES})
+        return {name: _status.get(name, found) for name, found in _found.items()}
+
+
+def download(names=FEATURE_RESOURCES):
+    """Fetch resources into the default NLTK data dir (for build steps)"""
+    return {name: bool(nltk.download(name, quiet=True)) for name in names}
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    if command == "download":
+        print(download(sys.argv[2:] or FEATURE_RESOURCES))
+    elif command == "status":
+        print(status(refresh=True))
+    else:
+        print("usage: python nltk_resources.py [status|download [name ...]]")
+        sys.exit(1)
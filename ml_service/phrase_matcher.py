@@ -0,0 +1,90 @@
+"""
+Aho-Corasick matcher for the lexicon word lists.
+
+The automaton runs over words rather than characters: text is lowercased,
+every punctuation character becomes a word boundary ("shocking!" ->
+"shocking", "reported," -> "reported") and the result is split, all in C
+(str.translate + str.split is several times faster than a tokenizing
+regex). Every word then advances the automaton once, so single-word and
+multi-word entries ("without doubt", "said to") are found in the same
+linear pass with word boundaries guaranteed by construction. Entries are
+normalized the same way, so "jaw-dropping" is the two-word phrase
+"jaw dropping" and also matches "jaw—dropping".
+
+Each entry maps to the category slots of every list it appears in;
+count() returns hits per slot. Overlapping entries are all counted, as
+a per-entry search would.
+"""
+import string
+from collections import deque
+
+BOUNDARIES = string.punctuation + "“”‘’‚„–—―…«»‹›¡¿·"
+BOUNDARY_TABLE = str.maketrans({c: " " for c in BOUNDARIES})
+
+
+def words(text):
+    """Lowercased words with punctuation treated as whitespace"""
+    return text.lower().translate(BOUNDARY_TABLE).split()
+
+
+class PhraseMatcher:
+    def __init__(self, lexicons):
+        """lexicons: iterable of (slot, entries) pairs"""
+        lexicons = list(lexicons)
+        self.n_slots = max(slot for slot, _ in lexicons) + 1
+
+        # Trie over words: goto[state] maps the next word to a state
+        self.goto = [{}]
+        outputs = [()]
+        for slot, entries in lexicons:
+            for entry in entries:
+                state = 0
+                for word in words(entry):
+                    nxt = self.goto[state].get(word)
+                    if nxt is None:
+                        nxt = len(self.goto)
+                        self.goto[state][word] = nxt
+                        self.goto.append({})
+                        outputs.append(())
+                    state = nxt
+                if state and slot not in outputs[state]:
+                    outputs[state] += (slot,)
+
+        # Failure links (breadth first; depth-1 states fail to the root),
+        # folding suffix outputs into each state
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and word not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(word, 0)
+                # A shorter entry ending here is a separate hit, even in the same slot
+                outputs[nxt] += outputs[self.fail[nxt]]
+        self.outputs = outputs
+
+    def count_words(self, word_list):
+        """Hits per slot over an already-normalized word sequence"""
+        counts = [0] * self.n_slots
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        root = goto[0]
+        state = 0
+        for word in word_list:
+            if state:
+                while state and word not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(word, 0)
+            else:
+                # Most words aren't in any lexicon: one dict probe at the root
+                state = root.get(word, 0)
+            if state:
+                for slot in outputs[state]:
+                    counts[slot] += 1
+        return counts
+
+    def count(self, text):
+        """Hits per slot in text"""
+        return self.count_words(words(text))
@@ -1,69 +1,86 @@
-import pickle
+"""
+Command-line prediction entry point.
+
+One-shot mode (unchanged contract):
+
+    python predict.py "<article text>" ["<title>"]
+
+prints a single JSON object and exits. Without a title the first
+sentence of the text stands in for it, as before.
+
+File mode, for articles too large to pass as an argument:
+
+    python predict.py --file article.txt ["<title>"]
+
+streams the file in chunks (see feature_accumulator.py) instead of
+holding the whole text, prints one JSON object and exits.
+
+Worker mode:
+
+    python predict.py --worker
+
+loads the model once, then reads newline-delimited JSON requests such as
+{"id": 7, "text": "...", "title": "..."} ("title" optional) from stdin and writes one JSON result per line
+to stdout, echoing "id". Callers can keep one warm worker per core
+instead of spawning a process per article. Between requests the worker
+picks up a newly activated registry version (see model_registry.py) at
+most every MODEL_POLL_SECONDS, and each response carries the
+"model_version" that scored it.
+"""
 import sys
 import json
 import os
 import pandas as pd
-from feature_extractor import extract_features
-
-# Ensure UTF-8 output (important on Render)
-sys.stdout.reconfigure(encoding='utf-8')
-
-try:
-    # Get input text from command line argument
-    if len(sys.argv) < 2:
-        print(json.dumps({"error": "No text provided"}))
-        sys.exit(1)
-
-    text = sys.argv[1]
-
-    if not text or text.strip() == "":
-        print(json.dumps({"error": "Empty text provided"}))
-        sys.exit(1)
-
-    # Absolute base directory (VERY IMPORTANT on Render)
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-
-    # Load trained ML model
-    model_path = os.path.join(BASE_DIR, "model.pkl")
-    with open(model_path, "rb") as f:
-        model = pickle.load(f)
-
-    # Feature names — MUST match training EXACTLY (18)
-    feature_names = [
-        "certainty_ratio",
-        "hedging_ratio",
-        "emotion_ratio",
-        "subjectivity",
-        "polarity",
-        "avg_sentence_length",
-        "pronoun_ratio",
-        "sensational_ratio_title",
-        "sensational_ratio_body",
-        "headline_exclamations",
-        "headline_questions",
-        "capital_word_ratio_title",
-        "capital_word_ratio_body",
-        "neg_emotion_ratio",
-        "pos_emotion_ratio",
-        "objective_ratio",
-        "body_exclamations",
-        "body_questions",
-    ]
-
-    # Extract features (same logic as training)
-    # Title is empty because frontend sends only body text
-    features_list = extract_features(text, "")
-
-    if len(features_list) != len(feature_names):
-        raise ValueError("Feature count mismatch with trained model")
+from compiled_model import CompiledModel
+from feature_accumulator import LONG_TEXT_CHARS, extract_features_bounded, extract_features_stream
+from feature_extractor import FEATURE_NAMES
+from model_registry import ModelManager
+
+# Absolute base directory (VERY IMPORTANT on Render)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.environ.get("MODEL_PATH", os.path.join(BASE_DIR, "model.pkl"))
+
+# Feature names — MUST match training EXACTLY (18); defined by the
+# feature registry and checked against feature_cols.pkl at load time
+feature_names = FEATURE_NAMES
+
+
+def load_models():
+    """
+    ModelManager holding the active registry version, or model.pkl next to
+    this file when there is no registry. The compiled model.npz (no
+    scikit-learn import) is used when it matches the pickle.
+    """
+    models = ModelManager.from_env(MODEL_PATH)
+    models.refresh()
+    return models
+
+
+def load_model():
+    """Load the trained ML model (the active registry version)"""
+    return load_models().active.model
+
+
+def score_rows(model, features_lists):
+    """
+    Score feature rows with one predict_proba call.
+    Returns a (label, probability) pair per row.
+    """
+    # Convert to DataFrame (the compiled model takes the plain rows)
+    if isinstance(model, CompiledModel):
+        X = features_lists
+    else:
+        X = pd.DataFrame(features_lists, columns=feature_names)
 
-    # Convert to DataFrame
-    X = pd.DataFrame([features_list], columns=feature_names)
+    # One pipeline pass; the label is the argmax of the probabilities
+    proba = model.predict_proba(X)
+    best = proba.argmax(axis=1)
+    labels = model.classes_[best]
+    return [(int(labels[i]), float(proba[i, best[i]])) for i in range(len(best))]
 
-    # Predict
-    pred_label = int(model.predict(X)[0])
-    pred_prob = float(model.predict_proba(X)[0].max())
 
+def build_output(features_list, pred_label, pred_prob):
+    """Build the JSON-ready output dict for one scored text"""
     # Map prediction
     label_map = {0: "Likely Fake", 1: "Likely Real"}
     credibility = label_map[pred_label]
@@ -93,8 +110,7 @@ try:
             "sensational or misleading news content. Verification is recommended."
         )
 
-    # Final output
-    output = {
+    return {
         "credibility": credibility,
         "confidence": round(pred_prob * 100, 2),
         "risk": risk,
@@ -103,13 +119,126 @@ try:
         "explanation": explanation
     }
 
-    # ALWAYS print JSON only
-    print(json.dumps(output))
 
-except Exception as e:
-    # Never crash silently — always return JSON
-    print(json.dumps({
-        "error": "Prediction failed",
-        "details": str(e)
-    }))
-    sys.exit(1)
\ No newline at end of file
+def predict_features(model, features_list, info=None):
+    """Score one feature row; info flags sampled estimates for long texts"""
+    pred_label, pred_prob = score_rows(model, [features_list])[0]
+    output = build_output(features_list, pred_label, pred_prob)
+    if info:
+        output.update(info)
+    return output
+
+
+def predict(model, text, title=""):
+    """Score one text and build the JSON-ready output dict"""
+    # Extract features (same logic as training); an empty title means the
+    # first sentence stands in for it
+    features_list, info = extract_features_bounded(text, title)
+    return predict_features(model, features_list, info)
+
+
+def predict_file(model, path, title=""):
+    """Score a text file, streaming it when it is long"""
+    size = os.path.getsize(path)
+    with open(path, encoding="utf-8") as f:
+        if size <= LONG_TEXT_CHARS:
+            text = f.read()
+            if text.strip() == "":
+                raise ValueError("Empty text provided")
+            return predict(model, text, title)
+        lines = (line.rstrip("\n") for line in f)
+        features_list, info = extract_features_stream(lines, title, total_chars=size)
+    return predict_features(model, features_list, info)
+
+
+def handle_request(model, line):
+    """Answer one NDJSON worker request; errors are returned, never raised"""
+    try:
+        request = json.loads(line)
+    except ValueError as e:
+        return {"error": "Invalid JSON", "details": str(e)}
+
+    if not isinstance(request, dict):
+        return {"error": "Request must be a JSON object"}
+
+    response = {"id": request.get("id")}
+    text = request.get("text")
+    title = request.get("title") or ""
+
+    if not isinstance(text, str) or text.strip() == "":
+        response["error"] = "Empty text provided"
+        return response
+
+    if not isinstance(title, str):
+        response["error"] = "title must be a string"
+        return response
+
+    try:
+        response.update(predict(model, text, title))
+    except Exception as e:
+        response.update({"error": "Prediction failed", "details": str(e)})
+    return response
+
+
+def run_worker(models, stdin=sys.stdin, stdout=sys.stdout):
+    """Serve NDJSON requests until stdin closes"""
+    for line in stdin:
+        if not line.strip():
+            continue
+        try:
+            models.maybe_refresh()
+        except Exception as e:
+            print(f"Model reload failed: {e}", file=sys.stderr)
+        # One model for the whole request, even if a reload lands meanwhile
+        active = models.active
+        response = handle_request(active.model, line)
+        response["model_version"] = active.version
+        stdout.write(json.dumps(response) + "\n")
+        stdout.flush()
+
+
+def main(argv):
+    # Ensure UTF-8 output (important on Render)
+    sys.stdout.reconfigure(encoding='utf-8')
+
+    if len(argv) > 1 and argv[1] == "--worker":
+        sys.stdin.reconfigure(encoding='utf-8')
+        run_worker(load_models())
+        return 0
+
+    try:
+        # Get input text from command line argument
+        if len(argv) < 2:
+            print(json.dumps({"error": "No text provided"}))
+            return 1
+
+        if argv[1] == "--file":
+            if len(argv) < 3:
+                print(json.dumps({"error": "No file provided"}))
+                return 1
+            title = argv[3] if len(argv) > 3 else ""
+            print(json.dumps(predict_file(load_model(), argv[2], title)))
+            return 0
+
+        text = argv[1]
+        title = argv[2] if len(argv) > 2 else ""
+
+        if not text or text.strip() == "":
+            print(json.dumps({"error": "Empty text provided"}))
+            return 1
+
+        # ALWAYS print JSON only
+        print(json.dumps(predict(load_model(), text, title)))
+        return 0
+
+    except Exception as e:
+        # Never crash silently — always return JSON
+        print(json.dumps({
+            "error": "Prediction failed",
+            "details": str(e)
+        }))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,203 @@
+"""
+Content-hash prediction cache.
+
+Wire stories and viral posts reach /predict many times over; each entry
+here keeps both the 18-feature vector and the final response for one
+text, keyed by a hash of the text (and title, when one is given) plus
+the model and feature-set versions, so a new model or feature change
+never serves stale results. Whitespace runs are collapsed first, except
+in texts over LONG_TEXT_CHARS, which are keyed as sent.
+
+The in-memory tier is a bounded LRU with a TTL. An optional SQLite tier
+(PREDICTION_CACHE_DB=/path/cache.sqlite) survives restarts and is
+shared by every worker process on the host.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from feature_accumulator import LONG_TEXT_CHARS
+
+
+def normalize_text(text):
+    """Collapse whitespace runs; no feature of a single-pass text depends on them"""
+    return " ".join(str(text).split())
+
+
+def cache_key(text, version, title=""):
+    digest = hashlib.sha256()
+    digest.update(version.encode("utf-8"))
+    digest.update(b"\0")
+    text = str(text)
+    # Past LONG_TEXT_CHARS (counted with whitespace) a text is chunked on
+    # its newlines, so its features depend on the exact whitespace
+    digest.update((text if len(text) > LONG_TEXT_CHARS else normalize_text(text)).encode("utf-8"))
+    # Untitled keys are unchanged, so existing entries stay valid
+    if title:
+        digest.update(b"\0title\0")
+        digest.update(normalize_text(title).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskTier:
+    """
+    SQLite-backed second tier; safe to share between processes.
+
+    The connection is opened lazily in each process: SQLite connections
+    (and their locks) must not cross a fork, and the module-level cache
+    is built before gunicorn's preload_app forks the workers.
+    """
+
+    # Trim the table back to max_entries after this many writes
+    PRUNE_EVERY = 500
+
+    def __init__(self, path, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def _connection(self):
+        """This process's connection; call with self._lock held"""
+        if self._pid != os.getpid():
+            # Drop (without closing) a connection inherited from the parent
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS predictions "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, created FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or (self.ttl and time.time() - row[1] > self.ttl):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            conn.commit()
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self._prune()
+
+    def _prune(self):
+        if self.ttl:
+            self._conn.execute(
+                "DELETE FROM predictions WHERE created < ?", (time.time() - self.ttl,)
+            )
+        self._conn.execute(
+            "DELETE FROM predictions WHERE key NOT IN "
+            "(SELECT key FROM predictions ORDER BY created DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._conn.commit()
+
+
+class PredictionCache:
+    """
+    Bounded LRU of {"features": [...], "result": {...}} entries with TTL.
+
+    Counters (hits, misses, evictions, expirations, disk_hits) are
+    reported by stats() for /health.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600, disk_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk = DiskTier(disk_path, max_entries * 10, ttl) if disk_path else None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build the cache from PREDICTION_CACHE_* settings (size 0 disables it)"""
+        size = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+        if size <= 0:
+            return None
+        return cls(
+            max_entries=size,
+            ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 3600)),
+            disk_path=os.environ.get("PREDICTION_CACHE_DB") or None,
+        )
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                stored_at, value = item
+                if self.ttl and now - stored_at > self.ttl:
+                    del self._entries[key]
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+        value = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self.hits += 1
+            self._store(key, value, now)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._store(key, value, time.monotonic())
+        if self.disk:
+            self.disk.set(key, value)
+
+    def _store(self, key, value, now):
+        self._entries[key] = (now, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_hits": self.disk_hits,
+                "disk_enabled": self.disk is not None,
+            }
@@ -0,0 +1,278 @@
+"""
+On-demand profiling of live scoring requests.
+
+    PROFILE_TOKEN=secret          requests with X-Profile-Token: secret are profiled
+    PROFILE_SAMPLE_RATE=0.001     and/or this fraction of all requests
+    PROFILE_KEEP=20               slowest profiles kept per worker
+    PROFILE_TRACEMALLOC=1         also trace allocations (0: cProfile only)
+
+With neither PROFILE_TOKEN nor PROFILE_SAMPLE_RATE set, from_env()
+returns None and the routes skip profiling with a single None check.
+
+A profiled request runs its scoring call in the request thread (not the
+micro-batcher) under cProfile, and under tracemalloc for the peak traced
+memory and the largest allocation sites still live at the end. Only one
+request per worker is profiled at a time; tracemalloc is process-wide,
+so concurrent requests in the same worker add to its numbers.
+
+The slowest PROFILE_KEEP profiles are kept in memory with the input
+length and a hash of the text (never the text itself) and served by
+GET /admin/profiles (list) and GET /admin/profiles/<id>?format=text|pstats|collapsed:
+
+    text       pstats report sorted by cumulative time
+    pstats     marshalled stats: pstats.Stats("file") / snakeviz / gprof2dot
+    collapsed  folded stacks for flamegraph.pl / speedscope, in microseconds
+
+cProfile records caller/callee pairs rather than whole stacks, so the
+folded stacks split each function's time across its callers in
+proportion to the time each caller spent in it. Admin routes need the
+X-Profile-Token header, so sampled profiles can only be read when
+PROFILE_TOKEN is set too. Each gunicorn worker keeps its own buffer.
+"""
+import cProfile
+import hashlib
+import heapq
+import hmac
+import io
+import itertools
+import marshal
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+HEADER = "X-Profile-Token"
+
+# Allocation sites reported per profile; frames kept per traced allocation
+TOP_ALLOCATIONS = 10
+TRACE_FRAMES = 1
+
+# Folded stacks stop at this depth (recursion is cut where a function
+# repeats) and drop branches worth less than a microsecond
+MAX_STACK_DEPTH = 64
+MIN_BRANCH_SECONDS = 1e-6
+
+
+def text_hash(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(str(text).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def func_label(func):
+    filename, line, name = func
+    if filename == "~":
+        # Builtins: ('~', 0, "<method 'join' of 'str' objects>")
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats):
+    """Folded 'root;caller;callee microseconds' lines from a pstats dict"""
+    roots = [func for func, (_, _, _, _, callers) in stats.items() if not callers]
+    children = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            # edge = (cc, nc, tt, ct) of func when called from caller
+            children.setdefault(caller, []).append((func, edge[3]))
+
+    weights = {}
+
+    def visit(func, path, share):
+        _, _, tottime, cumtime, _ = stats[func]
+        path = path + (func_label(func),)
+        if tottime * share > 0:
+            key = ";".join(path)
+            weights[key] = weights.get(key, 0.0) + tottime * share
+        if len(path) >= MAX_STACK_DEPTH or not cumtime:
+            return
+        for child, edge_time in children.get(func, ()):
+            if func_label(child) in path:
+                continue
+            child_cumtime = stats[child][3]
+            if child_cumtime and share * edge_time >= MIN_BRANCH_SECONDS:
+                visit(child, path, share * edge_time / child_cumtime)
+
+    for root in roots:
+        visit(root, (), 1.0)
+    return "".join(
+        f"{stack} {round(seconds * 1e6)}\n"
+        for stack, seconds in sorted(weights.items()) if round(seconds * 1e6) > 0
+    )
+
+
+class Profile:
+    """One profiled request: summary fields plus the raw pstats dict"""
+
+    def __init__(self, profile_id, route, texts, trigger):
+        self.id = profile_id
+        self.route = route
+        self.trigger = trigger
+        self.chars = sum(len(str(text)) for text in texts)
+        self.texts = len(texts)
+        self.text_hash = text_hash(texts)
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self.seconds = 0.0
+        self.peak_bytes = None
+        self.allocations = []
+        self.model_version = None
+        self.stats = {}
+
+    def summary(self):
+        return {
+            "id": self.id,
+            "route": self.route,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "seconds": round(self.seconds, 6),
+            "texts": self.texts,
+            "chars": self.chars,
+            "text_hash": self.text_hash,
+            "model_version": self.model_version,
+            "peak_bytes": self.peak_bytes,
+            "allocations": self.allocations,
+            "functions": len(self.stats),
+        }
+
+    def pstats_bytes(self):
+        # Same format as Profile.dump_stats, so pstats.Stats(path) reads it
+        return marshal.dumps(self.stats)
+
+    def report(self, limit=40):
+        out = io.StringIO()
+        stats = pstats.Stats(stream=out)
+        stats.stats = self.stats
+        stats.get_top_level_stats()
+        stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    def collapsed(self):
+        return collapsed_stacks(self.stats)
+
+
+class Profiler:
+    def __init__(self, token=None, sample_rate=0.0, keep=20, trace_memory=True):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.trace_memory = trace_memory
+        self.profiled = 0
+        self.skipped = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._active = threading.Lock()
+        # Min-heap of (seconds, id, Profile): the fastest kept profile is evicted first
+        self._slowest = []
+
+    @classmethod
+    def from_env(cls):
+        """Profiler from PROFILE_* variables, or None when profiling is off"""
+        token = os.environ.get("PROFILE_TOKEN") or None
+        sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+        if token is None and sample_rate <= 0:
+            return None
+        return cls(
+            token=token,
+            sample_rate=sample_rate,
+            keep=int(os.environ.get("PROFILE_KEEP", 20)),
+            trace_memory=os.environ.get("PROFILE_TRACEMALLOC", "1") == "1",
+        )
+
+    def authorized(self, headers):
+        supplied = headers.get(HEADER)
+        if not (self.token and supplied):
+            return False
+        return hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8"))
+
+    def trigger(self, headers):
+        """Why this request should be profiled ("header"/"sampled"), or None"""
+        if self.token and HEADER in headers:
+            return "header" if self.authorized(headers) else None
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    @contextmanager
+    def profile(self, route, texts, trigger):
+        """
+        Profile the block; yields the Profile (set .model_version on it),
+        or None when another request in this worker is being profiled.
+        """
+        if not self._active.acquire(blocking=False):
+            self.skipped += 1
+            yield None
+            return
+        try:
+            record = Profile(next(self._ids), route, texts, trigger)
+            started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(TRACE_FRAMES)
+            elif self.trace_memory:
+                tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+            t0 = time.perf_counter()
+            profiler.enable()
+            try:
+                yield record
+            finally:
+                profiler.disable()
+                record.seconds = time.perf_counter() - t0
+                if self.trace_memory:
+                    record.peak_bytes = tracemalloc.get_traced_memory()[1]
+                    top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+                    record.allocations = [
+                        {"site": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                         "bytes": s.size, "blocks": s.count}
+                        for s in top
+                    ]
+                    if started_tracing:
+                        tracemalloc.stop()
+                profiler.create_stats()
+                record.stats = profiler.stats
+                self._keep(record)
+        finally:
+            self._active.release()
+
+    def _keep(self, record):
+        with self._lock:
+            self.profiled += 1
+            entry = (record.seconds, record.id, record)
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif record.seconds > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def profiles(self):
+        """Kept profiles, slowest first"""
+        with self._lock:
+            return [record for _, _, record in sorted(self._slowest, reverse=True)]
+
+    def get(self, profile_id):
+        with self._lock:
+            for _, _, record in self._slowest:
+                if record.id == profile_id:
+                    return record
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._slowest = []
+
+    def stats(self):
+        with self._lock:
+            kept = len(self._slowest)
+        return {
+            "sample_rate": self.sample_rate,
+            "header": bool(self.token),
+            "profiled": self.profiled,
+            "skipped_concurrent": self.skipped,
+            "kept": kept,
+            "keep": self.keep,
+            "pid": os.getpid(),
+        }
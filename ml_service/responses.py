@@ -0,0 +1,98 @@
+"""
+Response profiles and content negotiation for the scoring routes.
+
+A profile picks which fields of a result are sent:
+
+    full        everything (default; the original response shape)
+    scores      credibility, confidence, risk and the feature values
+    label_only  credibility and risk
+
+or ?fields=credibility,confidence lists them explicitly. Annotations
+(model_version, tier, near_duplicate, estimated, sampled_fraction, error)
+are kept in every profile. Profiles apply when the response is encoded,
+so cached results are shared between them.
+
+The encoding follows the Accept header: application/msgpack (or
+application/x-msgpack) gets MessagePack, anything else compact JSON.
+orjson and msgpack are optional; without orjson JSON falls back to the
+standard library, and without msgpack the response is JSON.
+"""
+import json
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PROFILES = {
+    "full": None,
+    "scores": ("credibility", "confidence", "risk", "features"),
+    "label_only": ("credibility", "risk"),
+}
+ANNOTATIONS = ("model_version", "tier", "near_duplicate", "estimated", "sampled_fraction", "error")
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def requested_fields(args, body=None):
+    """
+    Field tuple from ?fields= / ?profile= (or the same keys in the JSON
+    body); None means the full result. Raises ValueError on an unknown
+    profile.
+    """
+    body = body if isinstance(body, dict) else {}
+    fields = args.get("fields") or body.get("fields")
+    if fields:
+        if isinstance(fields, str):
+            fields = fields.split(",")
+        return tuple(str(f).strip() for f in fields if str(f).strip()) + ANNOTATIONS
+
+    profile = args.get("profile") or body.get("profile") or "full"
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile {profile!r}; choose from {sorted(PROFILES)}")
+    fields = PROFILES[profile]
+    return None if fields is None else fields + ANNOTATIONS
+
+
+def project(result, fields):
+    if fields is None:
+        return result
+    return {key: result[key] for key in fields if key in result}
+
+
+def dumps_json(payload):
+    if orjson is not None:
+        # Numpy scalars/arrays pass straight through
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate(accept_mimetypes):
+    """Mimetype to answer with, given the request's Accept header"""
+    if msgpack is not None:
+        best = accept_mimetypes.best_match((JSON_TYPE,) + MSGPACK_TYPES, default=JSON_TYPE)
+        if best in MSGPACK_TYPES and accept_mimetypes[best] > accept_mimetypes[JSON_TYPE]:
+            return best
+    return JSON_TYPE
+
+
+def encode(payload, mimetype):
+    if mimetype in MSGPACK_TYPES:
+        return msgpack.packb(payload, use_bin_type=True)
+    return dumps_json(payload)
+
+
+def respond(payload, request, status=200):
+    """Encode payload for request's Accept header as a Flask response"""
+    mimetype = negotiate(request.accept_mimetypes)
+    response = Response(encode(payload, mimetype), status=status, mimetype=mimetype)
+    response.vary.add("Accept")
+    return response
@@ -0,0 +1,85 @@
+"""
+Pluggable sentence segmenters for the title proxy and avg_sentence_length.
+
+    SEGMENTER=punkt   (default) nltk.sent_tokenize, as trained
+    SEGMENTER=regex   one precompiled regex pass plus an abbreviation check
+
+The regex splitter follows the decisions of Punkt's English model: a
+sentence ends at ., ! or ? (plus any closing quotes or brackets) before
+whitespace, except after an ellipsis, a single-letter initial or one of
+the abbreviations Punkt ships with ("Mr.", "U.S.", "e.g."). Punkt's
+orthographic heuristics are not reproduced, so counts can still differ
+on unusual punctuation; benchmarks/bench_segmenter.py reports the
+agreement, the avg_sentence_length drift and the speed of both.
+Non-default segmenters are part of the feature-set version, so cached
+predictions never mix them.
+"""
+import os
+import re
+
+import nltk
+
+import nltk_resources
+
+
+class Segmenter:
+    """Interface: split() returns the list of sentences in text"""
+
+    name = "base"
+
+    def split(self, text):
+        raise NotImplementedError
+
+
+class PunktSegmenter(Segmenter):
+    """The reference implementation the model was trained with"""
+
+    name = "punkt"
+
+    def split(self, text):
+        # Raises LookupError when the data is unavailable so callers fall back
+        if not nltk_resources.require("punkt_tab"):
+            raise LookupError("punkt_tab not available")
+        return nltk.sent_tokenize(text)
+
+
+class RegexSegmenter(Segmenter):
+    name = "regex"
+
+    BOUNDARY = re.compile(
+        r"(?<!\.)(?:\.|[!?]+)[\"'”’)\]]*(?=\s)"
+    )
+    # Punkt's English abbreviation list (PunktTokenizer("english")._params.abbrev_types)
+    ABBREVIATIONS = frozenset(("dr", "e.g", "i.e", "inc", "jr", "mr", "mrs", "ms", "st", "u.s"))
+
+    def split(self, text):
+        sentences, start = [], 0
+        for match in self.BOUNDARY.finditer(text):
+            end = match.start()
+            if text[end] == ".":
+                word = text[max(text.rfind(" ", start, end), text.rfind("\n", start, end)) + 1:end]
+                word = word.lstrip("\"'(“‘[")
+                if word.lower() in self.ABBREVIATIONS or (len(word) == 1 and word.isalpha()):
+                    continue
+            sentence = text[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        rest = text[start:].strip()
+        if rest:
+            sentences.append(rest)
+        return sentences
+
+
+SEGMENTERS = {
+    "punkt": PunktSegmenter,
+    "regex": RegexSegmenter,
+}
+
+
+def get_segmenter(name=None):
+    """Build the segmenter named by name or SEGMENTER (default: punkt)"""
+    name = name or os.environ.get("SEGMENTER", "punkt")
+    if name not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter {name!r}; choose from {sorted(SEGMENTERS)}")
+    return SEGMENTERS[name]()
@@ -0,0 +1,252 @@
+"""
+Pluggable sentiment backends for the emotion_ratio / subjectivity /
+polarity features.
+
+    SENTIMENT_BACKEND=pattern   (default) flat-lexicon port of TextBlob's
+                                PatternAnalyzer over our own token stream
+    SENTIMENT_BACKEND=textblob  TextBlob(text).sentiment, as trained
+
+The pattern backend loads TextBlob's en-sentiment.xml once into a plain
+dict of word -> (polarity, subjectivity, intensity, is_modifier) and
+replays PatternAnalyzer's assessment rules (modifiers, negation,
+exclamation boost, "(!)" irony, emoticons) over the whitespace tokens
+extract_features already has, splitting punctuation and apostrophes the
+way TextBlob's tokenizer does only for tokens that contain them.
+
+Tolerance: the token streams are identical for ordinary prose, so scores
+usually match TextBlob exactly. They can drift on rare inputs where
+TextBlob's regexes rewrite text across token boundaries, e.g. an
+emoticon whose characters straddle a word ("2008 )" becomes "2008)").
+PARITY_TOLERANCE is the maximum absolute difference allowed by
+tests/test_sentiment.py on the fixture articles.
+"""
+import os
+
+PARITY_TOLERANCE = 0.02
+
+
+class SentimentBackend:
+    """
+    Interface: analyze() returns (polarity, subjectivity).
+
+    analyze_sums() returns (polarity_sum, subjectivity_sum, n_assessments)
+    so scores for consecutive chunks of one text can be added up and
+    divided once (see feature_accumulator.py).
+    """
+
+    name = "base"
+
+    def analyze(self, text, tokens=None):
+        raise NotImplementedError
+
+    def analyze_sums(self, text, tokens=None):
+        polarity, subjectivity = self.analyze(text, tokens)
+        return polarity, subjectivity, 1
+
+
+class TextBlobBackend(SentimentBackend):
+    """The reference implementation the model was trained with"""
+
+    name = "textblob"
+
+    def __init__(self):
+        from textblob import TextBlob
+        self._blob = TextBlob
+
+    def analyze(self, text, tokens=None):
+        sentiment = self._blob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+    def analyze_sums(self, text, tokens=None):
+        # The averages are over the scored words; weight by their number
+        sentiment = self._blob(text).sentiment_assessments
+        n = len(sentiment.assessments)
+        return sentiment.polarity * n, sentiment.subjectivity * n, n
+
+
+class PatternLexiconBackend(SentimentBackend):
+    """PatternAnalyzer rules over a flat, preloaded lexicon"""
+
+    name = "pattern"
+
+    QUOTES = ("“", "”", "‘", "’", "'", '"')
+
+    def __init__(self):
+        from textblob import _text
+        from textblob.en import sentiment as pattern_sentiment
+
+        # len() forces the lazy XML load (plus the "-ly" adverb entries)
+        len(pattern_sentiment)
+        self.lexicon = {
+            word: (*scores[None], "RB" in scores)
+            for word, scores in dict.items(pattern_sentiment)
+        }
+        self.negations = frozenset(pattern_sentiment.negations)
+
+        self.punctuation = _text.PUNCTUATION
+        self.leading = tuple(_text.PUNCTUATION.replace(".", ""))
+        self.trailing = self.leading + (".",)
+        self.abbreviations = _text.ABBREVIATIONS
+        self.abbreviation_patterns = (_text.RE_ABBR1, _text.RE_ABBR2, _text.RE_ABBR3)
+
+        self.emoticons = {}
+        self.emoticons_cased = set()
+        for (_, polarity), faces in _text.EMOTICONS.items():
+            for face in faces:
+                self.emoticons.setdefault(face.lower(), polarity)
+                self.emoticons_cased.add(face)
+        self.face_starts = {face[0] for face in self.emoticons_cased}
+        self.max_face_len = max(len(face) for face in self.emoticons_cased)
+
+    # ---- tokenization (textblob._text.find_tokens, per whitespace token) ----
+
+    def _split_token(self, token, out):
+        if token in self.emoticons_cased:
+            out.append(token)
+            return
+        if "n't" in token:
+            token = token.replace("n't", " n't")
+        for quote in self.QUOTES:
+            if quote in token:
+                token = token.replace(quote, f" {quote} ")
+        for t in token.split():
+            if t in self.emoticons_cased:
+                out.append(t)
+                continue
+            tail = []
+            while t.startswith(self.leading):
+                out.append(t[0])
+                t = t[1:]
+            while t.endswith(self.trailing):
+                if t.endswith(self.leading):
+                    tail.append(t[-1])
+                    t = t[:-1]
+                if t.endswith("..."):
+                    tail.append("...")
+                    t = t[:-3].rstrip(".")
+                if t.endswith("."):
+                    if t in self.abbreviations or any(
+                        p.match(t) is not None for p in self.abbreviation_patterns
+                    ):
+                        break
+                    tail.append(t[-1])
+                    t = t[:-1]
+            if t != "":
+                out.append(t)
+            out.extend(reversed(tail))
+
+    def _rejoin_faces(self, out):
+        """Glue emoticons split into punctuation tokens back together (RE_EMOTICONS)"""
+        merged = []
+        i = 0
+        while i < len(out):
+            if out[i] in self.face_starts:
+                for width in range(self.max_face_len, 1, -1):
+                    face = "".join(out[i:i + width])
+                    if i + width <= len(out) and face in self.emoticons_cased:
+                        merged.append(face)
+                        i += width
+                        break
+                else:
+                    merged.append(out[i])
+                    i += 1
+            else:
+                merged.append(out[i])
+                i += 1
+        return merged
+
+    def words(self, tokens):
+        """Lowercased token stream as PatternAnalyzer would see it"""
+        out = []
+        split_any = False
+        for token in tokens:
+            if token.isalnum():
+                out.append(token)
+            else:
+                self._split_token(token, out)
+                split_any = True
+        if split_any:
+            out = self._rejoin_faces(out)
+        words = [w.lower() for w in out]
+        # "( ! )" collapses into the irony mark, as RE_SARCASM does
+        if "(" in words and "!" in words:
+            i = 0
+            while i < len(words) - 2:
+                if words[i] == "(" and words[i + 1] == "!" and words[i + 2] == ")":
+                    words[i:i + 3] = ["(!)"]
+                i += 1
+        return words
+
+    # ---- scoring (textblob._text.Sentiment.assessments with pos=None) ----
+
+    def assess(self, words):
+        lexicon = self.lexicon
+        negations = self.negations
+        a = []  # [polarity, subjectivity, intensity, negated]
+        m = None  # Preceding modifier
+        n = None  # Preceding negation
+        for w in words:
+            entry = lexicon.get(w)
+            if entry is not None:
+                p, s, i, is_modifier = entry
+                if m is None:
+                    a.append([p, s, i, 1])
+                else:
+                    last = a[-1]
+                    last[0] = max(-1.0, min(p * last[2], +1.0))
+                    last[1] = max(-1.0, min(s * last[2], +1.0))
+                    last[2] = i
+                if n is not None:
+                    a[-1][2] = 1.0 / a[-1][2]
+                    a[-1][3] = -1
+                m = w if is_modifier else None
+                n = w if w in negations else None
+            else:
+                if w in negations:
+                    n = w
+                elif n and len(w.strip("'")) > 1:
+                    n = None
+                if n is not None and m is not None and m.endswith("ly"):
+                    a[-1][3] = -1
+                    n = None
+                elif m and len(w) > 2:
+                    m = None
+                if w == "!" and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, +1.0))
+                if w == "(!)":
+                    a.append([0.0, 1.0, 1.0, 1])
+                if not w.isalpha() and len(w) <= 5 and w not in self.punctuation:
+                    p = self.emoticons.get(w)
+                    if p is not None:
+                        a.append([p, 1.0, 1.0, 1])
+        return a
+
+    def analyze_sums(self, text, tokens=None):
+        if tokens is None:
+            tokens = text.split()
+        polarity = subjectivity = 0
+        a = self.assess(self.words(tokens))
+        for p, s, _, negated in a:
+            # "not good" = slightly bad, "not bad" = slightly good
+            polarity += p * -0.5 if negated < 0 else p
+            subjectivity += s
+        return polarity, subjectivity, len(a)
+
+    def analyze(self, text, tokens=None):
+        polarity, subjectivity, n = self.analyze_sums(text, tokens)
+        count = float(n or 1)
+        return polarity / count, subjectivity / count
+
+
+BACKENDS = {
+    PatternLexiconBackend.name: PatternLexiconBackend,
+    TextBlobBackend.name: TextBlobBackend,
+}
+
+
+def get_backend(name=None):
+    """Build the backend named by name or SENTIMENT_BACKEND (default: pattern)"""
+    name = name or os.environ.get("SENTIMENT_BACKEND", PatternLexiconBackend.name)
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown sentiment backend {name!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[name]()
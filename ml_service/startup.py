@@ -0,0 +1,31 @@
+"""
+Startup-time report: how long the service spent in imports, resource
+loading and model load before it could answer requests.
+"""
+import time
+from contextlib import contextmanager
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        """Time a block and add it to the report under name"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def as_dict(self):
+        return {
+            "phases": {name: round(sec, 4) for name, sec in self.phases.items()},
+            "total_seconds": round(sum(self.phases.values()), 4),
+        }
+
+    def summary(self):
+        parts = ", ".join(f"{name} {sec:.2f}s" for name, sec in self.phases.items())
+        return f"Startup: {parts} (total {sum(self.phases.values()):.2f}s)"
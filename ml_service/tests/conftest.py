@@ -0,0 +1,26 @@
+"""
+Shared setup for the service tests.
+
+    cd ml_service && python -m pytest -q
+
+The service modules use flat imports, so ml_service/ (and benchmarks/,
+for the synthetic corpus and fixture articles) go on sys.path here.
+"""
+import json
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.join(SERVICE_DIR, "benchmarks")
+sys.path[:0] = [SERVICE_DIR, BENCHMARKS_DIR]
+
+FIXTURES = os.path.join(BENCHMARKS_DIR, "fixtures", "articles.jsonl")
+
+
+@pytest.fixture(scope="session")
+def articles():
+    """The fixture articles as {"title", "text"} dicts"""
+    with open(FIXTURES, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
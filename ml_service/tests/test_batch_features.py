@@ -0,0 +1,78 @@
+"""Columnar batch extraction against per-document extract_features"""
+import numpy as np
+import pytest
+
+import batch_features
+import feature_accumulator
+from batch_features import (
+    BATCH_KERNEL_MIN_DOCS, extract_features_batch, extract_features_bounded_batch, extract_features_rows,
+)
+from corpus import make_corpus
+from feature_accumulator import extract_features_bounded
+from feature_extractor import FEATURE_NAMES, extract_features
+
+EDGE_PAIRS = [("", ""), ("Title only!", ""), ("", "WOW!!! is this REAL? I SAID so. A B"), ("", "   ")]
+
+
+@pytest.fixture(scope="module")
+def pairs(articles):
+    """(title, text) pairs: fixture articles with and without titles, synthetic texts, edge cases"""
+    pairs = [(a["title"], a["text"]) for a in articles] + [("", a["text"]) for a in articles]
+    texts = make_corpus(200, 150, seed=3)
+    titles = make_corpus(200, 8, seed=4)
+    pairs += [(titles[i] if i % 3 == 0 else "", text) for i, text in enumerate(texts)]
+    return pairs + EDGE_PAIRS
+
+
+def assert_same_rows(expected, got):
+    assert len(expected) == len(got)
+    for i, (want, row) in enumerate(zip(expected, got)):
+        assert want == row, f"row {i}"
+        assert [type(v) for v in want] == [type(v) for v in row], f"row {i}: value types differ"
+
+
+def test_rows_match_extract_features(pairs):
+    titles, texts = [p[0] for p in pairs], [p[1] for p in pairs]
+    assert_same_rows([extract_features(text, title) for title, text in pairs], extract_features_rows(texts, titles))
+
+
+def test_rows_without_titles(pairs):
+    texts = [text for _, text in pairs]
+    assert_same_rows([extract_features(text) for text in texts], extract_features_rows(texts))
+
+
+def test_matrix_is_float32_rows(pairs):
+    titles, texts = [p[0] for p in pairs], [p[1] for p in pairs]
+    matrix = extract_features_batch(texts, titles)
+    assert matrix.dtype == np.float32
+    assert np.array_equal(matrix, np.array([extract_features(t, h) for h, t in pairs], dtype=np.float32))
+
+
+def test_empty_batch():
+    assert extract_features_rows([]) == []
+    assert extract_features_batch([]).shape == (0, len(FEATURE_NAMES))
+    assert extract_features_bounded_batch([]) == []
+
+
+@pytest.mark.parametrize("title, text", [("", "One short sentence."), ("A title?", "Body TEXT here!")] + EDGE_PAIRS)
+def test_single_document(title, text):
+    assert_same_rows([extract_features(text, title)], extract_features_rows([text], [title]))
+    matrix = extract_features_batch([text], [title])
+    assert np.array_equal(matrix, np.array([extract_features(text, title)], dtype=np.float32))
+
+
+@pytest.mark.parametrize("size", [1, BATCH_KERNEL_MIN_DOCS - 1, BATCH_KERNEL_MIN_DOCS, BATCH_KERNEL_MIN_DOCS + 37])
+def test_bounded_batch_matches_per_document(pairs, monkeypatch, size):
+    # A low threshold mixes chunked long texts into the batch
+    monkeypatch.setattr(batch_features, "LONG_TEXT_CHARS", 3000)
+    monkeypatch.setattr(feature_accumulator, "LONG_TEXT_CHARS", 3000)
+    long_text = "\n".join(make_corpus(40, 30, seed=9))
+    assert len(long_text) > 3000
+    batch = (pairs * (size // len(pairs) + 1))[:size]
+    batch[size // 2] = ("", long_text)
+    titles, texts = [p[0] for p in batch], [p[1] for p in batch]
+
+    expected = [extract_features_bounded(text, title) for title, text in batch]
+    got = extract_features_bounded_batch(texts, titles)
+    assert_same_rows([features for features, _ in expected], [features for features, _ in got])
+    assert [info for _, info in expected] == [info for _, info in got]
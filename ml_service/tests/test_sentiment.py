@@ -0,0 +1,32 @@
+"""Parity of the pattern sentiment backend with TextBlob"""
+import pytest
+
+pytest.importorskip("textblob")
+
+from corpus import make_corpus  # noqa: E402
+from sentiment import PARITY_TOLERANCE, PatternLexiconBackend, TextBlobBackend  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def backends():
+    return PatternLexiconBackend(), TextBlobBackend()
+
+
+def drift(backends, text):
+    fast, reference = backends
+    (p1, s1), (p2, s2) = fast.analyze(text), reference.analyze(text)
+    return max(abs(p1 - p2), abs(s1 - s2))
+
+
+def test_fixture_articles_within_tolerance(backends, articles):
+    texts = [a["text"] for a in articles] + [a["title"] for a in articles if a["title"]]
+    assert max(drift(backends, text) for text in texts) <= PARITY_TOLERANCE
+
+
+def test_synthetic_texts_within_tolerance(backends):
+    assert max(drift(backends, text) for text in make_corpus(100, 300)) <= PARITY_TOLERANCE
+
+
+@pytest.mark.parametrize("text", ["", "   ", "!!!", "not bad", "very very good", "I don't love it."])
+def test_edge_cases_within_tolerance(backends, text):
+    assert drift(backends, text) <= PARITY_TOLERANCE
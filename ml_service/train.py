@@ -0,0 +1,289 @@
+"""
+Train model.pkl from labeled articles.
+
+    python train.py Fake.csv=fake True.csv=real [--out-dir trained] [--workers 8]
+    python train.py labeled.jsonl --grid n_estimators=100,200,400 --grid learning_rate=0.05,0.1
+    python train.py labeled.csv --publish --activate
+
+Inputs are JSONL or CSV with "text" and optional "title"; the label comes
+from a "label" column (0/1, fake/real) or from a =fake / =real suffix that
+labels every row of that file.
+
+Features are computed with feature_extractor.extract_features, the exact
+function the service uses (through its columnar batch form,
+batch_features.py), in parallel over --workers processes, and
+cached in a columnar feature store (feature_store.py) keyed by a hash of
+title and text plus the feature-set version. Re-runs and sweeps only
+extract rows that are new or changed.
+
+The pipeline is StandardScaler -> GradientBoostingClassifier, as served.
+Rows are split into train and test sets (stratified, --seed). With more
+than one --grid combination, each is fitted on the train split minus a
+validation split (--val-size of it) and the best validation accuracy
+wins; the winner is refitted on the whole train split and only it is
+scored on the test set. Written to --out-dir (default ml_service/trained/,
+never the served model unless asked for):
+
+    model.pkl          the fitted pipeline
+    model.npz          its compiled copy (see compiled_model.py)
+    feature_cols.pkl   FEATURE_NAMES, checked by the service at load
+    metadata.json      feature set, hyperparameters, sweep results
+                       (validation metrics), test metrics, data
+                       fingerprint, checksum
+
+--publish also adds the model to the versioned registry (see
+model_registry.py), which compiles model.npz and, with --activate,
+makes it the version the service hot-loads.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import pickle
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+
+from batch_features import extract_features_rows
+from bulk_score import detect_format, read_records
+from cascade import parse_label
+from compiled_model import export, file_checksum
+from feature_extractor import FEATURE_NAMES, FEATURE_SET
+from feature_store import FeatureStore, text_key
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The served model's hyperparameters
+DEFAULT_PARAMS = {"n_estimators": 200, "max_depth": 5, "learning_rate": 0.1}
+
+# Rows extracted per worker task, and stored per feature-store part
+CHUNK = 200
+PART_ROWS = 20000
+
+
+# ============== DATA ==============
+
+def read_inputs(specs):
+    """(titles, texts, labels) from 'path' or 'path=fake|real' specs"""
+    titles, texts, labels = [], [], []
+    for spec in specs:
+        path, _, forced = spec.partition("=")
+        forced_label = parse_label(forced) if forced else None
+        if forced and forced_label is None:
+            raise SystemExit(f"Unknown label {forced!r} in {spec}; use =fake or =real")
+        for record in read_records(path, detect_format(path)):
+            text = record.get("text")
+            if not isinstance(text, str) or text.strip() == "":
+                continue
+            label = forced_label if forced_label is not None else parse_label(record.get("label"))
+            if label is None:
+                raise SystemExit(f"{path}: row without a usable label; add a label column or =fake/=real")
+            titles.append(record.get("title") or "")
+            texts.append(text)
+            labels.append(label)
+    return titles, texts, np.array(labels, dtype=np.int64)
+
+
+def extract_rows(pairs):
+    # Columnar batch path; identical to extract_features per row
+    return extract_features_rows([text for _, text in pairs], [title for title, _ in pairs])
+
+
+def fill_store(store, keys, titles, texts, workers):
+    """Extract and store features for every key the store doesn't have yet"""
+    todo = store.missing(keys)
+    if not todo:
+        return 0
+    first = {}
+    for i, key in enumerate(keys):
+        first.setdefault(key, i)
+    pairs = [(titles[first[key]], texts[first[key]]) for key in todo]
+    chunks = [pairs[i:i + CHUNK] for i in range(0, len(pairs), CHUNK)]
+
+    started = time.perf_counter()
+    buf_keys, buf_rows, done = [], [], 0
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        results = pool.map(extract_rows, chunks) if pool else map(extract_rows, chunks)
+        for chunk_keys, rows in zip((todo[i:i + CHUNK] for i in range(0, len(todo), CHUNK)), results):
+            buf_keys.extend(chunk_keys)
+            buf_rows.extend(rows)
+            done += len(rows)
+            # Flush in parts so an interrupted run keeps what it computed
+            if len(buf_keys) >= PART_ROWS:
+                store.append(buf_keys, buf_rows)
+                buf_keys, buf_rows = [], []
+            rate = done / (time.perf_counter() - started)
+            print(f"\r{done}/{len(todo)} articles extracted ({rate:.1f}/sec)", end="", file=sys.stderr)
+    finally:
+        if pool:
+            pool.shutdown()
+    store.append(buf_keys, buf_rows)
+    print(file=sys.stderr)
+    return len(todo)
+
+
+# ============== TRAINING ==============
+
+def parse_grid(specs):
+    """['n_estimators=100,200', ...] -> list of param dicts (over DEFAULT_PARAMS)"""
+    axes = {}
+    for spec in specs or ():
+        name, _, values = spec.partition("=")
+        axes[name] = [json.loads(v) for v in values.split(",")]
+    names = list(axes)
+    return [
+        {**DEFAULT_PARAMS, **dict(zip(names, combo))}
+        for combo in itertools.product(*(axes[n] for n in names))
+    ] or [dict(DEFAULT_PARAMS)]
+
+
+def build_pipeline(params, seed):
+    from sklearn.ensemble import GradientBoostingClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("model", GradientBoostingClassifier(random_state=seed, **params)),
+    ])
+
+
+def evaluate(pipeline, X, y):
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    proba = pipeline.predict_proba(X)[:, 1]
+    predicted = (proba >= 0.5).astype(np.int64)
+    metrics = {
+        "accuracy": round(float(accuracy_score(y, predicted)), 5),
+        "f1": round(float(f1_score(y, predicted)), 5),
+    }
+    if len(set(y.tolist())) == 2:
+        metrics["roc_auc"] = round(float(roc_auc_score(y, proba)), 5)
+    return metrics
+
+
+def train(args):
+    import pandas as pd
+    import sklearn
+    from sklearn.model_selection import train_test_split
+
+    titles, texts, y = read_inputs(args.inputs)
+    if len(set(y.tolist())) != 2:
+        raise SystemExit("Training needs both fake and real articles")
+    keys = [text_key(text, title) for title, text in zip(titles, texts)]
+
+    store = FeatureStore(args.feature_store)
+    if args.refresh_features:
+        store.clear()
+    cached = len(keys) - sum(1 for key in keys if key not in store)
+    computed = fill_store(store, keys, titles, texts, args.workers)
+    print(f"{len(keys)} articles: {cached} rows from the feature store, {computed} distinct rows extracted",
+          file=sys.stderr)
+
+    # DataFrame with the training column names, as the served pipeline expects
+    X = pd.DataFrame(store.matrix(keys), columns=FEATURE_NAMES)
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed, stratify=y
+    )
+
+    # The test split is only used to score the chosen configuration
+    grid = parse_grid(args.grid)
+    sweep, params = [], grid[0]
+    if len(grid) > 1:
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train, y_train, test_size=args.val_size, random_state=args.seed, stratify=y_train
+        )
+        best = None
+        for candidate in grid:
+            t0 = time.perf_counter()
+            metrics = evaluate(build_pipeline(candidate, args.seed).fit(X_fit, y_fit), X_val, y_val)
+            sweep.append({"params": candidate, "fit_seconds": round(time.perf_counter() - t0, 2), **metrics})
+            print(f"{candidate}: validation {metrics}", file=sys.stderr)
+            if best is None or metrics["accuracy"] > best["accuracy"]:
+                params, best = candidate, metrics
+
+    pipeline = build_pipeline(params, args.seed).fit(X_train, y_train)
+    metrics = evaluate(pipeline, X_test, y_test)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    model_path = os.path.join(args.out_dir, "model.pkl")
+    with open(model_path, "wb") as f:
+        pickle.dump(pipeline, f)
+    # Keeps a model.npz in the same directory in step with the pickle
+    export(model_path, os.path.join(args.out_dir, "model.npz"))
+    with open(os.path.join(args.out_dir, "feature_cols.pkl"), "wb") as f:
+        pickle.dump(list(FEATURE_NAMES), f)
+
+    fingerprint = hashlib.sha256()
+    for key, label in sorted(zip(keys, y.tolist())):
+        fingerprint.update(key + str(label).encode("ascii"))
+    metadata = {
+        "trained_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "checksum": file_checksum(model_path),
+        "feature_set": FEATURE_SET.version,
+        "feature_names": list(FEATURE_NAMES),
+        "params": params,
+        "seed": args.seed,
+        "test_size": args.test_size,
+        "val_size": args.val_size if len(grid) > 1 else None,
+        "metrics": metrics,
+        "sweep": sweep,
+        "data": {
+            "inputs": args.inputs,
+            "rows": len(keys),
+            "train_rows": len(y_train),
+            "test_rows": len(y_test),
+            "real_fraction": round(float(y.mean()), 5),
+            "fingerprint": fingerprint.hexdigest(),
+        },
+        "versions": {
+            "python": platform.python_version(),
+            "scikit-learn": sklearn.__version__,
+            "numpy": np.__version__,
+        },
+    }
+    with open(os.path.join(args.out_dir, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Wrote model.pkl, model.npz, feature_cols.pkl and metadata.json to {args.out_dir} "
+          f"(test accuracy {metrics['accuracy']})")
+
+    if args.publish:
+        from model_registry import ModelRegistry
+
+        registry = ModelRegistry(args.registry)
+        extra = {k: metadata[k] for k in ("feature_set", "params", "metrics", "data")}
+        published = registry.publish(model_path, trained_at=metadata["trained_at"], extra=extra)
+        if args.activate:
+            registry.activate(published["version"])
+        print(f"Published {published['version']}{' (active)' if args.activate else ''}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="JSONL/CSV files, optionally path=fake or path=real")
+    parser.add_argument("--out-dir", default=os.path.join(BASE_DIR, "trained"),
+                        help="where to write the model (the service directory replaces the served one)")
+    parser.add_argument("--feature-store", default=os.environ.get("FEATURE_STORE", os.path.join(BASE_DIR, "feature_store")))
+    parser.add_argument("--refresh-features", action="store_true", help="drop cached features for this version")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--grid", action="append", metavar="PARAM=V1,V2",
+                        help="hyperparameter values to sweep (repeatable)")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--val-size", type=float, default=0.2,
+                        help="share of the train split held out to compare --grid combinations")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--publish", action="store_true", help="add the model to the registry")
+    parser.add_argument("--activate", action="store_true", help="with --publish: serve it")
+    parser.add_argument("--registry", default=os.environ.get("MODEL_REGISTRY", os.path.join(BASE_DIR, "models")))
+    return train(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())